@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+
+from apps.academic_calendars.schemas import Day, DayType, Holiday
+
+
+FIXED_NATIONAL_HOLIDAYS = [
+    (1, 1, "Ano Novo"),
+    (4, 21, "Dia de Tiradentes"),
+    (5, 1, "Dia do Trabalhador"),
+    (9, 7, "Independência do Brasil"),
+    (10, 12, "Nossa Senhora Aparecida"),
+    (11, 2, "Finados"),
+    (11, 15, "Proclamação da República"),
+    (12, 25, "Natal"),
+]
+
+# Lei 14.759/2023: Consciência Negra passou a ser feriado nacional em 2024.
+BLACK_CONSCIOUSNESS_DAY_SINCE = 2024
+
+# Deslocamento em dias a partir do domingo de Páscoa
+MOVABLE_HOLIDAYS = [
+    (-48, DayType.NATIONAL_HOLIDAY, "Carnaval"),
+    (-47, DayType.NATIONAL_HOLIDAY, "Carnaval"),
+    (-46, DayType.OPTIONAL_DAY, "Quarta-feira de Cinzas"),
+    (-2, DayType.NATIONAL_HOLIDAY, "Sexta-feira Santa"),
+    (60, DayType.NATIONAL_HOLIDAY, "Corpus Christi"),
+]
+
+
+def easter_sunday(year: int) -> date:
+    """Calcula o domingo de Páscoa pelo algoritmo gregoriano anônimo (Meeus/Jones/Butcher)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+@lru_cache(maxsize=None)
+def national_holidays(year: int) -> Tuple[Holiday, ...]:
+    """Feriados nacionais fixos e móveis (derivados da Páscoa) do ano."""
+    holidays = [
+        Holiday(date=date(year, month, day), type=DayType.NATIONAL_HOLIDAY, label=label)
+        for month, day, label in FIXED_NATIONAL_HOLIDAYS
+    ]
+    if year >= BLACK_CONSCIOUSNESS_DAY_SINCE:
+        holidays.append(Holiday(
+            date=date(year, 11, 20), type=DayType.NATIONAL_HOLIDAY, label="Consciência Negra"))
+
+    easter = easter_sunday(year)
+    holidays.extend(
+        Holiday(date=easter + timedelta(days=offset), type=day_type, label=label, movable=True)
+        for offset, day_type, label in MOVABLE_HOLIDAYS
+    )
+    return tuple(sorted(holidays, key=lambda holiday: holiday.date))
+
+
+@lru_cache(maxsize=None)
+def _municipal_holidays(year: int, config: Tuple[Tuple[int, int, str], ...]) -> Tuple[Holiday, ...]:
+    return tuple(
+        Holiday(date=date(year, month, day), type=DayType.MUNICIPAL_HOLIDAY, label=label)
+        for month, day, label in sorted(config)
+    )
+
+
+def municipal_holidays(year: int) -> Tuple[Holiday, ...]:
+    """Feriados municipais configurados em ``settings.MUNICIPAL_HOLIDAYS``."""
+    config = tuple(tuple(entry) for entry in getattr(settings, "MUNICIPAL_HOLIDAYS", []))
+    return _municipal_holidays(year, config)
+
+
+def holidays_for_year(year: int) -> Tuple[Holiday, ...]:
+    """Todos os feriados do ano; os municipais vêm depois dos nacionais."""
+    return national_holidays(year) + municipal_holidays(year)
+
+
+def holiday_days(year: int, holidays: Iterable[Holiday] = None) -> List[Day]:
+    """
+    Converte os feriados do ano em dias do calendário.
+
+    Feriados na mesma data são combinados em um único dia: o tipo do último
+    feriado prevalece (municipal sobre nacional) e os rótulos são somados.
+
+    Args:
+        year: Ano do calendário.
+        holidays: Feriados a converter. Por padrão, ``holidays_for_year(year)``.
+
+    Returns:
+        Novos objetos ``Day`` ordenados por data.
+    """
+    by_date: Dict[date, Day] = {}
+    for holiday in holidays if holidays is not None else holidays_for_year(year):
+        day = by_date.get(holiday.date)
+        if day is None:
+            by_date[holiday.date] = Day(
+                date=holiday.date.isoformat(), type=holiday.type, labels=[holiday.label])
+            continue
+        day.type = holiday.type
+        if holiday.label not in day.labels:
+            day.labels.append(holiday.label)
+    return [by_date[key] for key in sorted(by_date)]
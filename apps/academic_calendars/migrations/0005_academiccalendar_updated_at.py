@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_calendars', '0004_alter_academiccalendar_year'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='academiccalendar',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -40,6 +40,7 @@ class AcademicCalendar(models.Model):
     calendar_data = models.JSONField(default=dict)
     processed_at = models.DateTimeField(auto_now_add=True)
     processing_errors = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-year']
@@ -0,0 +1,13 @@
+from rest_framework.renderers import BaseRenderer
+
+
+class ICalendarRenderer(BaseRenderer):
+    """Permite negociar ``text/calendar``; o conteúdo em si é enviado via streaming."""
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = data.get('message') or data.get('error') or ''
+        return str(data or '').encode(self.charset)
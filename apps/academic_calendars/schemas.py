@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional, Literal
 from enum import Enum
 from datetime import date
 
@@ -59,3 +59,82 @@ class CalendarData(BaseModel):
     legend: List[LegendItem]
     monthly_meta: Optional[List[MonthlyMeta]] = Field(
         None, description="Optional monthly metadata for reference")
+
+
+class DiffAlignment(str, Enum):
+    DATE = 'date'
+    WEEKDAY = 'weekday'
+
+
+class DayChange(BaseModel):
+    date: str = Field(description="Date in the compared calendar (YYYY-MM-DD)")
+    other_date: str = Field(
+        description="Aligned date in the reference calendar (YYYY-MM-DD)")
+    type: Optional[DayType] = None
+    other_type: Optional[DayType] = None
+    labels_added: List[str] = Field(default_factory=list)
+    labels_removed: List[str] = Field(default_factory=list)
+
+
+class StageShift(BaseModel):
+    id: StageId
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    other_start_date: Optional[date] = None
+    other_end_date: Optional[date] = None
+    start_shift_days: Optional[int] = Field(
+        None, description="Days the stage start moved after alignment")
+    end_shift_days: Optional[int] = Field(
+        None, description="Days the stage end moved after alignment")
+
+
+class CalendarDiffSummary(BaseModel):
+    changed_types: int
+    changed_labels: int
+    shifted_stages: int
+
+
+class CalendarDiff(BaseModel):
+    year: int
+    other_year: int
+    align: DiffAlignment
+    offset_days: int = Field(
+        description="Offset applied to the reference calendar when aligning by weekday")
+    summary: CalendarDiffSummary
+    days: List[DayChange]
+    stages: List[StageShift]
+
+
+class Holiday(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    date: date
+    type: DayType
+    label: str = Field(description="Holiday name")
+    movable: bool = Field(
+        False, description="Whether the date is derived from Easter")
+
+
+class CloneReviewReason(str, Enum):
+    HOLIDAY_REMOVED = 'holiday_removed'
+    HOLIDAY_ON_SCHOOL_DAY = 'holiday_on_school_day'
+    UNMAPPED = 'unmapped'
+
+
+class CloneReviewItem(BaseModel):
+    date: str = Field(description="Date in the cloned calendar (YYYY-MM-DD)")
+    source_date: Optional[str] = Field(
+        None, description="Weekday-aligned date in the source calendar")
+    reason: CloneReviewReason
+    type: DayType
+    labels: List[str] = Field(default_factory=list)
+
+
+class CalendarClone(BaseModel):
+    year: int
+    source_year: int
+    offset_days: int = Field(
+        description="Offset applied to the source calendar to align weekdays")
+    stages: List[Stage]
+    review_counts: Dict[CloneReviewReason, int]
+    days_to_review: List[CloneReviewItem]
@@ -1,10 +1,29 @@
 import fitz
 import re
 import os
+import numpy as np
+from django.db import transaction
 from rest_framework.exceptions import NotFound
-from apps.academic_calendars.schemas import CalendarData, Stage, LegendItem
-from typing import List
-from datetime import date
+from apps.academic_calendars.holidays import holiday_days
+from apps.academic_calendars.schemas import (
+    CalendarData,
+    CalendarDiff,
+    CalendarDiffSummary,
+    CloneReviewItem,
+    CloneReviewReason,
+    Day,
+    DayChange,
+    DayType,
+    DiffAlignment,
+    LegendItem,
+    Stage,
+    StageId,
+    StageShift,
+)
+from apps.academic_calendars.models import AcademicCalendar, LegendType
+from apps.academic_calendars.signals import calendar_data_changed
+from typing import Iterable, Iterator, List, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
 
 
 MONTHS = [
@@ -98,3 +117,434 @@ class AcademicCalendarPDFProcessor:
                             days=[],
                             legend=[],
                             monthly_meta=[])
+
+
+def year_dates(year: int) -> np.ndarray:
+    """Retorna todas as datas do ano como um array ``datetime64[D]``."""
+    return np.arange(f"{year}-01-01", f"{year + 1}-01-01", dtype="datetime64[D]")
+
+
+def build_day_arrays(year: int, days: List[dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Converte a lista de dias de ``calendar_data`` em arrays alinhados ao ano.
+
+    Args:
+        year: Ano do calendário.
+        days: Dias serializados (``date``, ``type``, ``labels``).
+
+    Returns:
+        Tupla ``(dates, types, labels)`` com um elemento por dia do ano. Dias
+        ausentes ficam com tipo ``''`` e rótulos vazios.
+    """
+    dates = year_dates(year)
+    types = np.full(dates.shape, "", dtype=object)
+    labels = np.full(dates.shape, frozenset(), dtype=object)
+    if not days:
+        return dates, types, labels
+
+    day_dates = np.array([day["date"] for day in days], dtype="datetime64[D]")
+    idx = (day_dates - dates[0]).astype(np.int64)
+    in_year = (idx >= 0) & (idx < len(dates))
+
+    day_types = np.empty(len(days), dtype=object)
+    day_types[:] = [day.get("type") or "" for day in days]
+    day_labels = np.empty(len(days), dtype=object)
+    day_labels[:] = [frozenset(day.get("labels") or []) for day in days]
+
+    types[idx[in_year]] = day_types[in_year]
+    labels[idx[in_year]] = day_labels[in_year]
+    return dates, types, labels
+
+
+def weekday_offset(year: int, other_year: int) -> int:
+    """
+    Deslocamento ``k`` que alinha os dias da semana de dois anos.
+
+    O dia de índice ``i`` em ``year`` cai no mesmo dia da semana que o dia de
+    índice ``i + k`` em ``other_year``, com ``k`` entre -3 e 3.
+    """
+    offset = (date(year, 1, 1).weekday() - date(other_year, 1, 1).weekday()) % 7
+    return offset - 7 if offset > 3 else offset
+
+
+def stage_index(dates: np.ndarray, stages: List[Stage]) -> np.ndarray:
+    """
+    Localiza a etapa de cada data por busca binária nos limites das etapas.
+
+    Args:
+        dates: Array ``datetime64[D]`` de datas.
+        stages: Etapas do calendário, em qualquer ordem.
+
+    Returns:
+        Array com o índice em ``stages`` da etapa que contém cada data, ou
+        ``-1`` para datas fora de qualquer etapa.
+    """
+    if not stages:
+        return np.full(len(dates), -1, dtype=np.int64)
+
+    starts = np.array([stage.start_date for stage in stages], dtype="datetime64[D]")
+    ends = np.array([stage.end_date for stage in stages], dtype="datetime64[D]")
+    order = np.argsort(starts, kind="stable")
+
+    pos = np.searchsorted(starts[order], dates, side="right") - 1
+    candidate = order[np.clip(pos, 0, None)]
+    inside = (pos >= 0) & (dates <= ends[candidate])
+    return np.where(inside, candidate, -1)
+
+
+def assign_stages(calendar: CalendarData) -> CalendarData:
+    """Preenche ``Day.stage`` de todos os dias a partir das etapas do calendário."""
+    if not calendar.days:
+        return calendar
+
+    dates = np.array([day.date for day in calendar.days], dtype="datetime64[D]")
+    for day, idx in zip(calendar.days, stage_index(dates, calendar.stages)):
+        day.stage = calendar.stages[idx].id if idx >= 0 else None
+    return calendar
+
+
+def save_calendar_data(year: int, calendar_data: dict) -> AcademicCalendar:
+    """
+    Grava os dados do calendário do ano, criando-o se necessário.
+
+    Quando um calendário existente muda, envia ``calendar_data_changed`` na
+    mesma transação para que dependentes (como as cadernetas) registrem o
+    que precisa ser atualizado.
+    """
+    with transaction.atomic():
+        instance = AcademicCalendar.objects.select_for_update().filter(year=year).first()
+        if instance is None:
+            return AcademicCalendar.objects.create(year=year, calendar_data=calendar_data)
+
+        previous_data = instance.calendar_data
+        instance.calendar_data = calendar_data
+        instance.save(update_fields=["calendar_data", "updated_at"])
+        if previous_data != calendar_data:
+            calendar_data_changed.send(
+                sender=AcademicCalendar, calendar=instance, previous_data=previous_data)
+        return instance
+
+
+class AcademicCalendarDiffService:
+    """Compara dois calendários letivos dia a dia e etapa a etapa."""
+
+    def _month_day_keys(self, dates: np.ndarray) -> np.ndarray:
+        months = dates.astype("datetime64[M]")
+        month_numbers = months.astype(np.int64) % 12 + 1
+        day_numbers = (dates - months).astype(np.int64) + 1
+        return month_numbers * 100 + day_numbers
+
+    def _align(self, dates: np.ndarray, other_dates: np.ndarray,
+               align: DiffAlignment, offset: int) -> Tuple[np.ndarray, np.ndarray]:
+        if align == DiffAlignment.DATE:
+            _, idx, other_idx = np.intersect1d(
+                self._month_day_keys(dates),
+                self._month_day_keys(other_dates),
+                assume_unique=True,
+                return_indices=True,
+            )
+            return idx, other_idx
+
+        idx = np.arange(len(dates))
+        other_idx = idx + offset
+        valid = (other_idx >= 0) & (other_idx < len(other_dates))
+        return idx[valid], other_idx[valid]
+
+    def _project(self, other: date, year: int, other_year: int,
+                 align: DiffAlignment, offset: int) -> date:
+        """Projeta uma data do calendário de referência no ano comparado."""
+        if align == DiffAlignment.DATE:
+            if other.month == 2 and other.day == 29:
+                return date(year, 2, 28)
+            return other.replace(year=year)
+        delta = other - date(other_year, 1, 1)
+        return date(year, 1, 1) + delta - timedelta(days=offset)
+
+    def _stage_shifts(self, stages: List[dict], other_stages: List[dict], year: int,
+                      other_year: int, align: DiffAlignment, offset: int) -> List[StageShift]:
+        current = {s.id: s for s in (Stage(**stage) for stage in stages)}
+        previous = {s.id: s for s in (Stage(**stage) for stage in other_stages)}
+
+        shifts: List[StageShift] = []
+        for stage_id in sorted(current.keys() | previous.keys(), key=list(StageId).index):
+            stage: Optional[Stage] = current.get(stage_id)
+            other: Optional[Stage] = previous.get(stage_id)
+            shift = StageShift(id=stage_id)
+            if stage:
+                shift.start_date, shift.end_date = stage.start_date, stage.end_date
+            if other:
+                shift.other_start_date, shift.other_end_date = other.start_date, other.end_date
+            if stage and other:
+                shift.start_shift_days = (stage.start_date - self._project(
+                    other.start_date, year, other_year, align, offset)).days
+                shift.end_shift_days = (stage.end_date - self._project(
+                    other.end_date, year, other_year, align, offset)).days
+                if not shift.start_shift_days and not shift.end_shift_days:
+                    continue
+            shifts.append(shift)
+        return shifts
+
+    def diff(self, year: int, calendar_data: dict, other_year: int,
+             other_calendar_data: dict, align: DiffAlignment = DiffAlignment.DATE) -> CalendarDiff:
+        """
+        Calcula as diferenças de ``calendar_data`` em relação a ``other_calendar_data``.
+
+        Args:
+            year: Ano do calendário comparado.
+            calendar_data: Dados do calendário comparado.
+            other_year: Ano do calendário de referência.
+            other_calendar_data: Dados do calendário de referência.
+            align: Alinha os dias por mês/dia ou pela posição do dia da semana.
+
+        Returns:
+            Lista compacta de dias alterados e etapas deslocadas.
+        """
+        offset = weekday_offset(year, other_year) if align == DiffAlignment.WEEKDAY else 0
+
+        dates, types, labels = build_day_arrays(year, calendar_data.get("days", []))
+        other_dates, other_types, other_labels = build_day_arrays(
+            other_year, other_calendar_data.get("days", []))
+
+        idx, other_idx = self._align(dates, other_dates, align, offset)
+        type_changed = types[idx] != other_types[other_idx]
+        labels_changed = labels[idx] != other_labels[other_idx]
+        changed = np.flatnonzero(type_changed | labels_changed)
+
+        day_changes: List[DayChange] = []
+        for pos in changed:
+            i, j = idx[pos], other_idx[pos]
+            day_changes.append(DayChange(
+                date=str(dates[i]),
+                other_date=str(other_dates[j]),
+                type=types[i] or None,
+                other_type=other_types[j] or None,
+                labels_added=sorted(labels[i] - other_labels[j]),
+                labels_removed=sorted(other_labels[j] - labels[i]),
+            ))
+
+        stage_shifts = self._stage_shifts(
+            calendar_data.get("stages", []),
+            other_calendar_data.get("stages", []),
+            year, other_year, align, offset,
+        )
+
+        return CalendarDiff(
+            year=year,
+            other_year=other_year,
+            align=align,
+            offset_days=offset,
+            summary=CalendarDiffSummary(
+                changed_types=int(type_changed.sum()),
+                changed_labels=int(labels_changed.sum()),
+                shifted_stages=len(stage_shifts),
+            ),
+            days=day_changes,
+            stages=stage_shifts,
+        )
+
+
+class AcademicCalendarICSExporter:
+    """Gera o calendário letivo no formato iCalendar (RFC 5545) de forma incremental."""
+
+    DEFAULT_EXCLUDED_TYPES = (LegendType.SCHOOL_DAY.value, LegendType.NON_SCHOOL_DAY.value)
+    LINE_LIMIT = 75
+
+    def _escape(self, text: str) -> str:
+        return (
+            text.replace("\\", "\\\\")
+            .replace(";", "\\;")
+            .replace(",", "\\,")
+            .replace("\n", "\\n")
+        )
+
+    def _fold(self, line: str) -> str:
+        """Quebra linhas maiores que 75 octetos, como exige a RFC 5545."""
+        encoded = line.encode("utf-8")
+        if len(encoded) <= self.LINE_LIMIT:
+            return line + "\r\n"
+
+        parts, current, size = [], "", 0
+        for char in line:
+            char_size = len(char.encode("utf-8"))
+            limit = self.LINE_LIMIT if not parts else self.LINE_LIMIT - 1
+            if size + char_size > limit:
+                parts.append(current)
+                current, size = "", 0
+            current += char
+            size += char_size
+        parts.append(current)
+        return "\r\n ".join(parts) + "\r\n"
+
+    def _event(self, uid: str, start: date, end: date, summary: str,
+               category: str, stamp: str) -> str:
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{uid}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;VALUE=DATE:{start.strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{(end + timedelta(days=1)).strftime('%Y%m%d')}",
+            f"SUMMARY:{self._escape(summary)}",
+            f"CATEGORIES:{self._escape(category)}",
+            "TRANSP:TRANSPARENT",
+            "END:VEVENT",
+        ]
+        return "".join(self._fold(line) for line in lines)
+
+    def _day_runs(self, year: int, days: List[dict]) -> Iterator[Tuple[date, date, str, frozenset]]:
+        """Agrupa dias consecutivos com o mesmo tipo e os mesmos rótulos."""
+        dates, types, labels = build_day_arrays(year, days)
+        boundaries = np.flatnonzero(
+            (types[1:] != types[:-1]) | (labels[1:] != labels[:-1])) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(dates)])) - 1
+        for start, end in zip(starts, ends):
+            yield dates[start].item(), dates[end].item(), types[start], labels[start]
+
+    def iter_ics(self, year: int, calendar_data: dict, updated_at: Optional[datetime] = None,
+                 types: Optional[Iterable[str]] = None) -> Iterator[str]:
+        """
+        Produz o arquivo ICS em pedaços, um evento por vez.
+
+        Args:
+            year: Ano do calendário.
+            calendar_data: Dados do calendário (dias e etapas).
+            updated_at: Data da última alteração, usada como ``DTSTAMP``.
+            types: Tipos de dia exportados. Por padrão, todos exceto dias
+                letivos e não letivos comuns.
+
+        Yields:
+            Trechos do arquivo ICS já com quebras de linha CRLF.
+        """
+        stamp = (updated_at or datetime.now(timezone.utc)).astimezone(
+            timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        if types is None:
+            allowed = {t.value for t in LegendType} - set(self.DEFAULT_EXCLUDED_TYPES)
+        else:
+            allowed = set(types)
+
+        yield "".join(self._fold(line) for line in [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//Esmeraldinha//Calendario Letivo//PT-BR",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            f"X-WR-CALNAME:Calendário Letivo {year}",
+        ])
+
+        for stage in calendar_data.get("stages", []):
+            stage = Stage(**stage)
+            yield self._event(
+                uid=f"{year}-etapa-{stage.id.value}@esmeraldinha",
+                start=stage.start_date,
+                end=stage.end_date,
+                summary=f"{stage.id.value} Etapa",
+                category="etapa",
+                stamp=stamp,
+            )
+
+        for start, end, day_type, day_labels in self._day_runs(year, calendar_data.get("days", [])):
+            if day_type not in allowed:
+                continue
+            summary = ", ".join(sorted(day_labels)) or LegendType(day_type).label
+            yield self._event(
+                uid=f"{year}-{day_type}-{start.isoformat()}@esmeraldinha",
+                start=start,
+                end=end,
+                summary=summary,
+                category=day_type,
+                stamp=stamp,
+            )
+
+        yield self._fold("END:VCALENDAR")
+
+
+class AcademicCalendarCloneService:
+    """Monta o calendário de um ano a partir de outro, alinhando os dias da semana."""
+
+    HOLIDAY_TYPES = (
+        DayType.NATIONAL_HOLIDAY.value,
+        DayType.MUNICIPAL_HOLIDAY.value,
+        DayType.OPTIONAL_DAY.value,
+    )
+    NEIGHBOUR_WEEKS = (-7, 7, -14, 14)
+
+    def _shift_stages(self, stages: List[dict], year: int, source_year: int, offset: int) -> List[Stage]:
+        delta = date(year, 1, 1) - date(source_year, 1, 1) - timedelta(days=offset)
+        first, last = date(year, 1, 1), date(year, 12, 31)
+        shifted = []
+        for stage in (Stage(**stage) for stage in stages):
+            shifted.append(Stage(
+                id=stage.id,
+                start_date=max(stage.start_date + delta, first),
+                end_date=min(stage.end_date + delta, last),
+            ))
+        return shifted
+
+    def clone(self, year: int, source_year: int, source_data: dict,
+              default_type: str = DayType.NON_SCHOOL_DAY.value) -> Tuple[List[Day], List[Stage], List[CloneReviewItem]]:
+        """
+        Copia os dias de ``source_data`` para ``year`` mantendo o dia da semana.
+
+        Feriados do ano de origem não são copiados: o dia recebe o tipo do
+        mesmo dia da semana numa semana vizinha e os feriados de ``year``
+        (fixos e móveis) são recalculados sobre o resultado.
+
+        Args:
+            year: Ano do calendário gerado.
+            source_year: Ano do calendário de origem.
+            source_data: Dados do calendário de origem.
+            default_type: Tipo usado quando nenhum dia vizinho serve de referência.
+
+        Returns:
+            Tupla ``(days, stages, review)`` com os dias do ano, as etapas
+            deslocadas e os dias que precisam de revisão manual.
+        """
+        offset = weekday_offset(year, source_year)
+        dates = year_dates(year)
+        source_dates, source_types, source_labels = build_day_arrays(
+            source_year, source_data.get("days", []))
+
+        source_idx = np.arange(len(dates)) + offset
+        mapped = (source_idx >= 0) & (source_idx < len(source_dates))
+        safe_idx = np.clip(source_idx, 0, len(source_dates) - 1)
+
+        types = np.where(mapped, source_types[safe_idx], "").astype(object)
+        types[types == ""] = default_type
+        labels = np.full(len(dates), frozenset(), dtype=object)
+        labels[mapped] = source_labels[safe_idx[mapped]]
+
+        was_holiday = mapped & np.isin(source_types[safe_idx], self.HOLIDAY_TYPES)
+        usable = mapped & ~was_holiday
+        reasons = {}
+        for i in np.flatnonzero(~usable):
+            reasons[i] = CloneReviewReason.HOLIDAY_REMOVED if mapped[i] else CloneReviewReason.UNMAPPED
+            neighbours = [i + step for step in self.NEIGHBOUR_WEEKS
+                          if 0 <= i + step < len(dates) and usable[i + step]]
+            types[i] = types[neighbours[0]] if neighbours else default_type
+            labels[i] = frozenset()
+
+        for holiday in holiday_days(year):
+            i = (np.datetime64(holiday.date, "D") - dates[0]).astype(np.int64)
+            if was_holiday[i]:
+                reasons.pop(i, None)
+            elif types[i] == DayType.SCHOOL_DAY.value:
+                reasons[i] = CloneReviewReason.HOLIDAY_ON_SCHOOL_DAY
+            types[i] = holiday.type.value
+            labels[i] = frozenset(holiday.labels)
+
+        days = [
+            Day(date=str(day), type=day_type, labels=sorted(day_labels))
+            for day, day_type, day_labels in zip(dates, types, labels)
+        ]
+        review = [
+            CloneReviewItem(
+                date=days[i].date,
+                source_date=str(source_dates[source_idx[i]]) if mapped[i] else None,
+                reason=reason,
+                type=days[i].type,
+                labels=days[i].labels,
+            )
+            for i, reason in sorted(reasons.items())
+        ]
+        stages = self._shift_stages(source_data.get("stages", []), year, source_year, offset)
+        return days, stages, review
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+
+# Enviado quando os dados de um calendário existente são substituídos.
+# Argumentos: ``calendar`` (AcademicCalendar já salvo) e ``previous_data``.
+calendar_data_changed = Signal()
@@ -1,3 +1,458 @@
-from django.test import TestCase
+import numpy as np
+from datetime import date, timedelta
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from apps.academic_calendars.holidays import (
+    easter_sunday,
+    holiday_days,
+    holidays_for_year,
+    national_holidays,
+)
+from apps.academic_calendars.models import AcademicCalendar
+from apps.academic_calendars.schemas import CalendarData, CloneReviewReason, DayType, DiffAlignment, Holiday, Stage
+from apps.academic_calendars.services import (
+    AcademicCalendarCloneService,
+    AcademicCalendarDiffService,
+    AcademicCalendarICSExporter,
+    assign_stages,
+    build_day_arrays,
+    stage_index,
+)
+
+
+def _calendar_data(year, days, stages=None):
+    return {
+        'year': year,
+        'stages': stages or [],
+        'days': days,
+        'legend': [],
+        'monthly_meta': None,
+    }
+
+
+def _weekday_calendar_data(year, stages=None):
+    """Calendário com dias úteis letivos, fins de semana não letivos e os feriados do ano."""
+    holidays = {day.date: day for day in holiday_days(year)}
+    days = []
+    current = date(year, 1, 1)
+    while current.year == year:
+        holiday = holidays.get(current.isoformat())
+        if holiday:
+            days.append(holiday.model_dump(mode='json'))
+        else:
+            day_type = 'letivo' if current.weekday() < 5 else 'nao_letivo'
+            days.append({'date': current.isoformat(), 'type': day_type, 'labels': []})
+        current += timedelta(days=1)
+    return _calendar_data(year, days, stages=stages)
+
+
+class BuildDayArraysTestCase(SimpleTestCase):
+
+    def test_days_are_placed_by_day_of_year(self):
+        """Dias informados ocupam sua posição no ano e os demais ficam vazios"""
+        dates, types, labels = build_day_arrays(2025, [
+            {'date': '2025-01-01', 'type': 'feriado_nacional', 'labels': ['Ano Novo']},
+            {'date': '2025-12-31', 'type': 'letivo', 'labels': []},
+        ])
+
+        self.assertEqual(len(dates), 365)
+        self.assertEqual(types[0], 'feriado_nacional')
+        self.assertEqual(labels[0], frozenset({'Ano Novo'}))
+        self.assertEqual(types[-1], 'letivo')
+        self.assertEqual(types[1], '')
+
+    def test_days_outside_the_year_are_ignored(self):
+        """Dias de outro ano não devem ser posicionados no array"""
+        _, types, _ = build_day_arrays(2024, [
+            {'date': '2025-01-01', 'type': 'letivo', 'labels': []},
+        ])
+
+        self.assertEqual(len(types), 366)
+        self.assertTrue((types == '').all())
+
+
+class AcademicCalendarDiffServiceTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.service = AcademicCalendarDiffService()
+
+    def test_diff_by_date_reports_type_and_label_changes(self):
+        """Alinhamento por data compara o mesmo mês/dia nos dois anos"""
+        current = _calendar_data(2026, [
+            {'date': '2026-04-21', 'type': 'feriado_nacional', 'labels': ['Tiradentes']},
+            {'date': '2026-05-01', 'type': 'feriado_nacional', 'labels': ['Dia do Trabalhador']},
+        ])
+        previous = _calendar_data(2025, [
+            {'date': '2025-04-21', 'type': 'letivo', 'labels': []},
+            {'date': '2025-05-01', 'type': 'feriado_nacional', 'labels': ['Dia do Trabalhador']},
+        ])
+
+        result = self.service.diff(2026, current, 2025, previous)
+
+        self.assertEqual(result.summary.changed_types, 1)
+        self.assertEqual(result.summary.changed_labels, 1)
+        self.assertEqual(len(result.days), 1)
+        change = result.days[0]
+        self.assertEqual(change.date, '2026-04-21')
+        self.assertEqual(change.other_date, '2025-04-21')
+        self.assertEqual(change.other_type.value, 'letivo')
+        self.assertEqual(change.labels_added, ['Tiradentes'])
+
+    def test_diff_by_weekday_aligns_same_weekdays(self):
+        """Alinhamento por dia da semana compara segundas com segundas"""
+        current = _calendar_data(2026, [
+            {'date': '2026-01-05', 'type': 'letivo', 'labels': []},
+        ])
+        previous = _calendar_data(2025, [
+            {'date': '2025-01-06', 'type': 'letivo', 'labels': []},
+        ])
+
+        result = self.service.diff(
+            2026, current, 2025, previous, DiffAlignment.WEEKDAY)
+
+        self.assertEqual(result.offset_days, 1)
+        self.assertEqual(result.days, [])
+
+    def test_diff_reports_stage_boundary_shifts(self):
+        """Etapas com início ou fim deslocados aparecem na diferença"""
+        current = _calendar_data(2026, [], stages=[
+            {'id': 'I', 'start_date': '2026-02-16', 'end_date': '2026-05-08'},
+            {'id': 'II', 'start_date': '2026-05-11', 'end_date': '2026-07-10'},
+        ])
+        previous = _calendar_data(2025, [], stages=[
+            {'id': 'I', 'start_date': '2025-02-17', 'end_date': '2025-05-08'},
+            {'id': 'II', 'start_date': '2025-05-11', 'end_date': '2025-07-10'},
+        ])
+
+        result = self.service.diff(2026, current, 2025, previous)
+
+        self.assertEqual(result.summary.shifted_stages, 1)
+        self.assertEqual(result.stages[0].id.value, 'I')
+        self.assertEqual(result.stages[0].start_shift_days, -1)
+        self.assertEqual(result.stages[0].end_shift_days, 0)
+
+
+class AcademicCalendarDiffAPITestCase(APITestCase):
+
+    def setUp(self):
+        AcademicCalendar.objects.create(year=2025, calendar_data=_calendar_data(2025, [
+            {'date': '2025-03-03', 'type': 'feriado_nacional', 'labels': ['Carnaval']},
+        ]))
+        AcademicCalendar.objects.create(year=2026, calendar_data=_calendar_data(2026, [
+            {'date': '2026-03-03', 'type': 'letivo', 'labels': []},
+        ]))
+
+    def test_diff_endpoint_returns_changes(self):
+        """GET /api/academic-calendars/{year}/diff/{other_year}/ retorna a lista de mudanças"""
+        url = reverse('academiccalendar-diff', kwargs={'year': 2026, 'other_year': 2025})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['summary']['changed_types'], 1)
+        self.assertEqual(data['days'][0]['labels_removed'], ['Carnaval'])
+
+    def test_diff_endpoint_returns_404_for_missing_calendar(self):
+        """Comparar com um ano sem calendário retorna 404"""
+        url = reverse('academiccalendar-diff', kwargs={'year': 2026, 'other_year': 2020})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_diff_endpoint_rejects_invalid_alignment(self):
+        """Alinhamento desconhecido retorna 400"""
+        url = reverse('academiccalendar-diff', kwargs={'year': 2026, 'other_year': 2025})
+        response = self.client.get(url, {'align': 'lua'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AcademicCalendarICSExporterTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.exporter = AcademicCalendarICSExporter()
+        self.calendar_data = _calendar_data(2025, [
+            {'date': '2025-03-03', 'type': 'feriado_nacional', 'labels': ['Carnaval']},
+            {'date': '2025-03-04', 'type': 'feriado_nacional', 'labels': ['Carnaval']},
+            {'date': '2025-03-05', 'type': 'ponto_facultativo', 'labels': []},
+            {'date': '2025-03-06', 'type': 'letivo', 'labels': []},
+        ], stages=[
+            {'id': 'I', 'start_date': '2025-02-17', 'end_date': '2025-05-08'},
+        ])
+
+    def _export(self, **kwargs):
+        return ''.join(self.exporter.iter_ics(2025, self.calendar_data, **kwargs))
+
+    def test_consecutive_days_are_coalesced_into_one_event(self):
+        """Dias consecutivos do mesmo tipo viram um único evento de vários dias"""
+        ics = self._export()
+
+        self.assertIn('DTSTART;VALUE=DATE:20250303\r\nDTEND;VALUE=DATE:20250305', ics)
+        self.assertEqual(ics.count('SUMMARY:Carnaval'), 1)
+        self.assertIn('SUMMARY:Ponto Facultativo', ics)
+
+    def test_school_days_are_excluded_by_default(self):
+        """Dias letivos e não letivos comuns não são exportados por padrão"""
+        ics = self._export()
+
+        self.assertNotIn('CATEGORIES:letivo', ics)
+        self.assertNotIn('CATEGORIES:nao_letivo', ics)
+        self.assertIn('CATEGORIES:letivo', self._export(types=['letivo']))
+
+    def test_stages_are_exported_as_events(self):
+        """Etapas aparecem como eventos com fim exclusivo"""
+        ics = self._export()
+
+        self.assertIn('SUMMARY:I Etapa', ics)
+        self.assertIn('DTEND;VALUE=DATE:20250509', ics)
+        self.assertTrue(ics.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(ics.endswith('END:VCALENDAR\r\n'))
+
+    def test_long_lines_are_folded(self):
+        """Linhas com mais de 75 octetos são quebradas com CRLF + espaço"""
+        folded = self.exporter._fold('SUMMARY:' + 'ç' * 80)
+
+        for line in folded.split('\r\n'):
+            self.assertLessEqual(len(line.encode('utf-8')), 75)
+        self.assertEqual(folded.replace('\r\n ', ''), 'SUMMARY:' + 'ç' * 80 + '\r\n')
+
+
+class AcademicCalendarICSExportAPITestCase(APITestCase):
+
+    def setUp(self):
+        AcademicCalendar.objects.create(year=2025, calendar_data=_calendar_data(2025, [
+            {'date': '2025-12-25', 'type': 'feriado_nacional', 'labels': ['Natal']},
+        ]))
+        self.url = reverse('academiccalendar-export-ics', kwargs={'year': 2025})
+
+    def test_export_streams_ics_with_etag(self):
+        """GET /api/academic-calendars/{year}/export.ics/ retorna o ICS em streaming"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        self.assertIn('ETag', response)
+        body = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('SUMMARY:Natal', body)
+
+    def test_export_returns_304_for_matching_etag(self):
+        """Uma nova requisição com o mesmo ETag recebe 304"""
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_export_etag_changes_when_calendar_is_updated(self):
+        """Salvar o calendário invalida o ETag anterior"""
+        etag = self.client.get(self.url)['ETag']
+        calendar = AcademicCalendar.objects.get(year=2025)
+        calendar.calendar_data = _calendar_data(2025, [])
+        calendar.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_export_returns_404_for_missing_calendar(self):
+        """Exportar um ano sem calendário retorna 404"""
+        url = reverse('academiccalendar-export-ics', kwargs={'year': 2030})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_rejects_invalid_types(self):
+        """Tipos de dia desconhecidos retornam 400"""
+        response = self.client.get(self.url, {'types': 'letivo,abc'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StageTaggingTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.stages = [
+            Stage(id='II', start_date='2025-05-12', end_date='2025-07-11'),
+            Stage(id='I', start_date='2025-02-17', end_date='2025-05-09'),
+        ]
+
+    def test_stage_index_finds_stage_of_each_date(self):
+        """A busca binária localiza a etapa mesmo com etapas fora de ordem"""
+        dates = np.array(
+            ['2025-01-10', '2025-02-17', '2025-05-09', '2025-05-10', '2025-07-11'],
+            dtype='datetime64[D]',
+        )
+
+        result = stage_index(dates, self.stages)
+
+        self.assertEqual(result.tolist(), [-1, 1, 1, -1, 0])
+
+    def test_stage_index_without_stages_returns_no_stage(self):
+        """Sem etapas, nenhuma data recebe etapa"""
+        dates = np.array(['2025-03-01'], dtype='datetime64[D]')
+
+        self.assertEqual(stage_index(dates, []).tolist(), [-1])
+
+    def test_assign_stages_tags_every_day(self):
+        """Todos os dias do calendário recebem a etapa correspondente"""
+        calendar = CalendarData(**_calendar_data(2025, [
+            {'date': '2025-02-16', 'type': 'nao_letivo', 'labels': []},
+            {'date': '2025-03-10', 'type': 'letivo', 'labels': [], 'stage': 'IV'},
+            {'date': '2025-06-02', 'type': 'letivo', 'labels': []},
+        ], stages=[stage.model_dump(mode='json') for stage in self.stages]))
+
+        assign_stages(calendar)
+
+        self.assertEqual(
+            [day.stage.value if day.stage else None for day in calendar.days],
+            [None, 'I', 'II'],
+        )
+
+
+class AcademicCalendarStageTaggingAPITestCase(APITestCase):
+
+    def test_update_tags_days_with_stages(self):
+        """PUT /api/academic-calendars/{year}/ grava os dias com a etapa preenchida"""
+        url = reverse('academiccalendar-detail', kwargs={'year': 2025})
+        payload = {
+            'year': 2025,
+            'calendar_data': _calendar_data(2025, [
+                {'date': '2025-03-10', 'type': 'letivo', 'labels': []},
+            ], stages=[
+                {'id': 'I', 'start_date': '2025-02-17', 'end_date': '2025-05-09'},
+            ]),
+        }
+
+        response = self.client.put(url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        calendar = AcademicCalendar.objects.get(year=2025)
+        self.assertEqual(calendar.calendar_data['days'][0]['stage'], 'I')
+
+
+class HolidayEngineTestCase(SimpleTestCase):
+
+    def test_easter_sunday_known_dates(self):
+        """O domingo de Páscoa confere com datas conhecidas"""
+        self.assertEqual(easter_sunday(2024), date(2024, 3, 31))
+        self.assertEqual(easter_sunday(2025), date(2025, 4, 20))
+        self.assertEqual(easter_sunday(2026), date(2026, 4, 5))
+
+    def test_movable_holidays_are_derived_from_easter(self):
+        """Carnaval, Sexta-feira Santa e Corpus Christi acompanham a Páscoa"""
+        holidays = {h.date: h for h in national_holidays(2026) if h.movable}
+
+        self.assertEqual(holidays[date(2026, 2, 16)].label, 'Carnaval')
+        self.assertEqual(holidays[date(2026, 2, 17)].label, 'Carnaval')
+        self.assertEqual(holidays[date(2026, 4, 3)].label, 'Sexta-feira Santa')
+        self.assertEqual(holidays[date(2026, 6, 4)].label, 'Corpus Christi')
+
+    def test_black_consciousness_day_is_national_since_2024(self):
+        """Consciência Negra só é feriado nacional a partir de 2024"""
+        self.assertIn(date(2024, 11, 20), {h.date for h in national_holidays(2024)})
+        self.assertNotIn(date(2023, 11, 20), {h.date for h in national_holidays(2023)})
+
+    def test_national_holidays_are_memoized(self):
+        """O cálculo de um ano é reaproveitado entre chamadas"""
+        self.assertIs(national_holidays(2027), national_holidays(2027))
+
+    @override_settings(MUNICIPAL_HOLIDAYS=[(8, 15, 'Padroeira')])
+    def test_municipal_holidays_are_layered_from_settings(self):
+        """Feriados municipais configurados entram depois dos nacionais"""
+        holidays = holidays_for_year(2026)
+
+        self.assertEqual(holidays[-1].date, date(2026, 8, 15))
+        self.assertEqual(holidays[-1].type, DayType.MUNICIPAL_HOLIDAY)
+
+    def test_holiday_days_merges_holidays_on_the_same_date(self):
+        """Feriados na mesma data viram um único dia com os dois rótulos"""
+        days = holiday_days(2026, [
+            Holiday(date=date(2026, 4, 21), type=DayType.NATIONAL_HOLIDAY, label='Tiradentes'),
+            Holiday(date=date(2026, 4, 21), type=DayType.MUNICIPAL_HOLIDAY, label='Padroeira'),
+        ])
+
+        self.assertEqual(len(days), 1)
+        self.assertEqual(days[0].type, DayType.MUNICIPAL_HOLIDAY)
+        self.assertEqual(days[0].labels, ['Tiradentes', 'Padroeira'])
+
+
+class AcademicCalendarInitializeAPITestCase(APITestCase):
+
+    def test_initialize_applies_holidays_without_fixture(self):
+        """POST /api/academic-calendars/{year}/initialize/ aplica feriados de anos sem fixture"""
+        url = reverse('academiccalendar-initialize-calendar', kwargs={'year': 2026})
+
+        response = self.client.post(url, {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        days = {d['date']: d for d in response.json()['calendar_data']['days']}
+        self.assertEqual(len(days), 365)
+        self.assertEqual(days['2026-02-17']['labels'], ['Carnaval'])
+        self.assertEqual(days['2026-06-04']['type'], 'feriado_nacional')
+        self.assertEqual(days['2026-03-10']['type'], 'nao_letivo')
+
+
+class AcademicCalendarCloneServiceTestCase(SimpleTestCase):
+
+    def setUp(self):
+        source = _weekday_calendar_data(2025, stages=[
+            {'id': 'I', 'start_date': '2025-02-17', 'end_date': '2025-05-09'},
+        ])
+        self.days, self.stages, self.review = AcademicCalendarCloneService().clone(
+            2026, 2025, source)
+        self.by_date = {day.date: day for day in self.days}
+
+    def test_clone_keeps_weekdays_aligned(self):
+        """Dias úteis continuam letivos e fins de semana não letivos"""
+        self.assertEqual(len(self.days), 365)
+        self.assertEqual(self.by_date['2026-03-10'].type, DayType.SCHOOL_DAY)
+        self.assertEqual(self.by_date['2026-03-14'].type, DayType.NON_SCHOOL_DAY)
+
+    def test_clone_recomputes_holidays_for_target_year(self):
+        """Feriados fixos ficam na data e os móveis são recalculados"""
+        self.assertEqual(self.by_date['2026-04-21'].labels, ['Dia de Tiradentes'])
+        self.assertEqual(self.by_date['2026-06-04'].labels, ['Corpus Christi'])
+        self.assertEqual(self.by_date['2026-02-16'].labels, ['Carnaval'])
+
+    def test_clone_drops_source_holidays_and_flags_them(self):
+        """O Carnaval de 2025 não é copiado para a segunda-feira equivalente de 2026"""
+        self.assertEqual(self.by_date['2026-03-02'].type, DayType.SCHOOL_DAY)
+        reasons = {item.date: item.reason for item in self.review}
+        self.assertEqual(reasons['2026-03-02'], CloneReviewReason.HOLIDAY_REMOVED)
+        self.assertEqual(reasons['2026-06-04'], CloneReviewReason.HOLIDAY_ON_SCHOOL_DAY)
+
+    def test_clone_shifts_stages_by_weekday(self):
+        """Etapas mantêm o dia da semana de início e fim"""
+        self.assertEqual(self.stages[0].start_date, date(2026, 2, 16))
+        self.assertEqual(self.stages[0].end_date, date(2026, 5, 8))
+
+
+class AcademicCalendarCloneAPITestCase(APITestCase):
+
+    def setUp(self):
+        AcademicCalendar.objects.create(year=2025, calendar_data=_weekday_calendar_data(2025))
+
+    def test_clone_endpoint_creates_calendar_and_returns_review(self):
+        """POST /api/academic-calendars/{year}/clone-from/{source_year}/ cria o calendário"""
+        url = reverse('academiccalendar-clone-from', kwargs={'year': 2026, 'source_year': 2025})
+
+        response = self.client.post(url, {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['offset_days'], 1)
+        self.assertGreater(data['review_counts']['holiday_removed'], 0)
+        calendar = AcademicCalendar.objects.get(year=2026)
+        self.assertEqual(len(calendar.calendar_data['days']), 365)
+
+    def test_clone_endpoint_returns_404_for_missing_source(self):
+        """Clonar de um ano sem calendário retorna 404"""
+        url = reverse('academiccalendar-clone-from', kwargs={'year': 2026, 'source_year': 2019})
+
+        response = self.client.post(url, {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -3,11 +3,19 @@ from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework import viewsets
 from rest_framework.decorators import action
-from apps.academic_calendars.services import AcademicCalendarPDFProcessor
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from apps.academic_calendars.holidays import holiday_days
+from apps.academic_calendars.renderers import ICalendarRenderer
+from apps.academic_calendars.services import AcademicCalendarPDFProcessor, AcademicCalendarCloneService, AcademicCalendarDiffService, AcademicCalendarICSExporter, assign_stages, save_calendar_data, weekday_offset
 from apps.academic_calendars.models import AcademicCalendar, Legend, CalendarDay
 from apps.academic_calendars.serializers import AcademicCalendarSerializer, AcademicCalendarCreateSerializer, LegendSerializer, AcademicCalendarSummarySerializer
-from apps.academic_calendars.schemas import CalendarData, Day, DayType, LegendItem
-from drf_spectacular.utils import extend_schema, OpenApiResponse, extend_schema_view
+from apps.academic_calendars.schemas import CalendarClone, CalendarData, CalendarDiff, CloneReviewReason, Day, DayType, DiffAlignment, LegendItem
+from apps.gradebooks.schemas import CascadeDeletionJob
+from apps.gradebooks.services import CascadeDeletionService
+from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter, extend_schema_view
 from datetime import date, timedelta
 from typing import List
 from pathlib import Path
@@ -20,7 +28,6 @@ import json
     create=extend_schema(tags=['Calendário Acadêmico']),
     update=extend_schema(tags=['Calendário Acadêmico']),
     partial_update=extend_schema(tags=['Calendário Acadêmico']),
-    destroy=extend_schema(tags=['Calendário Acadêmico']),
 )
 class AcademicCalendarViewSet(viewsets.ModelViewSet):
     queryset = AcademicCalendar.objects.all()
@@ -65,14 +72,31 @@ class AcademicCalendarViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        instance, _ = AcademicCalendar.objects.update_or_create(
-            year=year,
-            defaults={'calendar_data': data['calendar_data']}
-        )
+        calendar = assign_stages(CalendarData(**data['calendar_data']))
+        instance = save_calendar_data(year, calendar.model_dump(mode="json"))
 
         output_serializer = self.get_serializer(instance)
         return Response(output_serializer.data)
 
+    @extend_schema(
+        summary='Deleta um calendário',
+        description='Agenda a exclusão do calendário com todas as cadernetas e aulas que o usam. A remoção roda em segundo plano, em lotes de tamanho fixo com transações curtas; acompanhe o andamento em GET /api/gradebooks/events/?job_id= com o job_id retornado.',
+        responses={
+            status.HTTP_202_ACCEPTED: OpenApiResponse(
+                response=CascadeDeletionJob,
+                description='Exclusão agendada',
+            ),
+            status.HTTP_404_NOT_FOUND: OpenApiResponse(
+                description='Calendário não encontrado',
+            ),
+        },
+        tags=['Calendário Acadêmico'],
+    )
+    def destroy(self, request, *args, **kwargs):
+        service = CascadeDeletionService()
+        deletion = service.schedule(self.get_object())
+        return Response(service.job(deletion).model_dump(mode="json"), status=status.HTTP_202_ACCEPTED)
+
     def _generate_all_days_of_year(self, year: int, default_type: str = 'nao_letivo') -> List[Day]:
         days: List[Day] = []
         start_date = date(year, 1, 1)
@@ -141,6 +165,7 @@ class AcademicCalendarViewSet(viewsets.ModelViewSet):
         with open(days_fixture, "r", encoding="utf-8") as f:
             days_data = json.load(f)
 
+        new_days = []
         for entry in days_data:
             fields = entry.get("fields", {})
             date_value = fields.get("date")
@@ -152,14 +177,14 @@ class AcademicCalendarViewSet(viewsets.ModelViewSet):
                 continue
             if date_obj in existing_dates:
                 continue
-            CalendarDay.objects.update_or_create(
+            existing_dates.add(date_obj)
+            new_days.append(CalendarDay(
                 date=date_obj,
                 year=fields.get("year", year),
-                defaults={
-                    "type": fields.get("type"),
-                    "labels": fields.get("labels", []),
-                },
-            )
+                type=fields.get("type"),
+                labels=fields.get("labels", []),
+            ))
+        CalendarDay.objects.bulk_create(new_days, ignore_conflicts=True)
 
     def _get_fixture_days(self, year: int) -> List[Day]:
         """Retorna dias de fixture convertidos para o schema."""
@@ -190,6 +215,10 @@ class AcademicCalendarViewSet(viewsets.ModelViewSet):
             default_legend_type
         )
 
+        holiday_days_dict = {
+            day.date: day for day in holiday_days(year)
+        }
+
         fixture_days = self._get_fixture_days(year)
         fixture_days_dict = {
             day.date: day for day in fixture_days
@@ -205,19 +234,21 @@ class AcademicCalendarViewSet(viewsets.ModelViewSet):
                 calendar_days.append(processed_days_dict[day.date])
             elif day.date in fixture_days_dict:
                 calendar_days.append(fixture_days_dict[day.date])
+            elif day.date in holiday_days_dict:
+                calendar_days.append(holiday_days_dict[day.date])
             else:
                 calendar_days.append(day)
 
         used_types = {d.type for d in calendar_days}
         legends = self._get_legends_from_db(list(used_types))
 
-        return CalendarData(
+        return assign_stages(CalendarData(
             year=year,
             stages=stages or [],
             days=calendar_days,
             legend=legends,
             monthly_meta=monthly_meta,
-        )
+        ))
 
     @extend_schema(
         request={
@@ -244,7 +275,7 @@ class AcademicCalendarViewSet(viewsets.ModelViewSet):
     )
     @action(detail=True, methods=['post'], url_path='initialize', parser_classes=[JSONParser])
     def initialize_calendar(self, request, year=None):
-        """Cria ou reseta o calendário de um ano com todos os dias não letivos, aplicando fixtures."""
+        """Cria ou reseta o calendário de um ano com todos os dias não letivos, aplicando feriados e fixtures."""
         target_year = int(year) if year is not None else None
         if target_year is None:
             return Response({'error': 'Ano não informado na URL.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -269,10 +300,7 @@ class AcademicCalendarViewSet(viewsets.ModelViewSet):
             monthly_meta=None,
         )
 
-        instance, _ = AcademicCalendar.objects.update_or_create(
-            year=target_year,
-            defaults={'calendar_data': result.model_dump(mode="json")}
-        )
+        instance = save_calendar_data(target_year, result.model_dump(mode="json"))
 
         output_serializer = self.get_serializer(instance)
         return Response(output_serializer.data, status=status.HTTP_200_OK)
@@ -368,8 +396,7 @@ class AcademicCalendarViewSet(viewsets.ModelViewSet):
                 monthly_meta=getattr(processed_data, 'monthly_meta', None),
             )
 
-            instance.calendar_data = result.model_dump(mode="json")
-            instance.save(update_fields=["calendar_data"])
+            instance = save_calendar_data(instance.year, result.model_dump(mode="json"))
 
             output_serializer = self.get_serializer(instance)
 
@@ -381,6 +408,217 @@ class AcademicCalendarViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='align',
+                type=str,
+                location='query',
+                enum=[a.value for a in DiffAlignment],
+                description='Alinhamento dos dias: por mês/dia (date) ou por dia da semana (weekday)'
+            ),
+        ],
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response=CalendarDiff,
+                description='Diferenças entre os calendários'
+            ),
+            status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                description='Alinhamento inválido'
+            ),
+            status.HTTP_404_NOT_FOUND: OpenApiResponse(
+                description='Calendário não encontrado'
+            ),
+        },
+        tags=['Calendário Acadêmico']
+    )
+    @action(detail=True, methods=['get'], url_path=r'diff/(?P<other_year>\d{4})')
+    def diff(self, request, year=None, other_year=None):
+        """Compara o calendário do ano com o de outro ano, dia a dia e por etapa."""
+        try:
+            align = DiffAlignment(request.query_params.get('align', DiffAlignment.DATE.value))
+        except ValueError:
+            return Response(
+                {'error': f"Alinhamento inválido: {request.query_params.get('align')}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        target_year, reference_year = int(year), int(other_year)
+        calendars = {
+            calendar.year: calendar.calendar_data
+            for calendar in AcademicCalendar.objects
+            .filter(year__in=[target_year, reference_year])
+            .only('year', 'calendar_data')
+        }
+        missing = [y for y in (target_year, reference_year) if y not in calendars]
+        if missing:
+            return Response(
+                {'error': f'Calendário {missing[0]} não encontrado.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        result = AcademicCalendarDiffService().diff(
+            target_year,
+            calendars[target_year],
+            reference_year,
+            calendars[reference_year],
+            align,
+        )
+        return Response(result.model_dump(mode="json"), status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='types',
+                type=str,
+                location='query',
+                description='Tipos de dia exportados, separados por vírgula (padrão: todos exceto letivo e nao_letivo)'
+            ),
+        ],
+        responses={
+            (status.HTTP_200_OK, 'text/calendar'): OpenApiResponse(
+                description='Calendário no formato iCalendar'
+            ),
+            status.HTTP_304_NOT_MODIFIED: OpenApiResponse(
+                description='Calendário não mudou desde o ETag informado'
+            ),
+            status.HTTP_404_NOT_FOUND: OpenApiResponse(
+                description='Calendário não encontrado'
+            ),
+        },
+        tags=['Calendário Acadêmico']
+    )
+    @action(detail=True, methods=['get'], url_path=r'export\.ics',
+            renderer_classes=[JSONRenderer, ICalendarRenderer])
+    def export_ics(self, request, year=None):
+        """Exporta o calendário em iCalendar, com dias consecutivos do mesmo tipo agrupados."""
+        target_year = int(year)
+        types_param = request.query_params.get('types')
+        types = sorted({t for t in types_param.split(',') if t}) if types_param else None
+        invalid_types = [t for t in types or [] if t not in DayType._value2member_map_]
+        if invalid_types:
+            return Response(
+                {'error': f'Tipos de dia inválidos: {", ".join(invalid_types)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        updated_at = (
+            AcademicCalendar.objects
+            .filter(year=target_year)
+            .values_list('updated_at', flat=True)
+            .first()
+        )
+        if updated_at is None:
+            return Response(
+                {'error': f'Calendário {target_year} não encontrado.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        last_modified = int(updated_at.timestamp())
+        etag = f'"{target_year}-{updated_at.timestamp():.6f}-{"+".join(types or [])}"'
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        calendar_data = (
+            AcademicCalendar.objects
+            .filter(year=target_year)
+            .values_list('calendar_data', flat=True)
+            .first()
+        )
+        exporter = AcademicCalendarICSExporter()
+        response = StreamingHttpResponse(
+            exporter.iter_ics(target_year, calendar_data, updated_at=updated_at, types=types),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'inline; filename="calendario-{target_year}.ics"'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    @extend_schema(
+        request={
+            'application/json': {
+                'type': 'object',
+                'properties': {
+                    'default_legend_type': {
+                        'type': 'string',
+                        'description': 'Tipo de legenda para dias sem correspondente no calendário de origem (ex: letivo, nao_letivo)',
+                    },
+                },
+            },
+        },
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response=CalendarClone,
+                description='Calendário clonado, com os dias que precisam de revisão',
+            ),
+            status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                description='Parâmetros inválidos',
+            ),
+            status.HTTP_404_NOT_FOUND: OpenApiResponse(
+                description='Calendário de origem não encontrado',
+            ),
+        },
+        tags=['Calendário Acadêmico'],
+    )
+    @action(detail=True, methods=['post'], url_path=r'clone-from/(?P<source_year>\d{4})', parser_classes=[JSONParser])
+    def clone_from(self, request, year=None, source_year=None):
+        """Cria ou reseta o calendário do ano a partir de outro ano, alinhando os dias da semana."""
+        target_year, origin_year = int(year), int(source_year)
+        if target_year == origin_year:
+            return Response(
+                {'error': 'O ano de origem deve ser diferente do ano de destino.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        default_legend_type = request.data.get(
+            'default_legend_type', 'nao_letivo')
+        try:
+            DayType(default_legend_type)
+        except ValueError:
+            return Response(
+                {'error': f'Tipo de legenda padrão inválido: {default_legend_type}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        source_data = (
+            AcademicCalendar.objects
+            .filter(year=origin_year)
+            .values_list('calendar_data', flat=True)
+            .first()
+        )
+        if source_data is None:
+            return Response(
+                {'error': f'Calendário {origin_year} não encontrado.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        days, stages, review = AcademicCalendarCloneService().clone(
+            target_year, origin_year, source_data, default_legend_type)
+        result = self._build_result(
+            year=target_year,
+            default_legend_type=default_legend_type,
+            processed_days=days,
+            stages=stages,
+            monthly_meta=None,
+        )
+        save_calendar_data(target_year, result.model_dump(mode="json"))
+
+        clone = CalendarClone(
+            year=target_year,
+            source_year=origin_year,
+            offset_days=weekday_offset(target_year, origin_year),
+            stages=stages,
+            review_counts={
+                reason: sum(1 for item in review if item.reason == reason)
+                for reason in CloneReviewReason
+            },
+            days_to_review=review,
+        )
+        return Response(clone.model_dump(mode="json"), status=status.HTTP_200_OK)
+
 
 @extend_schema_view(
     list=extend_schema(tags=['Legendas do Calendário']),
@@ -1,12 +1,27 @@
 import django_filters
+from django.db.models import Exists, OuterRef
 from .models import Class
 
 
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
 class ClassFilterSet(django_filters.FilterSet):
     school_id = django_filters.NumberFilter(field_name='school')
-    teacher_id = django_filters.NumberFilter(field_name='teachers__id', distinct=True)
+    school_id__in = NumberInFilter(field_name='school', lookup_expr='in')
+    teacher_id = django_filters.NumberFilter(method='filter_teachers')
+    teacher_id__in = NumberInFilter(method='filter_teachers')
 
     class Meta:
         model = Class
         fields = {}
 
+    def filter_teachers(self, queryset, name, value):
+        # EXISTS correlacionado na tabela de ligação evita o join com DISTINCT
+        assignments = Class.teachers.through.objects.filter(class_id=OuterRef('pk'))
+        if name == 'teacher_id__in':
+            assignments = assignments.filter(teacher_id__in=value)
+        else:
+            assignments = assignments.filter(teacher_id=value)
+        return queryset.filter(Exists(assignments))
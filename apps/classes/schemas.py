@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+
+class AssignmentResult(BaseModel):
+    added: int = Field(description="Teacher/class links created")
+    removed: int = Field(description="Teacher/class links deleted")
+    unchanged: int = Field(description="Requested pairs already in the desired state")
@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from .models import Class
+from .services import ClassAssignmentService
 from apps.schools.models import School
 from apps.schools.serializers import SchoolSerializer
 from apps.teachers.models import Teacher
+from esmeraldinha.serializers import SparseFieldsetMixin
 
 
 class TeacherResumedSerializer(serializers.ModelSerializer):
@@ -12,7 +14,7 @@ class TeacherResumedSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class ClassSerializer(serializers.ModelSerializer):
+class ClassSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     school = SchoolSerializer(read_only=True)
     school_id = serializers.PrimaryKeyRelatedField(
         queryset=School.objects.all(), source='school', write_only=True, required=True
@@ -23,6 +25,7 @@ class ClassSerializer(serializers.ModelSerializer):
         fields = [
             "id", "code", "label", "school_id", "school"]
         read_only_fields = ["id"]
+        expandable_fields = ["school"]
 
 class ClassResumedSerializer(serializers.ModelSerializer):
     school_id = serializers.PrimaryKeyRelatedField(
@@ -32,3 +35,22 @@ class ClassResumedSerializer(serializers.ModelSerializer):
         model = Class
         fields = ["id", "code", "label", "school_id"]
         read_only_fields = ["id"]
+
+
+class AssignmentPairSerializer(serializers.Serializer):
+    teacher_id = serializers.IntegerField(help_text="Professor")
+    class_id = serializers.IntegerField(help_text="Turma")
+
+
+class ClassAssignmentSerializer(serializers.Serializer):
+    add = AssignmentPairSerializer(
+        many=True, required=False, max_length=ClassAssignmentService.MAX_PAIRS,
+        help_text="Vínculos professor/turma a criar")
+    remove = AssignmentPairSerializer(
+        many=True, required=False, max_length=ClassAssignmentService.MAX_PAIRS,
+        help_text="Vínculos professor/turma a remover")
+
+    def validate(self, attrs):
+        if not attrs.get('add') and not attrs.get('remove'):
+            raise serializers.ValidationError("Informe ao menos um vínculo em add ou remove.")
+        return attrs
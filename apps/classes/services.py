@@ -0,0 +1,100 @@
+from typing import Iterable, Set, Tuple
+
+from django.db import transaction
+
+from apps.classes.models import Class
+from apps.classes.schemas import AssignmentResult
+from apps.schools.services import invalidate_school_summaries
+from apps.teachers.models import Teacher
+
+
+Pair = Tuple[int, int]
+
+
+class ClassAssignmentService:
+    """
+    Vincula e desvincula professores de turmas em lote.
+
+    Os pares (professor, turma) são aplicados como operações de conjunto na
+    tabela de ligação: só as linhas que mudam são inseridas ou removidas, em
+    uma única transação, sem regravar as turmas de cada professor.
+    """
+
+    MAX_PAIRS = 5000
+    BATCH_SIZE = 1000
+
+    def validate(self, pairs: Set[Pair]):
+        """Garante que todos os professores e turmas citados existem."""
+        teacher_ids = {teacher_id for teacher_id, _ in pairs}
+        class_ids = {class_id for _, class_id in pairs}
+        missing_teachers = teacher_ids - set(
+            Teacher.objects.filter(id__in=teacher_ids).values_list('id', flat=True))
+        missing_classes = class_ids - set(
+            Class.objects.filter(id__in=class_ids).values_list('id', flat=True))
+        errors = []
+        if missing_teachers:
+            errors.append(f"Professores não encontrados: {', '.join(map(str, sorted(missing_teachers)))}.")
+        if missing_classes:
+            errors.append(f"Turmas não encontradas: {', '.join(map(str, sorted(missing_classes)))}.")
+        if errors:
+            raise ValueError(' '.join(errors))
+
+    def apply(self, add: Iterable[Pair] = (), remove: Iterable[Pair] = ()) -> AssignmentResult:
+        """
+        Aplica os vínculos pedidos.
+
+        Args:
+            add: Pares (teacher_id, class_id) a vincular.
+            remove: Pares (teacher_id, class_id) a desvincular.
+
+        Returns:
+            Quantidade de vínculos criados, removidos e pares que já estavam
+            no estado pedido.
+
+        Raises:
+            ValueError: Se um par aparece nas duas listas ou cita professor
+                ou turma inexistente.
+        """
+        add, remove = set(add), set(remove)
+        conflicting = add & remove
+        if conflicting:
+            teacher_id, class_id = min(conflicting)
+            raise ValueError(
+                f"O par professor {teacher_id} / turma {class_id} não pode ser incluído e removido ao mesmo tempo.")
+        requested = add | remove
+        if not requested:
+            return AssignmentResult(added=0, removed=0, unchanged=0)
+        self.validate(requested)
+
+        Through = Teacher.classes.through
+        with transaction.atomic():
+            # Um único SELECT dos vínculos dos professores citados, travados até o fim
+            existing = {
+                (teacher_id, class_id): link_id
+                for link_id, teacher_id, class_id in (
+                    Through.objects.select_for_update()
+                    .filter(teacher_id__in={teacher_id for teacher_id, _ in requested},
+                            class_id__in={class_id for _, class_id in requested})
+                    .values_list('id', 'teacher_id', 'class_id')
+                )
+            }
+            to_add = add - existing.keys()
+            to_remove = [existing[pair] for pair in remove if pair in existing]
+
+            if to_remove:
+                Through.objects.filter(id__in=to_remove).delete()
+            Through.objects.bulk_create(
+                (Through(teacher_id=teacher_id, class_id=class_id) for teacher_id, class_id in sorted(to_add)),
+                batch_size=self.BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            changed = {class_id for _, class_id in to_add | (remove & existing.keys())}
+            if changed:
+                invalidate_school_summaries(*(
+                    Class.objects.filter(id__in=changed).values_list('school_id', flat=True).distinct()))
+
+        return AssignmentResult(
+            added=len(to_add),
+            removed=len(to_remove),
+            unchanged=len(requested) - len(to_add) - len(to_remove),
+        )
@@ -1,5 +1,9 @@
+import time
+
 from rest_framework.test import APITestCase
 from rest_framework import status
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from apps.schools.models import School
@@ -8,6 +12,7 @@ from django.test import SimpleTestCase
 from rest_framework.test import APIRequestFactory
 from unittest.mock import MagicMock, patch
 from apps.classes.views import ClassViewSet
+from apps.teachers.models import DiaryType, ReductionDay, Teacher
 
 
 class ClassAPITestCase(APITestCase):
@@ -89,6 +94,145 @@ class ClassAPITestCase(APITestCase):
                       (status.HTTP_204_NO_CONTENT, status.HTTP_404_NOT_FOUND))
 
 
+class ClassFilterTestCase(APITestCase):
+    SCHOOLS = 20
+    CLASSES_PER_SCHOOL = 250
+    TEACHERS = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        schools = School.objects.bulk_create(
+            School(id=index + 1, name=f"Escola {index}", code=index + 1) for index in range(cls.SCHOOLS))
+        classes = Class.objects.bulk_create(
+            Class(code=f"C{index:05d}", label="Turma", school=schools[index % cls.SCHOOLS])
+            for index in range(cls.SCHOOLS * cls.CLASSES_PER_SCHOOL)
+        )
+        teachers = Teacher.objects.bulk_create(
+            Teacher(name=f"Professor {index}", code=f"P{index:05d}", password="-",
+                    reduction_day=ReductionDay.MONDAY, diary_type=DiaryType.C1)
+            for index in range(cls.TEACHERS)
+        )
+        # Cada turma tem um professor e cada professor, 5 turmas (uma a cada mil)
+        Teacher.classes.through.objects.bulk_create(
+            Teacher.classes.through(teacher_id=teachers[index % cls.TEACHERS].id, class_id=academic_class.id)
+            for index, academic_class in enumerate(classes)
+        )
+        cls.teachers = teachers
+        cls.schools = schools
+
+    def _count(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('class-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['count'], queries
+
+    def test_teacher_filter_uses_exists_without_distinct(self):
+        """O filtro por professor usa EXISTS, sem DISTINCT, em duas consultas"""
+        count, queries = self._count({'teacher_id': self.teachers[0].id})
+
+        self.assertEqual(count, 5)
+        self.assertEqual(len(queries), 2)
+        for query in queries.captured_queries:
+            self.assertIn('EXISTS', query['sql'])
+            self.assertNotIn('DISTINCT', query['sql'])
+
+    def test_multi_value_filters(self):
+        """teacher_id__in e school_id__in aceitam vários ids"""
+        teacher_ids = ','.join(str(teacher.id) for teacher in self.teachers[:3])
+        school_ids = f"{self.schools[0].id},{self.schools[1].id}"
+
+        self.assertEqual(self._count({'teacher_id__in': teacher_ids})[0], 15)
+        self.assertEqual(self._count({'school_id__in': school_ids})[0], 2 * self.CLASSES_PER_SCHOOL)
+        self.assertEqual(
+            self._count({'teacher_id__in': teacher_ids, 'school_id__in': school_ids})[0], 10)
+
+    def test_teacher_filter_timing_on_large_data(self):
+        """Filtrar 5 mil turmas por professores continua rápido"""
+        teacher_ids = ','.join(str(teacher.id) for teacher in self.teachers[:50])
+        self.client.get(reverse('class-list'), {'teacher_id__in': teacher_ids})
+
+        started = time.perf_counter()
+        count, _ = self._count({'teacher_id__in': teacher_ids})
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(count, 250)
+        self.assertLess(elapsed, 0.5)
+
+
+class ClassAssignmentAPITestCase(APITestCase):
+
+    def setUp(self):
+        school = School.objects.create(id=1, name="Escola Teste", code=123)
+        self.classes = Class.objects.bulk_create(
+            Class(code=f"C{index}", label="Turma", school=school) for index in range(3))
+        self.teachers = Teacher.objects.bulk_create(
+            Teacher(name=f"Professor {index}", code=f"P{index}", password="-",
+                    reduction_day=ReductionDay.MONDAY, diary_type=DiaryType.C1)
+            for index in range(2)
+        )
+        self.teachers[0].classes.add(self.classes[0], self.classes[1])
+        self.url = reverse('class-assignments')
+
+    def _pairs(self):
+        return set(Teacher.classes.through.objects.values_list('teacher_id', 'class_id'))
+
+    def test_applies_only_changed_links(self):
+        """Somente os vínculos que mudam são inseridos ou removidos, sem mexer nos demais"""
+        first, second = self.teachers
+        payload = {
+            'add': [
+                {'teacher_id': first.id, 'class_id': self.classes[0].id},
+                {'teacher_id': second.id, 'class_id': self.classes[0].id},
+                {'teacher_id': second.id, 'class_id': self.classes[2].id},
+            ],
+            'remove': [
+                {'teacher_id': first.id, 'class_id': self.classes[1].id},
+                {'teacher_id': second.id, 'class_id': self.classes[1].id},
+            ],
+        }
+        kept_link = Teacher.classes.through.objects.get(teacher=first, class_id=self.classes[0].id).id
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'added': 2, 'removed': 1, 'unchanged': 2})
+        self.assertEqual(self._pairs(), {
+            (first.id, self.classes[0].id),
+            (second.id, self.classes[0].id),
+            (second.id, self.classes[2].id),
+        })
+        self.assertTrue(Teacher.classes.through.objects.filter(id=kept_link).exists())
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'DELETE'))]
+        self.assertEqual(len(writes), 2)
+
+    def test_unknown_teacher_changes_nothing(self):
+        """Um professor inexistente rejeita o lote inteiro"""
+        payload = {
+            'add': [{'teacher_id': self.teachers[1].id, 'class_id': self.classes[0].id}],
+            'remove': [{'teacher_id': 999, 'class_id': self.classes[0].id}],
+        }
+
+        response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('999', response.json()['error'])
+        self.assertEqual(len(self._pairs()), 2)
+
+    def test_pair_in_add_and_remove_is_rejected(self):
+        """O mesmo par não pode ser incluído e removido na mesma requisição"""
+        pair = {'teacher_id': self.teachers[0].id, 'class_id': self.classes[2].id}
+
+        response = self.client.post(self.url, {'add': [pair], 'remove': [pair]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_some_pair(self):
+        """Sem add nem remove a requisição é inválida"""
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class ClassViewSetUnitTestCase(APITestCase):
 
     def setUp(self):
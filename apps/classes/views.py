@@ -1,14 +1,19 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from .models import Class
-from .serializers import ClassSerializer
+from .schemas import AssignmentResult
+from .serializers import ClassAssignmentSerializer, ClassSerializer
+from .services import ClassAssignmentService
 from .filters import ClassFilterSet
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
+from esmeraldinha.serializers import SPARSE_FIELDSET_PARAMETERS
 from django_filters.rest_framework import DjangoFilterBackend
 
 
 @extend_schema(tags=['Turmas'])
 class ClassViewSet(viewsets.ModelViewSet):
-    queryset = Class.objects.prefetch_related('teachers').select_related('school')
+    queryset = Class.objects.select_related('school')
     serializer_class = ClassSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = ClassFilterSet
@@ -29,6 +34,19 @@ class ClassViewSet(viewsets.ModelViewSet):
                 location='query',
                 description='ID do professor'
             ),
+            OpenApiParameter(
+                name='school_id__in',
+                type=str,
+                location='query',
+                description='IDs de escolas separados por vírgula'
+            ),
+            OpenApiParameter(
+                name='teacher_id__in',
+                type=str,
+                location='query',
+                description='IDs de professores separados por vírgula (turmas com qualquer um deles)'
+            ),
+            *SPARSE_FIELDSET_PARAMETERS,
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -121,3 +139,33 @@ class ClassViewSet(viewsets.ModelViewSet):
     )
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
+
+    @extend_schema(
+        summary='Vincula e desvincula professores de turmas em lote',
+        description='Aplica, em uma única transação, os pares professor/turma de add (vincular) e remove (desvincular). Somente os vínculos que mudam são gravados; pares que já estão no estado pedido são contados em unchanged. Se algum professor ou turma não existir, nada é alterado.',
+        request=ClassAssignmentSerializer,
+        responses={
+            200: OpenApiResponse(
+                response=AssignmentResult,
+                description='Vínculos aplicados com sucesso'
+            ),
+            400: OpenApiResponse(
+                description='Dados inválidos, ou professor ou turma inexistente'
+            )
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='assignments')
+    def assignments(self, request):
+        serializer = ClassAssignmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            result = ClassAssignmentService().apply(
+                add=[(pair['teacher_id'], pair['class_id']) for pair in data.get('add', [])],
+                remove=[(pair['teacher_id'], pair['class_id']) for pair in data.get('remove', [])],
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result.model_dump(mode="json"), status=status.HTTP_200_OK)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GradebookConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.gradebooks'
+
+    def ready(self):
+        from apps.gradebooks import receivers
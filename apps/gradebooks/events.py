@@ -0,0 +1,266 @@
+import abc
+import asyncio
+import json
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Set
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+
+from apps.gradebooks.schemas import GradebookProgressEvent, JobProgressEvent
+
+
+def teacher_channel(teacher_id: int) -> str:
+    return f"gradebooks:teacher:{teacher_id}"
+
+
+def job_channel(job_id: str) -> str:
+    return f"gradebooks:job:{job_id}"
+
+
+class Subscription(abc.ABC):
+    """Assinatura de canais; ``get`` retorna ``None`` quando o tempo de espera acaba."""
+
+    @abc.abstractmethod
+    async def get(self, timeout: float) -> Optional[dict]:
+        ...
+
+    @abc.abstractmethod
+    async def close(self):
+        ...
+
+
+class _LocalSubscription(Subscription):
+
+    def __init__(self, broker: "LocalBroker", channels: List[str]):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=broker.MAX_PENDING)
+
+    def deliver(self, message: dict):
+        # Roda no laço de eventos da assinatura
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker._unsubscribe(self)
+
+
+class LocalBroker:
+    """
+    Broker em memória para um único processo (desenvolvimento e testes).
+
+    A publicação pode vir de qualquer thread (views síncronas, tarefas em
+    segundo plano) e é entregue no laço de eventos de cada assinatura.
+    Assinantes lentos perdem as mensagens mais antigas em vez de bloquear quem publica.
+    """
+
+    MAX_PENDING = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[_LocalSubscription]] = {}
+
+    def publish(self, channel: str, message: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # Laço de eventos já encerrado: a assinatura está sendo descartada
+                pass
+
+    async def subscribe(self, channels: Iterable[str]) -> Subscription:
+        subscription = _LocalSubscription(self, list(channels))
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: _LocalSubscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+
+class _RedisSubscription(Subscription):
+
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker:
+    """Broker via pub/sub do Redis, compartilhado entre processos e servidores."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, channel: str, message: dict):
+        self.client.publish(channel, json.dumps(message))
+
+    async def subscribe(self, channels: Iterable[str]) -> Subscription:
+        import redis.asyncio
+
+        # Cliente assíncrono próprio: fica preso ao laço de eventos em que foi criado,
+        # e cada assinatura ocupa uma conexão de qualquer forma
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(*channels)
+        return _RedisSubscription(client, pubsub)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Retorna o broker configurado: Redis se ``GRADEBOOK_EVENTS_REDIS_URL`` estiver definido, senão o local."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            url = settings.GRADEBOOK_EVENTS_REDIS_URL
+            _broker = RedisBroker(url) if url else LocalBroker()
+        return _broker
+
+
+def publish_gradebook_progress(gradebook):
+    """Publica status e progresso da caderneta para o professor após o commit."""
+    event = GradebookProgressEvent(
+        id=gradebook.id,
+        teacher_id=gradebook.teacher_id,
+        status=gradebook.status,
+        progress=gradebook.progress,
+    )
+    transaction.on_commit(lambda: get_broker().publish(
+        teacher_channel(event.teacher_id),
+        {'event': 'gradebook', 'data': event.model_dump(mode="json")},
+    ))
+
+
+def publish_job_progress(event: JobProgressEvent):
+    """Publica o andamento de uma tarefa em segundo plano."""
+    get_broker().publish(
+        job_channel(event.job_id),
+        {'event': 'job', 'data': event.model_dump(mode="json")},
+    )
+
+
+def format_sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class StreamLimiter:
+    """
+    Limita os fluxos SSE abertos ao mesmo tempo no processo.
+
+    Os fluxos são servidos por workers ASGI e não ocupam threads, mas cada
+    um mantém uma assinatura (uma conexão com o Redis, em produção); o
+    limite (``GRADEBOOK_EVENTS_MAX_STREAMS``) protege o processo e o Redis.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+
+    def acquire(self) -> Optional[Callable[[], None]]:
+        """Reserva uma vaga; retorna a função que a devolve (uma única vez) ou ``None`` se não houver vaga."""
+        with self._lock:
+            if self.open >= settings.GRADEBOOK_EVENTS_MAX_STREAMS:
+                return None
+            self.open += 1
+        released = False
+
+        def release():
+            nonlocal released
+            with self._lock:
+                if not released:
+                    released = True
+                    self.open -= 1
+
+        return release
+
+
+stream_limiter = StreamLimiter()
+
+
+class EventStreamResponse(StreamingHttpResponse):
+    """Fluxo SSE que executa ``on_close`` (ex.: devolver a vaga do fluxo) quando a resposta é encerrada."""
+
+    def __init__(self, streaming_content, on_close: Callable[[], None] = lambda: None, **kwargs):
+        super().__init__(streaming_content, content_type='text/event-stream', **kwargs)
+        self['Cache-Control'] = 'no-cache'
+        self['X-Accel-Buffering'] = 'no'
+        self._on_close = on_close
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._on_close()
+
+
+async def iter_sse(channels: List[str], snapshot: Optional[Callable[[], List[bytes]]] = None,
+                   on_close: Callable[[], None] = lambda: None) -> AsyncIterator[bytes]:
+    """
+    Transmite as mensagens dos canais no formato ``text/event-stream``.
+
+    A assinatura é feita antes do ``snapshot`` (função síncrona, executada
+    em uma thread) para que nenhuma mudança se perca entre o estado inicial
+    e os eventos. Envia um comentário de keep-alive a cada
+    ``GRADEBOOK_EVENTS_HEARTBEAT_SECONDS`` sem mensagens. Após
+    ``GRADEBOOK_EVENTS_MAX_SECONDS`` o fluxo termina e o cliente reconecta
+    sozinho, conforme o ``retry`` enviado no início.
+
+    Quando o cliente desconecta, o servidor ASGI cancela o fluxo sem chamar
+    ``close`` da resposta: a assinatura é encerrada e ``on_close`` chamado
+    aqui mesmo.
+    """
+    try:
+        subscription = await get_broker().subscribe(channels)
+        try:
+            deadline = time.monotonic() + settings.GRADEBOOK_EVENTS_MAX_SECONDS
+            yield f"retry: {settings.GRADEBOOK_EVENTS_RETRY_MS}\n\n".encode()
+            if snapshot is not None:
+                for chunk in await sync_to_async(snapshot)():
+                    yield chunk
+            while (remaining := deadline - time.monotonic()) > 0:
+                message = await subscription.get(
+                    timeout=min(settings.GRADEBOOK_EVENTS_HEARTBEAT_SECONDS, remaining))
+                if message is None:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield format_sse(message['event'], message['data'])
+        finally:
+            await subscription.close()
+    finally:
+        on_close()
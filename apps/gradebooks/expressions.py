@@ -0,0 +1,31 @@
+from django.db.models import Func, JSONField
+
+
+class JSONMergePatch(Func):
+    """
+    Aplica um merge-patch JSON (RFC 7396) a um campo no próprio banco.
+
+    O segundo argumento é o patch serializado como texto. No PostgreSQL, que
+    não tem a função nativa, o merge é feito nos dois níveis usados pelo
+    ``content_registry`` (``lessons`` → data → campos da aula).
+    """
+    function = 'JSON_PATCH'
+    arity = 2
+    output_field = JSONField()
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='JSON_MERGE_PATCH', **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        target, patch = self.get_source_expressions()
+        target_sql, target_params = compiler.compile(target)
+        patch_sql, patch_params = compiler.compile(patch)
+        sql = (
+            f"jsonb_set({target_sql}, '{{lessons}}', "
+            f"COALESCE({target_sql} -> 'lessons', '{{}}'::jsonb) || COALESCE(("
+            f"SELECT jsonb_object_agg(patch.key, "
+            f"COALESCE({target_sql} -> 'lessons' -> patch.key, '{{}}'::jsonb) || patch.value) "
+            f"FROM jsonb_each(({patch_sql})::jsonb -> 'lessons') AS patch"
+            f"), '{{}}'::jsonb))"
+        )
+        return sql, (*target_params, *target_params, *target_params, *patch_params)
@@ -0,0 +1,15 @@
+import django_filters
+from .models import Gradebook, GradebookStatus
+
+
+class GradebookFilterSet(django_filters.FilterSet):
+    teacher_id = django_filters.NumberFilter(field_name='teacher')
+    class_id = django_filters.NumberFilter(field_name='academic_class')
+    calendar_id = django_filters.NumberFilter(field_name='calendar')
+    school_id = django_filters.NumberFilter(field_name='academic_class__school')
+    year = django_filters.NumberFilter(field_name='calendar__year')
+    status = django_filters.ChoiceFilter(choices=GradebookStatus.choices)
+
+    class Meta:
+        model = Gradebook
+        fields = {}
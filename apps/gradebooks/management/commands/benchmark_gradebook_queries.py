@@ -0,0 +1,133 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.academic_calendars.models import AcademicCalendar
+from apps.classes.models import Class
+from apps.gradebooks.models import Gradebook, GradebookStatus
+from apps.schools.models import School
+from apps.teachers.models import DiaryType, ReductionDay, Teacher
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara planos e tempos das consultas de listagem de cadernetas com e sem os '
+        'índices compostos e o teacher_code desnormalizado. Os dados gerados são descartados ao final.'
+    )
+
+    PAGE_SIZE = 20
+    CLASSES = 50
+    CALENDAR_YEARS = (2090, 2091)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='Quantidade de cadernetas geradas')
+        parser.add_argument('--repeat', type=int, default=7, help='Execuções por consulta (usa a mediana)')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                teacher_id, class_id, calendar_id = self._seed(options['rows'])
+                self._analyze()
+
+                self.stdout.write(self.style.WARNING('Depois: ordering (status, teacher_code, id) com índices compostos'))
+                after = self._run(self._queries(teacher_id, class_id, calendar_id, 'teacher_code'), options['repeat'])
+
+                with connection.cursor() as cursor:
+                    for index in Gradebook._meta.indexes:
+                        cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+                self._analyze()
+
+                self.stdout.write(self.style.WARNING('Antes: ordering (status, teacher__code) sem índices compostos'))
+                before = self._run(self._queries(teacher_id, class_id, calendar_id, 'teacher__code'), options['repeat'])
+
+                self.stdout.write(self.style.SUCCESS('Resumo (mediana em ms):'))
+                for name in after:
+                    self.stdout.write(
+                        f'  {name}: antes {before[name]:.2f} / depois {after[name]:.2f} '
+                        f'({before[name] / max(after[name], 1e-6):.1f}x)'
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, rows):
+        school = School.objects.create(id=90_000, name='Escola benchmark', code=90_000)
+        calendars = [
+            AcademicCalendar.objects.create(year=year, calendar_data={}) for year in self.CALENDAR_YEARS
+        ]
+        classes = Class.objects.bulk_create(
+            Class(code=f'BENCH-{index}', label=f'Turma {index}', school=school)
+            for index in range(self.CLASSES)
+        )
+        teacher_count = max(rows // (self.CLASSES * len(calendars)), 1)
+        teachers = Teacher.objects.bulk_create(
+            Teacher(
+                name=f'Professor {index}',
+                code=f'{(index * 7919) % 1_000_000:06d}',
+                password='-',
+                reduction_day=ReductionDay.values[index % len(ReductionDay.values)],
+                diary_type=DiaryType.C1,
+            )
+            for index in range(teacher_count)
+        )
+        statuses = GradebookStatus.values
+
+        def gradebooks():
+            created = 0
+            for calendar in calendars:
+                for teacher in teachers:
+                    for academic_class in classes:
+                        if created == rows:
+                            return
+                        yield Gradebook(
+                            teacher=teacher,
+                            teacher_code=teacher.code,
+                            calendar=calendar,
+                            academic_class=academic_class,
+                            content_registry={},
+                            status=statuses[created % len(statuses)],
+                        )
+                        created += 1
+
+        Gradebook.objects.bulk_create(gradebooks(), batch_size=2000)
+        self.stdout.write(f'{Gradebook.objects.count()} cadernetas, {len(teachers)} professores, {len(classes)} turmas')
+        return teachers[len(teachers) // 2].id, classes[len(classes) // 2].id, calendars[0].id
+
+    def _analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _queries(self, teacher_id, class_id, calendar_id, code_field):
+        base = Gradebook.objects.select_related('teacher', 'calendar', 'academic_class__school').defer(
+            'content_registry', 'calendar__calendar_data', 'calendar__processing_errors')
+        ordering = ('status', code_field, 'id')
+        size = self.PAGE_SIZE
+        return {
+            'primeira página': base.order_by(*ordering)[:size],
+            'página 100': base.order_by(*ordering)[99 * size:100 * size],
+            'por professor': base.filter(teacher_id=teacher_id).order_by(*ordering)[:size],
+            'por turma': base.filter(academic_class_id=class_id).order_by(*ordering)[:size],
+            'por calendário e status': base.filter(
+                calendar_id=calendar_id, status=GradebookStatus.PENDING).order_by(*ordering)[:size],
+        }
+
+    def _run(self, queries, repeat):
+        timings = {}
+        for name, page in queries.items():
+            self.stdout.write(f'  {name}:')
+            for line in page.explain().splitlines():
+                self.stdout.write(f'    {line}')
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(page.all())
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[name] = statistics.median(samples)
+            self.stdout.write(f'    mediana: {timings[name]:.2f} ms')
+        return timings
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.gradebooks.models import GradebookRegeneration, RegenerationStatus
+from apps.gradebooks.services import GradebookRegenerationService
+
+
+class Command(BaseCommand):
+    help = 'Processa as regenerações de cadernetas pendentes (por exemplo, interrompidas por um reinício)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Também reprocessa as regenerações que falharam',
+        )
+
+    def handle(self, *args, **options):
+        statuses = [RegenerationStatus.PENDING, RegenerationStatus.RUNNING]
+        if options['retry_failed']:
+            statuses.append(RegenerationStatus.FAILED)
+
+        service = GradebookRegenerationService()
+        pending = GradebookRegeneration.objects.filter(status__in=statuses).values_list('id', flat=True)
+        for regeneration_id in list(pending):
+            regeneration = service.run(regeneration_id)
+            self.stdout.write(self.style.SUCCESS(
+                f'Regeneração {regeneration.id} (calendário {regeneration.calendar.year}): '
+                f'{regeneration.gradebooks_updated} cadernetas, '
+                f'+{regeneration.lessons_added} / -{regeneration.lessons_removed} aulas, '
+                f'{regeneration.lessons_restaged} com etapa alterada, '
+                f'{regeneration.lessons_kept} mantidas com registro'
+            ))
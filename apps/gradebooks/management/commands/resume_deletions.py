@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from apps.gradebooks.models import CascadeDeletion, CascadeDeletionStatus
+from apps.gradebooks.services import CascadeDeletionService
+
+
+class Command(BaseCommand):
+    help = 'Processa as exclusões de escolas e calendários pendentes (por exemplo, interrompidas por um reinício)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Também reprocessa as exclusões que falharam',
+        )
+
+    def handle(self, *args, **options):
+        statuses = [CascadeDeletionStatus.PENDING, CascadeDeletionStatus.RUNNING]
+        if options['retry_failed']:
+            statuses.append(CascadeDeletionStatus.FAILED)
+
+        service = CascadeDeletionService()
+        pending = CascadeDeletion.objects.filter(status__in=statuses).values_list('id', flat=True)
+        for deletion_id in list(pending):
+            deletion = service.run(deletion_id)
+            counts = ', '.join(f'{count} {name}' for name, count in deletion.deleted.items())
+            self.stdout.write(self.style.SUCCESS(
+                f'Exclusão {deletion.id} ({deletion.get_target_display()} {deletion.label}): '
+                f'{deletion.done} registros removidos ({counts or "nenhum dependente"})'
+            ))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_calendars', '0005_academiccalendar_updated_at'),
+        ('classes', '0002_remove_class_teacher'),
+        ('gradebooks', '0001_initial'),
+        ('teachers', '0002_refactoring_classes_and_school_integration'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='gradebook',
+            constraint=models.UniqueConstraint(fields=('teacher', 'calendar', 'academic_class'), name='unique_gradebook_per_teacher_calendar_class'),
+        ),
+    ]
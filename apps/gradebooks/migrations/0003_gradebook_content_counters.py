@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:54
+
+from django.db import migrations, models
+
+
+def fill_content_counters(apps, schema_editor):
+    Gradebook = apps.get_model('gradebooks', 'Gradebook')
+    batch = []
+    for gradebook in Gradebook.objects.only('id', 'content_registry', 'progress').iterator(chunk_size=500):
+        lessons = (gradebook.content_registry or {}).get('lessons', {})
+        gradebook.lessons_total = len(lessons)
+        gradebook.lessons_filled = sum(
+            1 for lesson in lessons.values() if (lesson.get('content') or '').strip())
+        if gradebook.lessons_total:
+            gradebook.progress = round(100 * gradebook.lessons_filled / gradebook.lessons_total)
+        batch.append(gradebook)
+        if len(batch) >= 500:
+            Gradebook.objects.bulk_update(batch, ['lessons_total', 'lessons_filled', 'progress'])
+            batch = []
+    Gradebook.objects.bulk_update(batch, ['lessons_total', 'lessons_filled', 'progress'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gradebooks', '0002_gradebook_unique_teacher_calendar_class'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gradebook',
+            name='lessons_filled',
+            field=models.PositiveIntegerField(default=0, help_text='Aulas com conteúdo preenchido'),
+        ),
+        migrations.AddField(
+            model_name='gradebook',
+            name='lessons_total',
+            field=models.PositiveIntegerField(default=0, help_text='Aulas no registro de conteúdo'),
+        ),
+        migrations.AddField(
+            model_name='gradebook',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Versão do registro de conteúdo, incrementada a cada salvamento'),
+        ),
+        migrations.RunPython(fill_content_counters, migrations.RunPython.noop),
+    ]
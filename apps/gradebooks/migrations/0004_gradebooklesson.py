@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_lessons(apps, schema_editor):
+    Gradebook = apps.get_model('gradebooks', 'Gradebook')
+    GradebookLesson = apps.get_model('gradebooks', 'GradebookLesson')
+    batch = []
+    for gradebook in Gradebook.objects.only('id', 'content_registry').iterator(chunk_size=200):
+        for day, lesson in (gradebook.content_registry or {}).get('lessons', {}).items():
+            batch.append(GradebookLesson(
+                gradebook_id=gradebook.id,
+                date=day,
+                stage=lesson.get('stage'),
+                content=lesson.get('content') or '',
+            ))
+        if len(batch) >= 5000:
+            GradebookLesson.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    GradebookLesson.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gradebooks', '0003_gradebook_content_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradebookLesson',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('stage', models.CharField(blank=True, max_length=5, null=True)),
+                ('content', models.TextField(blank=True, default='')),
+                ('attendance_recorded', models.BooleanField(default=False)),
+                ('present', models.PositiveIntegerField(blank=True, help_text='Alunos presentes', null=True)),
+                ('absent', models.PositiveIntegerField(blank=True, help_text='Alunos ausentes', null=True)),
+                ('gradebook', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lessons', to='gradebooks.gradebook')),
+            ],
+            options={
+                'ordering': ['gradebook', 'date'],
+                'indexes': [models.Index(fields=['date'], name='gradebook_lesson_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('gradebook', 'date'), name='unique_lesson_per_gradebook_date')],
+            },
+        ),
+        migrations.RunPython(fill_lessons, migrations.RunPython.noop),
+    ]
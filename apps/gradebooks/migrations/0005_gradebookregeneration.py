@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_calendars', '0005_academiccalendar_updated_at'),
+        ('gradebooks', '0004_gradebooklesson'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradebookRegeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dates', models.JSONField(help_text='Datas afetadas (YYYY-MM-DD)')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('gradebooks_updated', models.PositiveIntegerField(default=0)),
+                ('lessons_added', models.PositiveIntegerField(default=0)),
+                ('lessons_removed', models.PositiveIntegerField(default=0)),
+                ('lessons_restaged', models.PositiveIntegerField(default=0)),
+                ('lessons_kept', models.PositiveIntegerField(default=0, help_text='Aulas com registro mantidas em datas que deixaram de ser letivas')),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('calendar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gradebook_regenerations', to='academic_calendars.academiccalendar')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='gradebook_regen_status_idx')],
+            },
+        ),
+    ]
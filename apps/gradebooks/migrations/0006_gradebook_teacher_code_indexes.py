@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:03
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_teacher_code(apps, schema_editor):
+    Gradebook = apps.get_model('gradebooks', 'Gradebook')
+    Teacher = apps.get_model('teachers', 'Teacher')
+    Gradebook.objects.update(
+        teacher_code=Subquery(Teacher.objects.filter(pk=OuterRef('teacher_id')).values('code')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_calendars', '0005_academiccalendar_updated_at'),
+        ('classes', '0002_remove_class_teacher'),
+        ('gradebooks', '0005_gradebookregeneration'),
+        ('teachers', '0002_refactoring_classes_and_school_integration'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='gradebook',
+            options={'ordering': ['status', 'teacher_code', 'id']},
+        ),
+        migrations.AddField(
+            model_name='gradebook',
+            name='teacher_code',
+            field=models.CharField(default='', editable=False, help_text='Cópia de teacher.code para ordenar sem join, mantida em sincronia com o professor', max_length=6),
+        ),
+        migrations.RunPython(fill_teacher_code, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='gradebook',
+            index=models.Index(fields=['status', 'teacher_code', 'id'], name='gradebook_ordering_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gradebook',
+            index=models.Index(fields=['teacher', 'status', 'teacher_code', 'id'], name='gradebook_teacher_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gradebook',
+            index=models.Index(fields=['academic_class', 'status', 'teacher_code', 'id'], name='gradebook_class_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gradebook',
+            index=models.Index(fields=['calendar', 'status', 'teacher_code', 'id'], name='gradebook_calendar_status_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gradebooks', '0006_gradebook_teacher_code_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CascadeDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(choices=[('school', 'School'), ('calendar', 'Calendar')], max_length=20)),
+                ('target_id', models.IntegerField(help_text='ID da escola ou do calendário')),
+                ('label', models.CharField(help_text='Nome da escola ou ano do calendário', max_length=200)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('done', models.PositiveIntegerField(default=0, help_text='Registros removidos até agora')),
+                ('total', models.PositiveIntegerField(default=0, help_text='Registros a remover, estimados no início')),
+                ('deleted', models.JSONField(default=dict, help_text='Registros removidos por tipo')),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['target', 'target_id', 'status'], name='cascade_deletion_target_idx')],
+            },
+        ),
+    ]
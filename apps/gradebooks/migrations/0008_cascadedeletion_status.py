@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gradebooks', '0007_cascadedeletion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cascadedeletion',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pendente'), ('running', 'Excluindo'), ('completed', 'Excluída'), ('failed', 'Falhou')], default='pending', max_length=20),
+        ),
+    ]
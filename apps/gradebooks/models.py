@@ -19,13 +19,152 @@ class Gradebook(models.Model):
         AcademicCalendar, related_name='gradebooks', on_delete=models.CASCADE)
     academic_class = models.ForeignKey(
         Class, related_name='gradebooks', on_delete=models.CASCADE)
+    teacher_code = models.CharField(
+        max_length=6, default='', editable=False,
+        help_text='Cópia de teacher.code para ordenar sem join, mantida em sincronia com o professor')
     content_registry = models.JSONField()
     status = models.CharField(
         max_length=20, choices=GradebookStatus.choices, default=GradebookStatus.PENDING)
     title = models.CharField(max_length=200, blank=True, default='')
     progress = models.IntegerField(
         default=0, help_text='Progresso da caderneta (0-100)')
+    lessons_total = models.PositiveIntegerField(
+        default=0, help_text='Aulas no registro de conteúdo')
+    lessons_filled = models.PositiveIntegerField(
+        default=0, help_text='Aulas com conteúdo preenchido')
+    version = models.PositiveIntegerField(
+        default=0, help_text='Versão do registro de conteúdo, incrementada a cada salvamento')
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
 
     class Meta:
-        ordering = ['status', 'teacher__code']
+        ordering = ['status', 'teacher_code', 'id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['teacher', 'calendar', 'academic_class'],
+                name='unique_gradebook_per_teacher_calendar_class',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'teacher_code', 'id'], name='gradebook_ordering_idx'),
+            models.Index(
+                fields=['teacher', 'status', 'teacher_code', 'id'], name='gradebook_teacher_status_idx'),
+            models.Index(
+                fields=['academic_class', 'status', 'teacher_code', 'id'], name='gradebook_class_status_idx'),
+            models.Index(
+                fields=['calendar', 'status', 'teacher_code', 'id'], name='gradebook_calendar_status_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        teacher_field = self._meta.get_field('teacher')
+        if self.teacher_id and (not self.teacher_code or teacher_field.is_cached(self)):
+            self.teacher_code = self.teacher.code
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'teacher_code' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'teacher_code']
+        super().save(*args, **kwargs)
+
+
+class GradebookLesson(models.Model):
+    """
+    Aula de uma caderneta, uma linha por data.
+
+    É a fonte dos dados de cada aula; ``Gradebook.content_registry`` é mantido
+    como cópia derivada (data → etapa e conteúdo) para compatibilidade.
+    """
+    gradebook = models.ForeignKey(
+        Gradebook, related_name='lessons', on_delete=models.CASCADE)
+    date = models.DateField()
+    stage = models.CharField(max_length=5, null=True, blank=True)
+    content = models.TextField(blank=True, default='')
+    attendance_recorded = models.BooleanField(default=False)
+    present = models.PositiveIntegerField(
+        null=True, blank=True, help_text='Alunos presentes')
+    absent = models.PositiveIntegerField(
+        null=True, blank=True, help_text='Alunos ausentes')
+
+    class Meta:
+        ordering = ['gradebook', 'date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['gradebook', 'date'],
+                name='unique_lesson_per_gradebook_date',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='gradebook_lesson_date_idx'),
+        ]
+
+
+class RegenerationStatus(models.TextChoices):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+
+class GradebookRegeneration(models.Model):
+    """
+    Atualização pendente das aulas das cadernetas após uma mudança no calendário.
+
+    Guarda apenas as datas cuja condição de aula (dia letivo ou etapa) mudou;
+    o processamento em segundo plano ajusta somente as aulas nessas datas.
+    """
+    calendar = models.ForeignKey(
+        AcademicCalendar, related_name='gradebook_regenerations', on_delete=models.CASCADE)
+    dates = models.JSONField(help_text='Datas afetadas (YYYY-MM-DD)')
+    status = models.CharField(
+        max_length=20, choices=RegenerationStatus.choices, default=RegenerationStatus.PENDING)
+    gradebooks_updated = models.PositiveIntegerField(default=0)
+    lessons_added = models.PositiveIntegerField(default=0)
+    lessons_removed = models.PositiveIntegerField(default=0)
+    lessons_restaged = models.PositiveIntegerField(default=0)
+    lessons_kept = models.PositiveIntegerField(
+        default=0, help_text='Aulas com registro mantidas em datas que deixaram de ser letivas')
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='gradebook_regen_status_idx'),
+        ]
+
+
+class DeletionTarget(models.TextChoices):
+    SCHOOL = 'school'
+    CALENDAR = 'calendar'
+
+
+class CascadeDeletionStatus(models.TextChoices):
+    PENDING = 'pending', 'Pendente'
+    RUNNING = 'running', 'Excluindo'
+    COMPLETED = 'completed', 'Excluída'
+    FAILED = 'failed', 'Falhou'
+
+
+class CascadeDeletion(models.Model):
+    """
+    Exclusão em segundo plano de uma escola ou de um calendário e seus dependentes.
+
+    Aulas, cadernetas, vínculos e turmas são removidos em lotes de tamanho
+    fixo, cada um em sua própria transação, e o registro alvo por último.
+    ``target_id`` não é chave estrangeira para que o histórico sobreviva ao alvo.
+    """
+    target = models.CharField(max_length=20, choices=DeletionTarget.choices)
+    target_id = models.IntegerField(help_text='ID da escola ou do calendário')
+    label = models.CharField(max_length=200, help_text='Nome da escola ou ano do calendário')
+    status = models.CharField(
+        max_length=20, choices=CascadeDeletionStatus.choices, default=CascadeDeletionStatus.PENDING)
+    done = models.PositiveIntegerField(default=0, help_text='Registros removidos até agora')
+    total = models.PositiveIntegerField(default=0, help_text='Registros a remover, estimados no início')
+    deleted = models.JSONField(default=dict, help_text='Registros removidos por tipo')
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['target', 'target_id', 'status'], name='cascade_deletion_target_idx'),
+        ]
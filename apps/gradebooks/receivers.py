@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.academic_calendars.models import AcademicCalendar
+from apps.academic_calendars.signals import calendar_data_changed
+from apps.gradebooks.models import Gradebook
+from apps.gradebooks.services import GradebookRegenerationService
+from apps.teachers.models import Teacher
+
+
+@receiver(calendar_data_changed, sender=AcademicCalendar)
+def schedule_gradebook_regeneration(sender, calendar, previous_data, **kwargs):
+    GradebookRegenerationService().schedule(calendar, previous_data)
+
+
+@receiver(post_save, sender=Teacher)
+def sync_gradebook_teacher_code(sender, instance, created, **kwargs):
+    if not created:
+        Gradebook.objects.filter(teacher=instance).exclude(
+            teacher_code=instance.code).update(teacher_code=instance.code)
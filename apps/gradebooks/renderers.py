@@ -0,0 +1,42 @@
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer
+
+
+class MergePatchParser(JSONParser):
+    """Aceita corpos ``application/merge-patch+json`` (RFC 7396)."""
+    media_type = 'application/merge-patch+json'
+
+
+class PDFRenderer(BaseRenderer):
+    """Permite negociar ``application/pdf``; o arquivo em si é enviado via ``FileResponse``."""
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data if isinstance(data, bytes) else b''
+
+
+class ZipRenderer(PDFRenderer):
+    """Permite negociar ``application/zip``; o conteúdo em si é enviado via streaming."""
+    media_type = 'application/zip'
+    format = 'zip'
+
+
+class CSVRenderer(BaseRenderer):
+    """Permite negociar ``text/csv``; as linhas são enviadas via streaming."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = data.get('error') or ''
+        return str(data or '').encode(self.charset)
+
+
+class XLSXRenderer(PDFRenderer):
+    """Permite negociar planilhas XLSX; o arquivo em si é enviado via ``FileResponse``."""
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
@@ -0,0 +1,154 @@
+"""
+Renderização de cadernetas (diários) em PDF com PyMuPDF.
+
+Este módulo não importa o Django: as funções são executadas em processos do
+pool de renderização e recebem apenas dados já serializados (``payload``).
+"""
+import os
+import tempfile
+import textwrap
+from datetime import date
+from itertools import groupby
+from typing import List
+
+import fitz
+
+
+RENDERER_VERSION = 1
+
+FONT = "helv"
+FONT_BOLD = "hebo"
+MARGIN = 40
+ROW_HEIGHT = 14
+DATE_COLUMN = 70
+STAGE_COLUMN = 45
+
+
+def _format_date(value: str) -> str:
+    return date.fromisoformat(value).strftime("%d/%m/%Y")
+
+
+class _PageWriter:
+    """Escreve linhas de texto em sequência, abrindo novas páginas quando necessário."""
+
+    def __init__(self, doc: fitz.Document, width: float, height: float, header: List[str]):
+        self.doc = doc
+        self.width = width
+        self.height = height
+        self.header = header
+        self.page = None
+        self.y = 0.0
+
+    def new_page(self):
+        self.page = self.doc.new_page(width=self.width, height=self.height)
+        self.y = MARGIN
+        for index, line in enumerate(self.header):
+            self.text(MARGIN, line, bold=index == 0, size=13 if index == 0 else 9)
+        self.y += ROW_HEIGHT / 2
+
+    def ensure_space(self, rows: int = 1):
+        if self.page is None or self.y + rows * ROW_HEIGHT > self.height - MARGIN:
+            self.new_page()
+
+    def text(self, x: float, value: str, bold: bool = False, size: float = 9, advance: bool = True):
+        self.page.insert_text(
+            (x, self.y + size), value, fontname=FONT_BOLD if bold else FONT, fontsize=size)
+        if advance:
+            self.y += max(ROW_HEIGHT, size + 5)
+
+    def rule(self):
+        self.page.draw_line((MARGIN, self.y), (self.width - MARGIN, self.y), width=0.5)
+        self.y += 3
+
+    def wrap(self, value: str, available_width: float) -> List[str]:
+        chars = max(int(available_width / 4.6), 10)
+        return textwrap.wrap(value, chars) or [""]
+
+
+def _header(payload: dict) -> List[str]:
+    return [
+        payload["title"] or f"Caderneta {payload['id']}",
+        f"Escola: {payload['school']}    Turma: {payload['class_label']} ({payload['class_code']})",
+        f"Professor(a): {payload['teacher_name']} ({payload['teacher_code']})    "
+        f"Ano letivo: {payload['year']}    Diário {payload['diary_type'].upper()}",
+    ]
+
+
+def _render_c1(doc: fitz.Document, payload: dict):
+    """Modelo C1: retrato, uma linha por aula com data, etapa e conteúdo."""
+    width, height = fitz.paper_size("a4")
+    writer = _PageWriter(doc, width, height, _header(payload))
+    content_x = MARGIN + DATE_COLUMN + STAGE_COLUMN
+    content_width = width - MARGIN - content_x
+
+    writer.ensure_space()
+    writer.text(MARGIN, "Data", bold=True, advance=False)
+    writer.text(MARGIN + DATE_COLUMN, "Etapa", bold=True, advance=False)
+    writer.text(content_x, "Conteúdo", bold=True)
+    writer.rule()
+
+    for lesson in payload["lessons"]:
+        lines = writer.wrap(lesson["content"], content_width)
+        writer.ensure_space(len(lines))
+        writer.text(MARGIN, _format_date(lesson["date"]), advance=False)
+        writer.text(MARGIN + DATE_COLUMN, lesson["stage"] or "-", advance=False)
+        for line in lines:
+            writer.text(content_x, line)
+
+
+def _render_c2(doc: fitz.Document, payload: dict):
+    """Modelo C2: paisagem, uma seção por etapa começando em página nova."""
+    height, width = fitz.paper_size("a4")
+    content_x = MARGIN + DATE_COLUMN
+    content_width = width - MARGIN - content_x
+
+    for stage, lessons in groupby(payload["lessons"], key=lambda lesson: lesson["stage"]):
+        writer = _PageWriter(doc, width, height, _header(payload))
+        writer.new_page()
+        writer.text(MARGIN, f"{stage} Etapa" if stage else "Sem etapa", bold=True, size=11)
+        writer.rule()
+        for lesson in lessons:
+            lines = writer.wrap(lesson["content"], content_width)
+            writer.ensure_space(len(lines))
+            writer.text(MARGIN, _format_date(lesson["date"]), advance=False)
+            for line in lines:
+                writer.text(content_x, line)
+
+
+LAYOUTS = {
+    "c1": _render_c1,
+    "c2": _render_c2,
+}
+
+
+def render_gradebook_pdf(payload: dict) -> bytes:
+    """
+    Renderiza o diário de uma caderneta.
+
+    Args:
+        payload: Dados da caderneta montados por ``GradebookPDFService``
+            (cabeçalho, ``diary_type`` e ``lessons`` ordenadas por data).
+
+    Returns:
+        Conteúdo do PDF.
+    """
+    doc = fitz.open()
+    try:
+        LAYOUTS.get(payload["diary_type"], _render_c1)(doc, payload)
+        if len(doc) == 0:
+            _PageWriter(doc, *fitz.paper_size("a4"), _header(payload)).new_page()
+        return doc.tobytes(garbage=3, deflate=True)
+    finally:
+        doc.close()
+
+
+def render_gradebook_pdf_to_file(payload: dict, path: str) -> str:
+    """Renderiza o diário e grava em ``path`` de forma atômica."""
+    content = render_gradebook_pdf(payload)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as tmp_file:
+        tmp_file.write(content)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,91 @@
+from datetime import date
+from enum import Enum
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+
+from apps.academic_calendars.schemas import StageId
+
+
+class Lesson(BaseModel):
+    stage: Optional[StageId] = None
+    content: str = Field('', description="Content taught in the lesson")
+
+
+class ContentRegistry(BaseModel):
+    lessons: Dict[str, Lesson] = Field(
+        default_factory=dict,
+        description="Lessons keyed by date in YYYY-MM-DD format")
+
+
+class GradebookGenerationResult(BaseModel):
+    school_id: int
+    year: int
+    created: int = Field(description="Gradebooks created")
+    skipped: int = Field(description="Teacher/class pairs that already had a gradebook")
+
+
+class ContentRegistryPatchResult(BaseModel):
+    id: int
+    version: int = Field(description="New content registry version, sent back on the next save")
+    progress: int = Field(description="Gradebook progress (0-100)")
+    lessons_filled: int = Field(description="Lessons with recorded content")
+    lessons_total: int = Field(description="Lessons in the content registry")
+
+
+class GradebookStatusTransitionResult(BaseModel):
+    status: str = Field(description="Target status")
+    matched: int = Field(description="Gradebooks selected by the ids or filters")
+    updated: int = Field(description="Gradebooks moved to the target status")
+    unchanged: int = Field(description="Gradebooks already in the target status")
+    rejected: int = Field(description="Gradebooks whose current status cannot move to the target")
+    by_status: Dict[str, int] = Field(description="Selected gradebooks per status before the transition")
+
+
+class MissingContentItem(BaseModel):
+    gradebook_id: int
+    teacher_code: str
+    teacher_name: str
+    class_code: str
+    class_label: str
+    school_id: int
+    missing: int = Field(description="Lessons in the period without recorded content")
+    first_missing: date = Field(description="Earliest lesson without content in the period")
+
+
+class MissingContentReport(BaseModel):
+    start: date
+    end: date
+    gradebooks: List[MissingContentItem]
+
+
+class JobStatus(str, Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class GradebookProgressEvent(BaseModel):
+    id: int
+    teacher_id: int
+    status: str
+    progress: int = Field(description="Gradebook progress (0-100)")
+
+
+class JobProgressEvent(BaseModel):
+    job_id: str = Field(description="Client-provided identifier of the background job")
+    kind: str = Field(description="Kind of job, e.g. gradebook_generation")
+    status: JobStatus
+    done: int = Field(0, description="Items processed so far")
+    total: int = Field(0, description="Items to process")
+
+
+class CascadeDeletionJob(BaseModel):
+    id: int
+    job_id: str = Field(description="Job identifier for progress events at /api/gradebooks/events/?job_id=")
+    target: Literal['school', 'calendar']
+    target_id: int
+    label: str = Field(description="School name or calendar year")
+    status: str
+    done: int = Field(description="Rows deleted so far")
+    total: int = Field(description="Rows to delete, estimated when the job starts")
+    deleted: Dict[str, int] = Field(default_factory=dict, description="Rows deleted by kind")
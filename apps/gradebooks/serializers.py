@@ -1,10 +1,19 @@
+from datetime import date
+
 from rest_framework import serializers
-from apps.gradebooks.models import Gradebook
+from apps.academic_calendars.models import AcademicCalendar
+from apps.academic_calendars.schemas import StageId
+from apps.gradebooks.models import Gradebook, GradebookStatus
+from apps.gradebooks.services import GradebookContentService, GradebookStatusService
+from apps.schools.models import School
 from apps.teachers.serializers import TeacherSerializer
 from apps.academic_calendars.serializers import AcademicCalendarSerializer
+from apps.classes.serializers import ClassResumedSerializer, TeacherResumedSerializer
+from apps.schools.serializers import SchoolSerializer
+from esmeraldinha.serializers import SparseFieldsetMixin
 
 
-class GradebookSerializer(serializers.ModelSerializer):
+class GradebookSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     teacher = TeacherSerializer(read_only=True)
     calendar = AcademicCalendarSerializer(read_only=True)
 
@@ -17,6 +26,146 @@ class GradebookSerializer(serializers.ModelSerializer):
             'status',
             'title',
             'progress',
+            'lessons_filled',
+            'lessons_total',
+            'version',
+            'content_registry',
+            'created_at'
+        ]
+        read_only_fields = ['id', 'status', 'progress', 'lessons_filled', 'lessons_total', 'version', 'content_registry', 'created_at']
+        expandable_fields = ['teacher', 'calendar', 'content_registry']
+
+
+class GradebookSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    teacher = TeacherResumedSerializer(read_only=True)
+    academic_class = ClassResumedSerializer(read_only=True)
+    school = SchoolSerializer(source='academic_class.school', read_only=True)
+    calendar_year = serializers.IntegerField(
+        source='calendar.year', read_only=True,
+        help_text="Ano do calendário (detalhes em /api/academic-calendars/{year}/)")
+
+    class Meta:
+        model = Gradebook
+        fields = [
+            'id',
+            'teacher',
+            'academic_class',
+            'school',
+            'calendar_year',
+            'status',
+            'title',
+            'progress',
             'created_at'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = fields
+        expandable_fields = ['teacher', 'academic_class', 'school']
+
+
+class GradebookGenerateSerializer(serializers.Serializer):
+    school_id = serializers.PrimaryKeyRelatedField(
+        queryset=School.objects.all(),
+        source='school',
+        help_text="Escola cujas turmas receberão cadernetas",
+    )
+    year = serializers.IntegerField(
+        help_text="Ano do calendário letivo usado nas cadernetas")
+    job_id = serializers.CharField(
+        required=False, max_length=64,
+        help_text="Identificador opcional para acompanhar o andamento em /api/gradebooks/events/?job_id=")
+
+    def validate(self, attrs):
+        calendar = AcademicCalendar.objects.filter(year=attrs['year']).first()
+        if calendar is None:
+            raise serializers.ValidationError(
+                {'year': f"Calendário {attrs['year']} não encontrado."})
+        attrs['calendar'] = calendar
+        return attrs
+
+
+class LessonContentPatchSerializer(serializers.Serializer):
+    content = serializers.CharField(
+        required=False, allow_blank=True,
+        help_text="Conteúdo ministrado na aula")
+    present = serializers.IntegerField(
+        required=False, allow_null=True, min_value=0,
+        help_text="Alunos presentes")
+    absent = serializers.IntegerField(
+        required=False, allow_null=True, min_value=0,
+        help_text="Alunos ausentes")
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Informe ao menos um campo da aula.")
+        return attrs
+
+
+class GradebookContentPatchSerializer(serializers.Serializer):
+    version = serializers.IntegerField(
+        min_value=0,
+        help_text="Versão do registro que foi editada; salvamentos concorrentes retornam 409")
+    lessons = serializers.DictField(
+        child=LessonContentPatchSerializer(),
+        allow_empty=False,
+        help_text="Aulas alteradas, indexadas pela data (YYYY-MM-DD)")
+
+    def validate_lessons(self, value):
+        if len(value) > GradebookContentService.MAX_LESSONS_PER_PATCH:
+            raise serializers.ValidationError(
+                f"Envie no máximo {GradebookContentService.MAX_LESSONS_PER_PATCH} aulas por salvamento.")
+        invalid = []
+        for day in value:
+            try:
+                date.fromisoformat(day)
+            except ValueError:
+                invalid.append(day)
+        if invalid:
+            raise serializers.ValidationError(f"Datas inválidas: {', '.join(invalid)}")
+        return {day: dict(lesson) for day, lesson in value.items()}
+
+
+class GradebookStatusTransitionSerializer(serializers.Serializer):
+    FILTERS = ('school_id', 'class_id', 'teacher_id', 'year')
+
+    status = serializers.ChoiceField(
+        choices=GradebookStatus.choices, help_text="Status de destino")
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False,
+        max_length=GradebookStatusService.MAX_IDS,
+        help_text="Cadernetas a alterar; pode ser combinado com os filtros")
+    school_id = serializers.IntegerField(required=False, help_text="Escola das turmas")
+    class_id = serializers.IntegerField(required=False, help_text="Turma")
+    teacher_id = serializers.IntegerField(required=False, help_text="Professor")
+    year = serializers.IntegerField(required=False, help_text="Ano do calendário")
+
+    def validate(self, attrs):
+        if 'ids' not in attrs and not any(name in attrs for name in self.FILTERS):
+            raise serializers.ValidationError(
+                "Informe as cadernetas (ids) ou ao menos um filtro.")
+        return attrs
+
+
+class MissingContentQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(help_text="Primeiro dia do período")
+    end = serializers.DateField(help_text="Último dia do período")
+    school_id = serializers.IntegerField(
+        required=False, help_text="Restringe o relatório a uma escola")
+
+    def validate(self, attrs):
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError(
+                {'end': "O fim do período deve ser posterior ao início."})
+        return attrs
+
+
+class GradebookExportQuerySerializer(serializers.Serializer):
+    school_id = serializers.IntegerField(
+        required=False, help_text="Escola das turmas")
+    class_id = serializers.IntegerField(
+        required=False, help_text="Turma")
+    teacher_id = serializers.IntegerField(
+        required=False, help_text="Professor")
+    stage = serializers.ChoiceField(
+        choices=[stage.value for stage in StageId], required=False,
+        help_text="Etapa do calendário")
+    year = serializers.IntegerField(
+        required=False, help_text="Ano do calendário")
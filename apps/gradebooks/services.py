@@ -0,0 +1,1113 @@
+import csv
+import hashlib
+import json
+import logging
+import multiprocessing
+import re
+import tempfile
+import zipfile
+from datetime import date
+import numpy as np
+import pandas as pd
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, QuerySet, TextField, Value
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from apps.academic_calendars.models import AcademicCalendar
+from apps.academic_calendars.schemas import DayType, Stage
+from apps.academic_calendars.services import build_day_arrays, stage_index
+from apps.classes.models import Class
+from apps.gradebooks.models import (
+    CascadeDeletion, CascadeDeletionStatus, DeletionTarget, Gradebook, GradebookLesson, GradebookRegeneration,
+    GradebookStatus, RegenerationStatus,
+)
+from apps.gradebooks.rendering import RENDERER_VERSION, render_gradebook_pdf_to_file
+from apps.gradebooks.events import publish_gradebook_progress, publish_job_progress
+from apps.gradebooks.expressions import JSONMergePatch
+from apps.gradebooks.schemas import (
+    CascadeDeletionJob,
+    ContentRegistryPatchResult,
+    GradebookGenerationResult,
+    GradebookStatusTransitionResult,
+    JobProgressEvent,
+    JobStatus,
+    MissingContentItem,
+    MissingContentReport,
+)
+from apps.schools.models import School
+from apps.schools.services import invalidate_school_summaries
+from apps.teachers.models import ReductionDay, Teacher
+
+
+logger = logging.getLogger(__name__)
+
+
+def weekdays(dates: np.ndarray) -> np.ndarray:
+    """Dia da semana de cada data ``datetime64[D]`` (segunda = 0)."""
+    return (dates.astype(np.int64) + 3) % 7
+
+
+def school_day_stages(year: int, calendar_data: dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Dias letivos do ano e a etapa de cada dia.
+
+    Returns:
+        Datas ``datetime64[D]`` do ano, máscara dos dias letivos e o id da
+        etapa de cada dia (``None`` fora de etapa).
+    """
+    dates, types, _ = build_day_arrays(year, calendar_data.get("days", []))
+    stages = [Stage(**stage) for stage in calendar_data.get("stages", [])]
+    stage_ids = np.array([stage.id.value for stage in stages] + [None], dtype=object)
+    return dates, types == DayType.SCHOOL_DAY.value, stage_ids[stage_index(dates, stages)]
+
+
+def lesson_dates(year: int, calendar_data: dict, reduction_day: Optional[int] = None) -> List[Tuple[str, Optional[str]]]:
+    """
+    Calcula as datas de aula de um professor no calendário.
+
+    Args:
+        year: Ano do calendário.
+        calendar_data: Dados do calendário (dias e etapas).
+        reduction_day: Dia de redução do professor (``ReductionDay``,
+            segunda = 1), que não tem aula.
+
+    Returns:
+        Lista ordenada de ``(data, etapa)`` para cada dia letivo com aula.
+    """
+    dates, has_lesson, stages = school_day_stages(year, calendar_data)
+    if reduction_day:
+        has_lesson &= weekdays(dates) != reduction_day - 1
+    return [(str(day), stage) for day, stage in zip(dates[has_lesson], stages[has_lesson])]
+
+
+def changed_lesson_days(year: int, previous_data: dict, calendar_data: dict) -> List[str]:
+    """
+    Datas em que a condição de aula mudou entre duas versões do calendário.
+
+    Uma aula depende apenas de o dia ser letivo e da etapa que o contém (o
+    dia de redução do professor não depende do calendário), então só essas
+    datas precisam ser revistas nas cadernetas.
+    """
+    dates, previous_school, previous_stages = school_day_stages(year, previous_data)
+    _, school, stages = school_day_stages(year, calendar_data)
+    changed = (previous_school != school) | (school & (previous_stages != stages))
+    return [str(day) for day in dates[changed]]
+
+
+def build_content_registry(lessons: List[Tuple[str, Optional[str]]]) -> dict:
+    """Monta um ``content_registry`` vazio (ver ``ContentRegistry``) para as aulas."""
+    return {
+        "lessons": {
+            day: {"stage": stage, "content": ""}
+            for day, stage in lessons
+        }
+    }
+
+
+class GradebookGenerationService:
+    """Gera em lote as cadernetas de todos os pares professor/turma de uma escola."""
+
+    BATCH_SIZE = 500
+    LESSON_BATCH_SIZE = 2000
+
+    def _title(self, class_label: str, year: int) -> str:
+        return f"{class_label} - {year}"
+
+    def _report(self, job_id: Optional[str], status: JobStatus, done: int, total: int):
+        if job_id:
+            publish_job_progress(JobProgressEvent(
+                job_id=job_id, kind='gradebook_generation', status=status, done=done, total=total))
+
+    def _create_batch(self, school: School, calendar: AcademicCalendar,
+                      batch: List[Tuple[Gradebook, List[Tuple[str, Optional[str]]]]]):
+        Gradebook.objects.bulk_create([gradebook for gradebook, _ in batch], ignore_conflicts=True)
+        invalidate_school_summaries(school.id)
+        ids = {
+            (teacher_id, class_id): gradebook_id
+            for gradebook_id, teacher_id, class_id in (
+                Gradebook.objects
+                .filter(
+                    calendar=calendar,
+                    teacher_id__in={gradebook.teacher_id for gradebook, _ in batch},
+                    academic_class_id__in={gradebook.academic_class_id for gradebook, _ in batch},
+                )
+                .values_list('id', 'teacher_id', 'academic_class_id')
+            )
+        }
+        GradebookLesson.objects.bulk_create(
+            (
+                GradebookLesson(
+                    gradebook_id=ids[(gradebook.teacher_id, gradebook.academic_class_id)],
+                    date=day,
+                    stage=stage,
+                )
+                for gradebook, lessons in batch
+                for day, stage in lessons
+            ),
+            batch_size=self.LESSON_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    def generate_for_school(self, school: School, calendar: AcademicCalendar,
+                            job_id: Optional[str] = None) -> GradebookGenerationResult:
+        """
+        Cria as cadernetas que ainda não existem para a escola no calendário.
+
+        As datas de aula dependem apenas do calendário e do dia de redução do
+        professor, então cada registro é calculado uma vez por dia de redução
+        e reaproveitado para todos os professores com o mesmo dia. Cada lote
+        cria as cadernetas e suas aulas (``GradebookLesson``) na mesma transação.
+
+        Args:
+            school: Escola cujas turmas e professores recebem cadernetas.
+            calendar: Calendário letivo usado para as datas de aula.
+            job_id: Identificador opcional para publicar o andamento a cada lote.
+
+        Returns:
+            Quantidade de cadernetas criadas e de pares já existentes.
+        """
+        pairs = (
+            Class.objects
+            .filter(school=school, teachers__isnull=False)
+            .values_list('id', 'label', 'teachers__id', 'teachers__code', 'teachers__reduction_day')
+        )
+        existing = set(
+            Gradebook.objects
+            .filter(calendar=calendar, academic_class__school=school)
+            .values_list('teacher_id', 'academic_class_id')
+        )
+
+        registries: Dict[int, List[Tuple[str, Optional[str]]]] = {}
+        new_gradebooks: List[Tuple[Gradebook, List[Tuple[str, Optional[str]]]]] = []
+        skipped = 0
+        for class_id, class_label, teacher_id, teacher_code, reduction_day in pairs:
+            if (teacher_id, class_id) in existing:
+                skipped += 1
+                continue
+            if reduction_day not in registries:
+                registries[reduction_day] = lesson_dates(calendar.year, calendar.calendar_data, reduction_day)
+            lessons = registries[reduction_day]
+            new_gradebooks.append((Gradebook(
+                teacher_id=teacher_id,
+                teacher_code=teacher_code,
+                calendar=calendar,
+                academic_class_id=class_id,
+                content_registry=build_content_registry(lessons),
+                lessons_total=len(lessons),
+                title=self._title(class_label, calendar.year),
+            ), lessons))
+
+        total = len(new_gradebooks)
+        done = 0
+        self._report(job_id, JobStatus.RUNNING, done, total)
+        try:
+            for start in range(0, total, self.BATCH_SIZE):
+                batch = new_gradebooks[start:start + self.BATCH_SIZE]
+                with transaction.atomic():
+                    self._create_batch(school, calendar, batch)
+                done += len(batch)
+                self._report(job_id, JobStatus.RUNNING, done, total)
+        except Exception:
+            self._report(job_id, JobStatus.FAILED, done, total)
+            raise
+        self._report(job_id, JobStatus.COMPLETED, total, total)
+
+        return GradebookGenerationResult(
+            school_id=school.id,
+            year=calendar.year,
+            created=len(new_gradebooks),
+            skipped=skipped,
+        )
+
+
+# Conteúdo só com espaços conta como vazio, como no ``str.strip()`` do cálculo do progresso
+BLANK_CONTENT_REGEX = r'^\s*$'
+
+
+def compute_progress(lessons_filled: int, lessons_total: int) -> int:
+    """Percentual de aulas com conteúdo registrado."""
+    if not lessons_total:
+        return 0
+    return round(100 * lessons_filled / lessons_total)
+
+
+class ContentVersionConflict(Exception):
+    """O registro de conteúdo foi salvo por outra requisição desde a versão informada."""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Versão atual do registro é {current_version}.")
+        self.current_version = current_version
+
+
+class GradebookContentService:
+    """Salva alterações parciais das aulas sem reler nem regravar o registro inteiro."""
+
+    MAX_LESSONS_PER_PATCH = 100
+    ATTENDANCE_FIELDS = ('present', 'absent')
+
+    def apply_patch(self, gradebook_id: int, version: int, lessons: Dict[str, dict]) -> ContentRegistryPatchResult:
+        """
+        Aplica os campos enviados às aulas alteradas da caderneta.
+
+        Lê apenas as aulas alteradas (``GradebookLesson``) para ajustar a
+        contagem de aulas preenchidas, grava o conteúdo também no
+        ``content_registry`` derivado com um merge-patch no banco e protege
+        tudo com a versão informada.
+
+        Args:
+            gradebook_id: ID da caderneta.
+            version: Versão do registro que o cliente editou.
+            lessons: Por data (``YYYY-MM-DD``), os campos alterados da aula:
+                ``content``, ``present`` e/ou ``absent``.
+
+        Returns:
+            Nova versão e progresso da caderneta.
+
+        Raises:
+            NotFound: Caderneta inexistente.
+            ValueError: Datas que não são aulas da caderneta.
+            ContentVersionConflict: O registro mudou desde ``version``.
+        """
+        with transaction.atomic():
+            row = (
+                Gradebook.objects
+                .filter(pk=gradebook_id)
+                .values('version', 'lessons_filled', 'lessons_total', 'teacher_id', 'status',
+                        'academic_class__school_id')
+                .first()
+            )
+            if row is None:
+                raise NotFound(f"Caderneta {gradebook_id} não encontrada.")
+            if row['version'] != version:
+                raise ContentVersionConflict(row['version'])
+
+            rows = list(
+                GradebookLesson.objects
+                .filter(gradebook_id=gradebook_id, date__in=list(lessons))
+                .only('id', 'date', 'content', 'present', 'absent', 'attendance_recorded')
+            )
+            found = {lesson.date.isoformat() for lesson in rows}
+            unknown = sorted(day for day in lessons if day not in found)
+            if unknown:
+                raise ValueError(f"Datas sem aula na caderneta: {', '.join(unknown)}")
+
+            delta = 0
+            for lesson in rows:
+                changes = lessons[lesson.date.isoformat()]
+                if 'content' in changes:
+                    delta += bool(changes['content'].strip()) - bool(lesson.content.strip())
+                    lesson.content = changes['content']
+                for field in self.ATTENDANCE_FIELDS:
+                    if field in changes:
+                        setattr(lesson, field, changes[field])
+                        lesson.attendance_recorded = True
+
+            lessons_filled = row['lessons_filled'] + delta
+            progress = compute_progress(lessons_filled, row['lessons_total'])
+            updates = {
+                'lessons_filled': lessons_filled,
+                'progress': progress,
+                'version': F('version') + 1,
+            }
+            patch = {
+                "lessons": {
+                    day: {"content": changes['content']}
+                    for day, changes in lessons.items() if 'content' in changes
+                }
+            }
+            if patch["lessons"]:
+                updates['content_registry'] = JSONMergePatch(
+                    F('content_registry'),
+                    Value(json.dumps(patch, ensure_ascii=False), output_field=TextField()),
+                )
+
+            if not Gradebook.objects.filter(pk=gradebook_id, version=version).update(**updates):
+                current = Gradebook.objects.filter(pk=gradebook_id).values_list('version', flat=True).first()
+                raise ContentVersionConflict(current)
+            GradebookLesson.objects.bulk_update(
+                rows, ['content', 'attendance_recorded', *self.ATTENDANCE_FIELDS])
+            invalidate_school_summaries(row['academic_class__school_id'])
+
+        publish_gradebook_progress(Gradebook(
+            id=gradebook_id, teacher_id=row['teacher_id'], status=row['status'], progress=progress))
+        return ContentRegistryPatchResult(
+            id=gradebook_id,
+            version=version + 1,
+            progress=progress,
+            lessons_filled=lessons_filled,
+            lessons_total=row['lessons_total'],
+        )
+
+
+class GradebookStatusService:
+    """Transições de status em lote, validadas e aplicadas no banco."""
+
+    MAX_IDS = 5000
+    TRANSITIONS = {
+        GradebookStatus.PENDING: {GradebookStatus.IN_PROGRESS, GradebookStatus.CANCELLED},
+        GradebookStatus.IN_PROGRESS: {GradebookStatus.COMPLETED, GradebookStatus.CANCELLED},
+        GradebookStatus.COMPLETED: {GradebookStatus.IN_PROGRESS},
+        GradebookStatus.CANCELLED: {GradebookStatus.PENDING},
+    }
+
+    def sources(self, target: str) -> List[str]:
+        """Status a partir dos quais ``target`` é permitido."""
+        return [source for source, targets in self.TRANSITIONS.items() if target in targets]
+
+    def transition(self, gradebooks: QuerySet, target: str) -> GradebookStatusTransitionResult:
+        """
+        Move as cadernetas selecionadas para ``target``.
+
+        A transição é um único ``UPDATE`` filtrado pelas origens permitidas;
+        a contagem por status é feita na mesma transação. Cadernetas em
+        status incompatíveis ficam como estão e são contadas em ``rejected``.
+
+        Args:
+            gradebooks: Cadernetas selecionadas (por ids ou filtros).
+            target: Status de destino.
+
+        Returns:
+            Contagem por status antes da transição e quantas foram movidas.
+        """
+        movable = gradebooks.filter(status__in=self.sources(target)).order_by()
+        with transaction.atomic():
+            by_status = dict(
+                gradebooks.order_by().values_list('status').annotate(total=Count('id')))
+            # Só as que saem de uma origem permitida: as que já estavam em target não geram evento
+            moving = list(movable.values_list('id', 'teacher_id', 'progress', 'academic_class__school_id'))
+            updated = movable.update(status=target) if moving else 0
+            if updated:
+                invalidate_school_summaries(*{school_id for *_, school_id in moving})
+                for gradebook_id, teacher_id, progress, _ in moving:
+                    publish_gradebook_progress(Gradebook(
+                        id=gradebook_id, teacher_id=teacher_id, status=target, progress=progress))
+
+        matched = sum(by_status.values())
+        unchanged = by_status.get(target, 0)
+        return GradebookStatusTransitionResult(
+            status=target,
+            matched=matched,
+            updated=updated,
+            unchanged=unchanged,
+            rejected=matched - updated - unchanged,
+            by_status=by_status,
+        )
+
+
+class GradebookReportService:
+    """Relatórios entre cadernetas, consultados direto na tabela de aulas."""
+
+    def missing_content(self, start: date, end: date, school_id: Optional[int] = None) -> MissingContentReport:
+        """
+        Cadernetas com aulas sem conteúdo registrado no período.
+
+        Args:
+            start: Primeiro dia do período.
+            end: Último dia do período.
+            school_id: Restringe a uma escola.
+
+        Returns:
+            Uma linha por caderneta com as aulas sem conteúdo (vazio ou só
+            espaços), ordenadas pela quantidade de pendências.
+        """
+        lessons = GradebookLesson.objects.filter(date__range=(start, end), content__regex=BLANK_CONTENT_REGEX)
+        if school_id is not None:
+            lessons = lessons.filter(gradebook__academic_class__school_id=school_id)
+        rows = (
+            lessons
+            .values(
+                'gradebook_id',
+                'gradebook__teacher__code',
+                'gradebook__teacher__name',
+                'gradebook__academic_class__code',
+                'gradebook__academic_class__label',
+                'gradebook__academic_class__school_id',
+            )
+            .annotate(missing=Count('id'), first_missing=Min('date'))
+            .order_by('-missing', 'gradebook_id')
+        )
+        return MissingContentReport(start=start, end=end, gradebooks=[
+            MissingContentItem(
+                gradebook_id=row['gradebook_id'],
+                teacher_code=row['gradebook__teacher__code'],
+                teacher_name=row['gradebook__teacher__name'],
+                class_code=row['gradebook__academic_class__code'],
+                class_label=row['gradebook__academic_class__label'],
+                school_id=row['gradebook__academic_class__school_id'],
+                missing=row['missing'],
+                first_missing=row['first_missing'],
+            )
+            for row in rows
+        ])
+
+
+def rebuild_content_registries(gradebook_ids: List[int]):
+    """
+    Recalcula o ``content_registry`` derivado e os contadores das cadernetas a
+    partir da tabela de aulas, incrementando a versão do registro.
+    """
+    lessons: Dict[int, dict] = {gradebook_id: {} for gradebook_id in gradebook_ids}
+    rows = (
+        GradebookLesson.objects
+        .filter(gradebook_id__in=gradebook_ids)
+        .order_by('gradebook_id', 'date')
+        .values_list('gradebook_id', 'date', 'stage', 'content')
+    )
+    for gradebook_id, day, stage, content in rows.iterator(chunk_size=2000):
+        lessons[gradebook_id][day.isoformat()] = {"stage": stage, "content": content}
+
+    gradebooks = []
+    for gradebook_id, registry in lessons.items():
+        filled = sum(1 for lesson in registry.values() if lesson["content"].strip())
+        gradebooks.append(Gradebook(
+            id=gradebook_id,
+            content_registry={"lessons": registry},
+            lessons_total=len(registry),
+            lessons_filled=filled,
+            progress=compute_progress(filled, len(registry)),
+            version=F('version') + 1,
+        ))
+    Gradebook.objects.bulk_update(
+        gradebooks, ['content_registry', 'lessons_total', 'lessons_filled', 'progress', 'version'])
+    invalidate_school_summaries(*(
+        Class.objects.filter(gradebooks__id__in=gradebook_ids).values_list('school_id', flat=True).distinct()))
+    return gradebooks
+
+
+_regeneration_executor: Optional[ThreadPoolExecutor] = None
+
+
+def submit_regeneration(regeneration_id: int):
+    """Executa a regeneração em segundo plano ou, se desativado, imediatamente."""
+    global _regeneration_executor
+    if not settings.GRADEBOOK_REGENERATION_ASYNC:
+        GradebookRegenerationService().run(regeneration_id)
+        return
+    if _regeneration_executor is None:
+        _regeneration_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='gradebook-regeneration')
+    _regeneration_executor.submit(_run_regeneration_in_thread, regeneration_id)
+
+
+def _run_regeneration_in_thread(regeneration_id: int):
+    try:
+        GradebookRegenerationService().run(regeneration_id)
+    finally:
+        connection.close()
+
+
+class GradebookRegenerationService:
+    """Ajusta as aulas das cadernetas afetadas por mudanças no calendário."""
+
+    BATCH_SIZE = 200
+
+    def schedule(self, calendar: AcademicCalendar, previous_data: dict) -> Optional[GradebookRegeneration]:
+        """
+        Registra as datas alteradas e agenda a regeneração após o commit.
+
+        Returns:
+            A regeneração criada, ou ``None`` se nenhuma aula é afetada.
+        """
+        dates = changed_lesson_days(calendar.year, previous_data, calendar.calendar_data)
+        if not dates or not Gradebook.objects.filter(calendar=calendar).exists():
+            return None
+        regeneration = GradebookRegeneration.objects.create(calendar=calendar, dates=dates)
+        transaction.on_commit(lambda: submit_regeneration(regeneration.id))
+        return regeneration
+
+    def _report(self, regeneration: GradebookRegeneration, status: JobStatus, done: int, total: int):
+        publish_job_progress(JobProgressEvent(
+            job_id=f"regeneration-{regeneration.id}", kind='gradebook_regeneration',
+            status=status, done=done, total=total))
+
+    def _expected_lessons(self, calendar: AcademicCalendar, days: List[str]) -> Dict[Optional[int], Dict[str, Optional[str]]]:
+        """Para cada dia de redução, as datas afetadas que devem ter aula e sua etapa."""
+        dates, school, stages = school_day_stages(calendar.year, calendar.calendar_data)
+        positions = (np.array(days, dtype='datetime64[D]') - dates[0]).astype(np.int64)
+        day_weekdays = weekdays(dates[positions])
+        school_days = [
+            (day, stages[position], weekday)
+            for day, position, weekday in zip(days, positions, day_weekdays)
+            if school[position]
+        ]
+        expected = {None: {day: stage for day, stage, _ in school_days}}
+        for reduction_day in ReductionDay.values:
+            expected[reduction_day] = {
+                day: stage for day, stage, weekday in school_days if weekday != reduction_day - 1
+            }
+        return expected
+
+    def _regenerate_batch(self, regeneration: GradebookRegeneration, days: List[str],
+                          expected: Dict[Optional[int], Dict[str, Optional[str]]], batch: List[tuple]):
+        existing: Dict[int, Dict[str, tuple]] = {gradebook_id: {} for gradebook_id, *_ in batch}
+        rows = (
+            GradebookLesson.objects
+            .filter(gradebook_id__in=list(existing), date__in=days)
+            .values_list('id', 'gradebook_id', 'date', 'stage', 'content', 'attendance_recorded')
+        )
+        for lesson_id, gradebook_id, day, stage, content, attendance_recorded in rows:
+            existing[gradebook_id][day.isoformat()] = (
+                lesson_id, stage, bool(content.strip()) or attendance_recorded)
+
+        to_delete, to_restage, to_create, touched = [], [], [], []
+        for gradebook_id, teacher_id, status, reduction_day in batch:
+            wanted = expected.get(reduction_day, expected[None])
+            current = existing[gradebook_id]
+            changed = False
+            for day, (lesson_id, stage, recorded) in current.items():
+                if day not in wanted:
+                    if recorded:
+                        regeneration.lessons_kept += 1
+                    else:
+                        to_delete.append(lesson_id)
+                        changed = True
+                elif stage != wanted[day]:
+                    to_restage.append(GradebookLesson(id=lesson_id, stage=wanted[day]))
+                    changed = True
+            for day in wanted.keys() - current.keys():
+                to_create.append(GradebookLesson(gradebook_id=gradebook_id, date=day, stage=wanted[day]))
+                changed = True
+            if changed:
+                touched.append((gradebook_id, teacher_id, status))
+
+        if not touched:
+            return
+        with transaction.atomic():
+            GradebookLesson.objects.filter(id__in=to_delete).delete()
+            GradebookLesson.objects.bulk_update(to_restage, ['stage'])
+            GradebookLesson.objects.bulk_create(to_create, ignore_conflicts=True)
+            rebuilt = rebuild_content_registries([gradebook_id for gradebook_id, *_ in touched])
+            for gradebook, (_, teacher_id, status) in zip(rebuilt, touched):
+                gradebook.teacher_id, gradebook.status = teacher_id, status
+                publish_gradebook_progress(gradebook)
+
+        regeneration.gradebooks_updated += len(touched)
+        regeneration.lessons_added += len(to_create)
+        regeneration.lessons_removed += len(to_delete)
+        regeneration.lessons_restaged += len(to_restage)
+
+    def run(self, regeneration_id: int) -> GradebookRegeneration:
+        """
+        Ajusta, em lotes de cadernetas, apenas as aulas nas datas alteradas.
+
+        Aulas criadas recebem conteúdo vazio; aulas em datas que deixaram de
+        ser letivas são removidas, exceto as que já têm conteúdo ou frequência
+        registrados, que são mantidas e contadas em ``lessons_kept``. Cadernetas
+        sem aulas afetadas não são alteradas.
+
+        Args:
+            regeneration_id: ID da ``GradebookRegeneration`` a processar.
+
+        Returns:
+            A regeneração com as contagens do processamento.
+        """
+        regeneration = GradebookRegeneration.objects.select_related('calendar').get(pk=regeneration_id)
+        if regeneration.status == RegenerationStatus.COMPLETED:
+            return regeneration
+        regeneration.status = RegenerationStatus.RUNNING
+        regeneration.save(update_fields=['status'])
+
+        days = sorted(regeneration.dates)
+        expected = self._expected_lessons(regeneration.calendar, days)
+        gradebooks = (
+            Gradebook.objects
+            .filter(calendar=regeneration.calendar)
+            .order_by('id')
+            .values_list('id', 'teacher_id', 'status', 'teacher__reduction_day')
+        )
+        total = gradebooks.count()
+        done = 0
+        self._report(regeneration, JobStatus.RUNNING, done, total)
+        try:
+            batch = []
+            for row in gradebooks.iterator(chunk_size=self.BATCH_SIZE):
+                batch.append(row)
+                if len(batch) == self.BATCH_SIZE:
+                    self._regenerate_batch(regeneration, days, expected, batch)
+                    done += len(batch)
+                    batch = []
+                    self._report(regeneration, JobStatus.RUNNING, done, total)
+            if batch:
+                self._regenerate_batch(regeneration, days, expected, batch)
+        except Exception as e:
+            regeneration.status = RegenerationStatus.FAILED
+            regeneration.error = str(e)
+            regeneration.finished_at = timezone.now()
+            regeneration.save()
+            self._report(regeneration, JobStatus.FAILED, done, total)
+            raise
+
+        regeneration.status = RegenerationStatus.COMPLETED
+        regeneration.error = ''
+        regeneration.finished_at = timezone.now()
+        regeneration.save()
+        self._report(regeneration, JobStatus.COMPLETED, total, total)
+        return regeneration
+
+
+_deletion_executor: Optional[ThreadPoolExecutor] = None
+
+
+def submit_deletion(deletion_id: int):
+    """Executa a exclusão em segundo plano ou, se desativado, imediatamente."""
+    global _deletion_executor
+    if not settings.CASCADE_DELETION_ASYNC:
+        CascadeDeletionService().run(deletion_id)
+        return
+    if _deletion_executor is None:
+        _deletion_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='cascade-deletion')
+    _deletion_executor.submit(_run_deletion_in_thread, deletion_id)
+
+
+def _run_deletion_in_thread(deletion_id: int):
+    try:
+        CascadeDeletionService().run(deletion_id)
+    finally:
+        connection.close()
+
+
+class CascadeDeletionService:
+    """
+    Exclui escolas e calendários com seus dependentes em lotes, fora da requisição.
+
+    Em vez de o ``Collector`` do Django carregar todos os dependentes em
+    memória e apagá-los em uma transação longa, cada etapa (aulas, cadernetas,
+    vínculos, turmas) remove até ``BATCH_SIZE`` linhas por transação, dos
+    filhos para os pais, e o alvo é removido por último.
+    """
+
+    BATCH_SIZE = 1000
+    LESSON_BATCH_SIZE = 5000
+
+    def schedule(self, target) -> CascadeDeletion:
+        """
+        Registra a exclusão de ``target`` (escola ou calendário) e a agenda após o commit.
+
+        Se já houver uma exclusão pendente ou em andamento do mesmo alvo, ela é retornada.
+        """
+        if isinstance(target, School):
+            kind, label = DeletionTarget.SCHOOL, target.name
+        else:
+            kind, label = DeletionTarget.CALENDAR, str(target.year)
+        active = CascadeDeletion.objects.filter(
+            target=kind, target_id=target.pk,
+            status__in=[CascadeDeletionStatus.PENDING, CascadeDeletionStatus.RUNNING],
+        ).first()
+        if active:
+            return active
+        deletion = CascadeDeletion.objects.create(target=kind, target_id=target.pk, label=label)
+        transaction.on_commit(lambda: submit_deletion(deletion.id))
+        return deletion
+
+    def steps(self, deletion: CascadeDeletion) -> List[Tuple[str, QuerySet, int]]:
+        """Etapas da exclusão, dos dependentes para o alvo: (nome, linhas, tamanho do lote)."""
+        target_id = deletion.target_id
+        if deletion.target == DeletionTarget.SCHOOL:
+            return [
+                ('lessons', GradebookLesson.objects.filter(
+                    gradebook__academic_class__school_id=target_id), self.LESSON_BATCH_SIZE),
+                ('gradebooks', Gradebook.objects.filter(academic_class__school_id=target_id), self.BATCH_SIZE),
+                ('assignments', Teacher.classes.through.objects.filter(
+                    **{'class__school_id': target_id}), self.LESSON_BATCH_SIZE),
+                ('classes', Class.objects.filter(school_id=target_id), self.BATCH_SIZE),
+                ('schools', School.objects.filter(pk=target_id), 1),
+            ]
+        return [
+            ('lessons', GradebookLesson.objects.filter(gradebook__calendar_id=target_id), self.LESSON_BATCH_SIZE),
+            ('gradebooks', Gradebook.objects.filter(calendar_id=target_id), self.BATCH_SIZE),
+            ('regenerations', GradebookRegeneration.objects.filter(calendar_id=target_id), self.BATCH_SIZE),
+            ('calendars', AcademicCalendar.objects.filter(pk=target_id), 1),
+        ]
+
+    def job(self, deletion: CascadeDeletion) -> CascadeDeletionJob:
+        return CascadeDeletionJob(
+            id=deletion.id,
+            job_id=f"deletion-{deletion.id}",
+            target=deletion.target,
+            target_id=deletion.target_id,
+            label=deletion.label,
+            status=deletion.status,
+            done=deletion.done,
+            total=deletion.total,
+            deleted=deletion.deleted,
+        )
+
+    def _report(self, deletion: CascadeDeletion, status: JobStatus):
+        publish_job_progress(JobProgressEvent(
+            job_id=self.job(deletion).job_id, kind=f'{deletion.target}_deletion',
+            status=status, done=deletion.done, total=deletion.total))
+
+    def _delete_batch(self, queryset: QuerySet, size: int) -> int:
+        # Sem ORDER BY: o banco escolhe o índice mais barato para achar o próximo lote
+        ids = list(queryset.order_by().values_list('pk', flat=True)[:size])
+        if not ids:
+            return 0
+        with transaction.atomic():
+            queryset.model.objects.filter(pk__in=ids).delete()
+        return len(ids)
+
+    def run(self, deletion_id: int) -> CascadeDeletion:
+        """
+        Remove os dependentes em lotes e, por fim, o alvo, publicando o andamento a cada lote.
+
+        Pode ser executada de novo após uma interrupção: cada etapa apenas
+        continua removendo as linhas que restam.
+
+        Args:
+            deletion_id: ID da ``CascadeDeletion`` a processar.
+
+        Returns:
+            A exclusão com as contagens por tipo de registro.
+        """
+        deletion = CascadeDeletion.objects.get(pk=deletion_id)
+        if deletion.status == CascadeDeletionStatus.COMPLETED:
+            return deletion
+        steps = self.steps(deletion)
+        if deletion.target == DeletionTarget.SCHOOL:
+            schools = [deletion.target_id]
+        else:
+            schools = list(
+                Class.objects.filter(gradebooks__calendar_id=deletion.target_id)
+                .values_list('school_id', flat=True).distinct())
+        deletion.status = CascadeDeletionStatus.RUNNING
+        deletion.total = deletion.done + sum(queryset.count() for _, queryset, _ in steps)
+        deletion.save(update_fields=['status', 'total'])
+        self._report(deletion, JobStatus.RUNNING)
+
+        try:
+            for name, queryset, size in steps:
+                while removed := self._delete_batch(queryset, size):
+                    deletion.deleted[name] = deletion.deleted.get(name, 0) + removed
+                    deletion.done += removed
+                    deletion.save(update_fields=['deleted', 'done'])
+                    invalidate_school_summaries(*schools)
+                    self._report(deletion, JobStatus.RUNNING)
+        except Exception as e:
+            deletion.status = CascadeDeletionStatus.FAILED
+            deletion.error = str(e)
+            deletion.finished_at = timezone.now()
+            deletion.save()
+            self._report(deletion, JobStatus.FAILED)
+            raise
+
+        deletion.status = CascadeDeletionStatus.COMPLETED
+        deletion.error = ''
+        deletion.total = deletion.done
+        deletion.finished_at = timezone.now()
+        deletion.save()
+        self._report(deletion, JobStatus.COMPLETED)
+        return deletion
+
+
+_render_pools: Dict[int, ProcessPoolExecutor] = {}
+
+
+def get_render_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Pool de processos limitado a ``settings.GRADEBOOK_PDF_WORKERS``.
+
+    Com zero workers a renderização acontece no próprio processo.
+    """
+    workers = settings.GRADEBOOK_PDF_WORKERS
+    if workers <= 0:
+        return None
+    if workers not in _render_pools:
+        _render_pools[workers] = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _render_pools[workers]
+
+
+class _ZipBuffer:
+    """Destino de escrita não posicionável para montar o ZIP em pedaços."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.offset = 0
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+class GradebookPDFService:
+    """Renderiza diários em PDF com cache em disco e um pool de processos limitado."""
+
+    CHUNK_SIZE = 64 * 1024
+    ERRORS_FILENAME = 'ERROS.txt'
+
+    def queryset(self):
+        return Gradebook.objects.select_related(
+            'teacher', 'academic_class__school', 'calendar'
+        ).defer('calendar__calendar_data', 'calendar__processing_errors')
+
+    def build_payload(self, gradebook: Gradebook) -> dict:
+        lessons = (gradebook.content_registry or {}).get('lessons', {})
+        return {
+            'id': gradebook.id,
+            'title': gradebook.title,
+            'year': gradebook.calendar.year,
+            'school': gradebook.academic_class.school.name,
+            'class_code': gradebook.academic_class.code,
+            'class_label': gradebook.academic_class.label,
+            'teacher_code': gradebook.teacher.code,
+            'teacher_name': gradebook.teacher.name,
+            'diary_type': gradebook.teacher.diary_type,
+            'lessons': [
+                {
+                    'date': day,
+                    'stage': lesson.get('stage'),
+                    'content': lesson.get('content', ''),
+                }
+                for day, lesson in sorted(lessons.items())
+            ],
+        }
+
+    def content_hash(self, payload: dict) -> str:
+        encoded = json.dumps(
+            [RENDERER_VERSION, payload], sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def cache_path(self, gradebook_id: int, payload: dict) -> Path:
+        return Path(settings.GRADEBOOK_PDF_CACHE_DIR) / f"{gradebook_id}-{self.content_hash(payload)}.pdf"
+
+    def filename(self, gradebook: Gradebook) -> str:
+        name = f"{gradebook.teacher.code}-{gradebook.academic_class.code}-{gradebook.id}"
+        return re.sub(r'[^\w.-]+', '_', name) + '.pdf'
+
+    def _discard_stale(self, path: Path):
+        for stale in path.parent.glob(f"{path.name.split('-')[0]}-*.pdf"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+
+    def _submit(self, payload: dict, path: Path) -> Future:
+        pool = get_render_pool()
+        if pool is not None:
+            return pool.submit(render_gradebook_pdf_to_file, payload, str(path))
+        # Sem pool, o erro também fica no Future, como aconteceria no processo do pool
+        future = Future()
+        try:
+            future.set_result(render_gradebook_pdf_to_file(payload, str(path)))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _render(self, payload: dict, path: Path):
+        self._submit(payload, path).result()
+        self._discard_stale(path)
+
+    def _open(self, payload: dict, path: Path) -> BinaryIO:
+        """
+        Abre o PDF em cache, renderizando-o se não existir.
+
+        Outra requisição pode descartar o arquivo como obsoleto entre a
+        renderização e a abertura; nesse caso ele é renderizado de novo.
+        Depois de aberto, continua legível mesmo que seja descartado.
+        """
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            self._render(payload, path)
+            return open(path, 'rb')
+
+    def render_many(self, gradebooks: Iterable[Gradebook]) -> Iterator[Tuple[Gradebook, Optional[BinaryIO]]]:
+        """
+        Renderiza as cadernetas em paralelo, reaproveitando PDFs em cache.
+
+        Yields:
+            Pares ``(gradebook, PDF aberto para leitura)`` na ordem em que
+            ficam prontos; quem recebe fecha o arquivo. Se a renderização de
+            uma caderneta falha, o erro vai para o log e o PDF vem como
+            ``None``, sem interromper as demais.
+        """
+        pending: Dict[Future, Tuple[Gradebook, dict, Path]] = {}
+        for gradebook in gradebooks:
+            payload = self.build_payload(gradebook)
+            path = self.cache_path(gradebook.id, payload)
+            try:
+                pdf = open(path, 'rb')
+            except FileNotFoundError:
+                pending[self._submit(payload, path)] = (gradebook, payload, path)
+                continue
+            yield gradebook, pdf
+
+        for future in as_completed(pending):
+            gradebook, payload, path = pending[future]
+            try:
+                future.result()
+                self._discard_stale(path)
+                pdf = self._open(payload, path)
+            except Exception:
+                logger.exception("Falha ao renderizar o diário da caderneta %s", gradebook.id)
+                pdf = None
+            yield gradebook, pdf
+
+    def render(self, gradebook: Gradebook) -> Path:
+        """Retorna o caminho do PDF da caderneta, renderizando-o se não estiver em cache."""
+        payload = self.build_payload(gradebook)
+        path = self.cache_path(gradebook.id, payload)
+        if not path.exists():
+            self._render(payload, path)
+        return path
+
+    def open(self, gradebook: Gradebook) -> BinaryIO:
+        """Abre o PDF da caderneta para leitura, renderizando-o se não estiver em cache."""
+        payload = self.build_payload(gradebook)
+        return self._open(payload, self.cache_path(gradebook.id, payload))
+
+    def iter_zip(self, gradebooks: Iterable[Gradebook]) -> Iterator[bytes]:
+        """
+        Produz um ZIP com os diários, escrevendo cada PDF assim que fica pronto.
+
+        Cadernetas cuja renderização falha ficam de fora e são listadas em
+        ``ERRORS_FILENAME`` no fim do arquivo, que continua um ZIP válido.
+        """
+        buffer = _ZipBuffer()
+        failed: List[Gradebook] = []
+        with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+            for gradebook, pdf in self.render_many(gradebooks):
+                if pdf is None:
+                    failed.append(gradebook)
+                    continue
+                with pdf, archive.open(self.filename(gradebook), mode='w') as entry:
+                    while chunk := pdf.read(self.CHUNK_SIZE):
+                        entry.write(chunk)
+                        yield buffer.drain()
+                yield buffer.drain()
+            if failed:
+                archive.writestr(self.ERRORS_FILENAME, ''.join(
+                    f"{self.filename(gradebook)}: não foi possível gerar o diário da caderneta {gradebook.id}.\n"
+                    for gradebook in failed
+                ))
+        yield buffer.drain()
+
+
+class _Echo:
+    """Destino do ``csv.writer`` que devolve a linha formatada em vez de gravá-la."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class GradebookExportService:
+    """Exporta as aulas das cadernetas em CSV ou XLSX com memória limitada."""
+
+    CHUNK_SIZE = 2000
+    SHEET_NAME = 'Aulas'
+    MAX_SHEET_ROWS = 1_048_576
+    COLUMNS = [
+        ('gradebook__academic_class__school__name', 'escola'),
+        ('gradebook__academic_class__code', 'turma'),
+        ('gradebook__academic_class__label', 'turma_descricao'),
+        ('gradebook__teacher__code', 'professor'),
+        ('gradebook__teacher__name', 'professor_nome'),
+        ('gradebook__calendar__year', 'ano'),
+        ('gradebook_id', 'caderneta'),
+        ('date', 'data'),
+        ('stage', 'etapa'),
+        ('content', 'conteudo'),
+        ('present', 'presentes'),
+        ('absent', 'ausentes'),
+    ]
+
+    def queryset(self, school_id: Optional[int] = None, class_id: Optional[int] = None,
+                 teacher_id: Optional[int] = None, stage: Optional[str] = None,
+                 year: Optional[int] = None):
+        """
+        Aulas a exportar, na ordem do índice (caderneta, data).
+
+        Args:
+            school_id: Escola das turmas.
+            class_id: Turma.
+            teacher_id: Professor.
+            stage: Etapa (``StageId``).
+            year: Ano do calendário.
+        """
+        lessons = GradebookLesson.objects.all()
+        if school_id is not None:
+            lessons = lessons.filter(gradebook__academic_class__school_id=school_id)
+        if class_id is not None:
+            lessons = lessons.filter(gradebook__academic_class_id=class_id)
+        if teacher_id is not None:
+            lessons = lessons.filter(gradebook__teacher_id=teacher_id)
+        if stage is not None:
+            lessons = lessons.filter(stage=stage)
+        if year is not None:
+            lessons = lessons.filter(gradebook__calendar__year=year)
+        return lessons.order_by('gradebook_id', 'date').values_list(
+            *(field for field, _ in self.COLUMNS))
+
+    def iter_rows(self, queryset) -> Iterator[tuple]:
+        return queryset.iterator(chunk_size=self.CHUNK_SIZE)
+
+    def iter_csv(self, queryset) -> Iterator[str]:
+        """Produz o CSV linha a linha, com BOM para abrir corretamente no Excel."""
+        writer = csv.writer(_Echo())
+        yield '\ufeff' + writer.writerow([header for _, header in self.COLUMNS])
+        for row in self.iter_rows(queryset):
+            yield writer.writerow(row)
+
+    def _chunks(self, queryset) -> Iterator[pd.DataFrame]:
+        headers = [header for _, header in self.COLUMNS]
+        rows = []
+        for row in self.iter_rows(queryset):
+            rows.append(row)
+            if len(rows) >= self.CHUNK_SIZE:
+                yield pd.DataFrame.from_records(rows, columns=headers)
+                rows = []
+        if rows:
+            yield pd.DataFrame.from_records(rows, columns=headers)
+
+    def write_xlsx(self, queryset, output):
+        """
+        Grava a planilha em ``output`` processando as aulas em blocos.
+
+        O ``xlsxwriter`` roda em modo ``constant_memory``, que descarta cada
+        linha ao passar para a seguinte; por isso os blocos montados com o
+        pandas são escritos linha a linha, já que ``DataFrame.to_excel``
+        escreve coluna a coluna. Acima do limite de linhas do Excel a
+        planilha continua em novas abas.
+        """
+        options = {'constant_memory': True, 'default_date_format': 'dd/mm/yyyy'}
+        with pd.ExcelWriter(output, engine='xlsxwriter', engine_kwargs={'options': options}) as writer:
+            sheet, row_number, sheets = None, self.MAX_SHEET_ROWS, 0
+            for chunk in self._chunks(queryset):
+                chunk = chunk.astype(object).where(chunk.notna(), None)
+                for values in chunk.itertuples(index=False, name=None):
+                    if row_number >= self.MAX_SHEET_ROWS:
+                        sheets += 1
+                        sheet = self._add_sheet(writer.book, sheets)
+                        row_number = 1
+                    sheet.write_row(row_number, 0, values)
+                    row_number += 1
+            if sheet is None:
+                self._add_sheet(writer.book, 1)
+
+    def _add_sheet(self, book, number: int):
+        sheet = book.add_worksheet(self.SHEET_NAME if number == 1 else f"{self.SHEET_NAME} {number}")
+        sheet.write_row(0, 0, [header for _, header in self.COLUMNS])
+        return sheet
+
+    def xlsx_file(self, queryset):
+        """Planilha em um arquivo temporário, apagado ao ser fechado."""
+        output = tempfile.TemporaryFile()
+        self.write_xlsx(queryset, output)
+        output.seek(0)
+        return output
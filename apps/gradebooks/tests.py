@@ -0,0 +1,1193 @@
+import asyncio
+import csv
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+import fitz
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.academic_calendars.models import AcademicCalendar
+from apps.classes.models import Class
+from apps.gradebooks.models import (
+    CascadeDeletion, CascadeDeletionStatus, Gradebook, GradebookLesson, GradebookRegeneration, GradebookStatus,
+    RegenerationStatus,
+)
+from apps.gradebooks.events import LocalBroker, get_broker, job_channel, stream_limiter
+from apps.gradebooks.rendering import render_gradebook_pdf, render_gradebook_pdf_to_file
+from apps.gradebooks.services import (
+    CascadeDeletionService,
+    GradebookContentService,
+    GradebookExportService,
+    GradebookGenerationService,
+    GradebookPDFService,
+    changed_lesson_days,
+    compute_progress,
+    lesson_dates,
+    rebuild_content_registries,
+)
+from apps.schools.models import School
+from apps.teachers.models import DiaryType, ReductionDay, Teacher
+
+
+def _school_days_calendar(year, stages=None):
+    """Calendário com todos os dias úteis letivos e fins de semana não letivos."""
+    days = []
+    current = date(year, 1, 1)
+    while current.year == year:
+        day_type = 'letivo' if current.weekday() < 5 else 'nao_letivo'
+        days.append({'date': current.isoformat(), 'type': day_type, 'labels': []})
+        current += timedelta(days=1)
+    return {
+        'year': year,
+        'stages': stages or [],
+        'days': days,
+        'legend': [],
+        'monthly_meta': None,
+    }
+
+
+def _create_teacher(code, reduction_day=ReductionDay.MONDAY):
+    return Teacher.objects.create(
+        name=f"Professor {code}",
+        code=code,
+        password="senha-secreta",
+        reduction_day=reduction_day,
+        diary_type=DiaryType.C1,
+    )
+
+
+class LessonDatesTestCase(SimpleTestCase):
+
+    def test_lesson_dates_skip_reduction_day(self):
+        """O dia de redução do professor não tem aula"""
+        lessons = lesson_dates(2026, _school_days_calendar(2026), ReductionDay.MONDAY)
+
+        self.assertEqual(len(lessons), 261 - 52)
+        self.assertNotIn('2026-01-05', [day for day, _ in lessons])
+        self.assertIn('2026-01-06', [day for day, _ in lessons])
+
+    def test_lesson_dates_carry_stage(self):
+        """Cada aula recebe a etapa que contém a data"""
+        calendar = _school_days_calendar(2026, stages=[
+            {'id': 'I', 'start_date': '2026-02-16', 'end_date': '2026-05-08'},
+        ])
+
+        lessons = dict(lesson_dates(2026, calendar))
+
+        self.assertEqual(lessons['2026-02-16'], 'I')
+        self.assertIsNone(lessons['2026-02-13'])
+
+
+class GradebookGenerationTestCase(APITestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(id=1, name="Escola Teste", code=123)
+        self.other_school = School.objects.create(id=2, name="Outra Escola", code=456)
+        self.calendar = AcademicCalendar.objects.create(
+            year=2026, calendar_data=_school_days_calendar(2026))
+
+        self.class_a = Class.objects.create(code="4A", label="4º ano A", school=self.school)
+        self.class_b = Class.objects.create(code="4B", label="4º ano B", school=self.school)
+        other_class = Class.objects.create(code="5A", label="5º ano A", school=self.other_school)
+
+        self.teacher = _create_teacher("T001", ReductionDay.MONDAY)
+        self.teacher.classes.add(self.class_a, self.class_b)
+        other_teacher = _create_teacher("T002", ReductionDay.FRIDAY)
+        other_teacher.classes.add(self.class_a, other_class)
+
+    def test_generate_creates_one_gradebook_per_teacher_class_pair(self):
+        """Cada par professor/turma da escola recebe uma caderneta"""
+        result = GradebookGenerationService().generate_for_school(self.school, self.calendar)
+
+        self.assertEqual(result.created, 3)
+        self.assertEqual(result.skipped, 0)
+        self.assertEqual(Gradebook.objects.filter(academic_class__school=self.school).count(), 3)
+        self.assertFalse(Gradebook.objects.filter(academic_class__school=self.other_school).exists())
+
+    def test_generate_uses_teacher_reduction_day(self):
+        """O registro de conteúdo não tem aulas no dia de redução do professor"""
+        GradebookGenerationService().generate_for_school(self.school, self.calendar)
+
+        gradebook = Gradebook.objects.get(teacher=self.teacher, academic_class=self.class_a)
+        lessons = gradebook.content_registry['lessons']
+        self.assertNotIn('2026-01-05', lessons)
+        self.assertEqual(lessons['2026-01-06'], {'stage': None, 'content': ''})
+        self.assertEqual(gradebook.title, '4º ano A - 2026')
+
+    def test_generate_skips_existing_gradebooks(self):
+        """Gerar novamente não duplica cadernetas"""
+        service = GradebookGenerationService()
+        service.generate_for_school(self.school, self.calendar)
+
+        result = service.generate_for_school(self.school, self.calendar)
+
+        self.assertEqual(result.created, 0)
+        self.assertEqual(result.skipped, 3)
+        self.assertEqual(Gradebook.objects.count(), 3)
+
+    def test_generate_endpoint_returns_201(self):
+        """POST /api/gradebooks/generate/ gera as cadernetas da escola"""
+        url = reverse('gradebook-generate')
+
+        response = self.client.post(url, {'school_id': self.school.id, 'year': 2026}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['created'], 3)
+
+    def test_generate_endpoint_requires_existing_calendar(self):
+        """Gerar para um ano sem calendário retorna 400"""
+        url = reverse('gradebook-generate')
+
+        response = self.client.post(url, {'school_id': self.school.id, 'year': 2030}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GradebookListAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(id=1, name="Escola Teste", code=123)
+        self.calendar = AcademicCalendar.objects.create(
+            year=2026, calendar_data=_school_days_calendar(2026))
+        for index in range(5):
+            academic_class = Class.objects.create(
+                code=f"C{index}", label=f"Turma {index}", school=self.school)
+            teacher = _create_teacher(f"T00{index}")
+            teacher.classes.add(academic_class)
+        GradebookGenerationService().generate_for_school(self.school, self.calendar)
+
+    def test_list_references_calendar_by_year(self):
+        """A listagem não embute o calendário completo"""
+        response = self.client.get(reverse('gradebook-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item = response.json()['results'][0]
+        self.assertEqual(item['calendar_year'], 2026)
+        self.assertNotIn('calendar', item)
+        self.assertEqual(item['school']['name'], "Escola Teste")
+        self.assertEqual(set(item['teacher']), {'id', 'name', 'code'})
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        """A listagem usa uma contagem e uma consulta, independente do número de itens"""
+        with self.assertNumQueries(2):
+            self.client.get(reverse('gradebook-list'))
+
+    def test_cursor_pagination_skips_count_and_offset(self):
+        """Com cursor, cada página é uma consulta só, continuando depois da última caderneta"""
+        Gradebook.objects.filter(teacher__code__in=["T001", "T003"]).update(status=GradebookStatus.COMPLETED)
+        url = reverse('gradebook-list')
+
+        with CaptureQueriesContext(connection) as queries:
+            first = self.client.get(url, {'cursor': '', 'page_size': 2}).json()
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT(', queries[0]['sql'])
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+        codes = [item['teacher']['code'] for item in first['results']]
+        response = self.client.get(first['next'])
+        while True:
+            data = response.json()
+            codes.extend(item['teacher']['code'] for item in data['results'])
+            if not data['next']:
+                break
+            response = self.client.get(data['next'])
+        self.assertEqual(codes, ["T001", "T003", "T000", "T002", "T004"])
+
+    def test_retrieve_expands_teacher_and_calendar(self):
+        """O detalhe continua trazendo professor e calendário completos"""
+        gradebook = Gradebook.objects.first()
+
+        response = self.client.get(reverse('gradebook-detail', args=[gradebook.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertIn('calendar_data', data['calendar'])
+        self.assertEqual(len(data['teacher']['classes']), 1)
+
+    def test_progress_is_read_only(self):
+        """O progresso vem das aulas preenchidas e não é aceito na atualização da caderneta"""
+        gradebook = Gradebook.objects.first()
+
+        response = self.client.patch(
+            reverse('gradebook-detail', args=[gradebook.id]), {'progress': 80, 'title': 'Nova'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        gradebook.refresh_from_db()
+        self.assertEqual(gradebook.progress, 0)
+        self.assertEqual(gradebook.title, 'Nova')
+
+    def test_generation_copies_teacher_code(self):
+        """As cadernetas geradas guardam o código do professor para a ordenação"""
+        self.assertFalse(Gradebook.objects.exclude(teacher_code=F('teacher__code')).exists())
+
+    def test_list_orders_by_status_and_teacher_code(self):
+        """A listagem ordena por status e código do professor sem join"""
+        Gradebook.objects.filter(teacher__code="T003").update(status=GradebookStatus.COMPLETED)
+
+        response = self.client.get(reverse('gradebook-list'))
+
+        codes = [item['teacher']['code'] for item in response.json()['results']]
+        self.assertEqual(codes, ["T003", "T000", "T001", "T002", "T004"])
+        self.assertNotIn('teachers_teacher', str(Gradebook.objects.all().query))
+
+    def test_teacher_code_follows_teacher(self):
+        """Alterar o código do professor atualiza as cadernetas dele"""
+        teacher = Teacher.objects.get(code="T001")
+        teacher.code = "Z001"
+        teacher.save()
+
+        self.assertEqual(Gradebook.objects.get(teacher=teacher).teacher_code, "Z001")
+        response = self.client.get(reverse('gradebook-list'))
+        self.assertEqual(response.json()['results'][-1]['teacher']['code'], "Z001")
+
+    def test_list_filters(self):
+        """A listagem filtra por professor, turma, escola, ano e status"""
+        teacher = Teacher.objects.get(code="T002")
+        gradebook = Gradebook.objects.get(teacher=teacher)
+        gradebook.status = GradebookStatus.IN_PROGRESS
+        gradebook.save()
+
+        for params, expected in [
+            ({'teacher_id': teacher.id}, 1),
+            ({'class_id': gradebook.academic_class_id}, 1),
+            ({'school_id': self.school.id}, 5),
+            ({'year': 2026}, 5),
+            ({'year': 2027}, 0),
+            ({'status': GradebookStatus.IN_PROGRESS}, 1),
+            ({'status': GradebookStatus.PENDING, 'school_id': self.school.id}, 4),
+        ]:
+            response = self.client.get(reverse('gradebook-list'), params)
+            self.assertEqual(response.json()['count'], expected, params)
+
+
+class GradebookBulkStatusAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(id=1, name="Escola Teste", code=123)
+        other_school = School.objects.create(id=2, name="Outra Escola", code=456)
+        self.calendar = AcademicCalendar.objects.create(
+            year=2026, calendar_data=_school_days_calendar(2026))
+        for index, school in enumerate([self.school] * 4 + [other_school]):
+            academic_class = Class.objects.create(code=f"C{index}", label=f"Turma {index}", school=school)
+            _create_teacher(f"T00{index}").classes.add(academic_class)
+        GradebookGenerationService().generate_for_school(self.school, self.calendar)
+        GradebookGenerationService().generate_for_school(other_school, self.calendar)
+        for code, gradebook_status in [
+            ("T000", GradebookStatus.IN_PROGRESS),
+            ("T001", GradebookStatus.IN_PROGRESS),
+            ("T002", GradebookStatus.COMPLETED),
+            ("T004", GradebookStatus.IN_PROGRESS),
+        ]:
+            Gradebook.objects.filter(teacher__code=code).update(status=gradebook_status)
+
+    def test_transition_by_filter_uses_single_update(self):
+        """Conclui as cadernetas da escola em um único UPDATE e conta por status"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('gradebook-bulk-status'),
+                {'status': GradebookStatus.COMPLETED, 'school_id': self.school.id}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'status': 'completed',
+            'matched': 4,
+            'updated': 2,
+            'unchanged': 1,
+            'rejected': 1,
+            'by_status': {'in_progress': 2, 'completed': 1, 'pending': 1},
+        })
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        # A origem permitida é conferida pelo próprio UPDATE, não por uma lista de ids lida antes
+        self.assertIn('"status" IN', updates[0]['sql'])
+        self.assertEqual(
+            Gradebook.objects.get(teacher__code="T003").status, GradebookStatus.PENDING)
+        self.assertEqual(
+            Gradebook.objects.get(teacher__code="T004").status, GradebookStatus.IN_PROGRESS)
+
+    def test_transition_by_ids(self):
+        """Apenas as cadernetas informadas são alteradas"""
+        gradebook = Gradebook.objects.get(teacher__code="T003")
+
+        response = self.client.post(
+            reverse('gradebook-bulk-status'),
+            {'status': GradebookStatus.CANCELLED, 'ids': [gradebook.id]}, format='json')
+
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual(
+            Gradebook.objects.filter(status=GradebookStatus.CANCELLED).get().id, gradebook.id)
+
+    def test_transition_publishes_only_moved_gradebooks(self):
+        """Cadernetas selecionadas que já estavam no status de destino não geram evento"""
+        moved = Gradebook.objects.get(teacher__code="T000")
+        already = Gradebook.objects.get(teacher__code="T002")
+
+        with mock.patch('apps.gradebooks.services.publish_gradebook_progress') as publish:
+            response = self.client.post(
+                reverse('gradebook-bulk-status'),
+                {'status': GradebookStatus.COMPLETED, 'ids': [moved.id, already.id]}, format='json')
+
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual([call.args[0].id for call in publish.call_args_list], [moved.id])
+        self.assertEqual(publish.call_args.args[0].status, GradebookStatus.COMPLETED)
+
+    def test_status_is_not_changed_by_gradebook_update(self):
+        """O status só muda pelas transições validadas, não pela atualização da caderneta"""
+        gradebook = Gradebook.objects.get(teacher__code="T003")
+
+        self.client.patch(
+            reverse('gradebook-detail', args=[gradebook.id]),
+            {'status': GradebookStatus.COMPLETED}, format='json')
+
+        gradebook.refresh_from_db()
+        self.assertEqual(gradebook.status, GradebookStatus.PENDING)
+
+    def test_transition_requires_selection(self):
+        """Sem ids nem filtros a requisição é recusada"""
+        response = self.client.post(
+            reverse('gradebook-bulk-status'), {'status': GradebookStatus.COMPLETED}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Gradebook.objects.filter(status=GradebookStatus.COMPLETED).exclude(
+            teacher__code="T002").exists())
+
+
+def _pdf_text(content):
+    with fitz.open(stream=content, filetype='pdf') as doc:
+        return [page.get_text() for page in doc]
+
+
+class GradebookPDFRenderingTestCase(SimpleTestCase):
+
+    def _payload(self, diary_type):
+        return {
+            'id': 1,
+            'title': '4º ano A - 2026',
+            'year': 2026,
+            'school': 'Escola Teste',
+            'class_code': '4A',
+            'class_label': '4º ano A',
+            'teacher_code': 'T001',
+            'teacher_name': 'Professora Conceição',
+            'diary_type': diary_type,
+            'lessons': [
+                {'date': '2026-02-16', 'stage': 'I', 'content': 'Frações equivalentes'},
+                {'date': '2026-05-11', 'stage': 'II', 'content': 'Geometria plana'},
+            ],
+        }
+
+    def test_c1_lists_lessons_in_a_single_table(self):
+        """O modelo C1 lista as aulas com data, etapa e conteúdo"""
+        pages = _pdf_text(render_gradebook_pdf(self._payload('c1')))
+
+        self.assertEqual(len(pages), 1)
+        self.assertIn('Professora Conceição', pages[0])
+        self.assertIn('16/02/2026', pages[0])
+        self.assertIn('Frações equivalentes', pages[0])
+
+    def test_c2_starts_each_stage_on_a_new_page(self):
+        """O modelo C2 separa as etapas em páginas"""
+        pages = _pdf_text(render_gradebook_pdf(self._payload('c2')))
+
+        self.assertEqual(len(pages), 2)
+        self.assertIn('I Etapa', pages[0])
+        self.assertIn('Geometria plana', pages[1])
+
+
+class GradebookPDFTestCase(APITestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        settings_override = override_settings(
+            GRADEBOOK_PDF_WORKERS=0, GRADEBOOK_PDF_CACHE_DIR=self.cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.school = School.objects.create(id=1, name="Escola Teste", code=123)
+        self.calendar = AcademicCalendar.objects.create(
+            year=2026, calendar_data=_school_days_calendar(2026))
+        self.academic_class = Class.objects.create(code="4A", label="4º ano A", school=self.school)
+        for code in ("T001", "T002"):
+            _create_teacher(code).classes.add(self.academic_class)
+        GradebookGenerationService().generate_for_school(self.school, self.calendar)
+        self.gradebook = Gradebook.objects.order_by('id').first()
+
+    def _cached_files(self):
+        return sorted(path.name for path in Path(self.cache_dir).glob('*.pdf'))
+
+    def test_render_reuses_cached_pdf(self):
+        """Renderizar duas vezes sem mudanças reaproveita o mesmo arquivo"""
+        service = GradebookPDFService()
+        gradebook = service.queryset().get(pk=self.gradebook.pk)
+
+        first = service.render(gradebook)
+        mtime = first.stat().st_mtime_ns
+        second = service.render(gradebook)
+
+        self.assertEqual(first, second)
+        self.assertEqual(second.stat().st_mtime_ns, mtime)
+
+    def test_content_change_replaces_cached_pdf(self):
+        """Alterar o conteúdo gera um novo PDF e descarta o anterior"""
+        service = GradebookPDFService()
+        first = service.render(service.queryset().get(pk=self.gradebook.pk))
+
+        self.gradebook.content_registry['lessons']['2026-01-06']['content'] = 'Leitura compartilhada'
+        self.gradebook.save()
+        second = service.render(service.queryset().get(pk=self.gradebook.pk))
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self._cached_files(), [second.name])
+        self.assertIn('Leitura compartilhada', ''.join(_pdf_text(second.read_bytes())))
+
+    def test_pdf_endpoint_returns_pdf(self):
+        """GET /api/gradebooks/{id}/pdf/ retorna o diário em PDF"""
+        response = self.client.get(reverse('gradebook-pdf', args=[self.gradebook.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_pdf_endpoint_returns_404_for_missing_gradebook(self):
+        """Caderneta inexistente retorna 404"""
+        response = self.client.get(reverse('gradebook-pdf', args=[999]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_pdf_batch_streams_zip_with_class_gradebooks(self):
+        """GET /api/gradebooks/pdf-batch/?class_id= envia um PDF por caderneta da turma"""
+        response = self.client.get(reverse('gradebook-pdf-batch'), {'class_id': self.academic_class.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(len(archive.namelist()), 2)
+        for name in archive.namelist():
+            self.assertTrue(archive.read(name).startswith(b'%PDF'))
+
+    def test_pdf_batch_keeps_zip_valid_when_render_fails(self):
+        """Uma caderneta que falha na renderização fica de fora e é listada no ZIP, que continua válido"""
+        service = GradebookPDFService()
+        broken, working = service.queryset().order_by('id')
+
+        def render(payload, path):
+            if payload['id'] == broken.id:
+                raise RuntimeError("falha na renderização")
+            return render_gradebook_pdf_to_file(payload, path)
+
+        with mock.patch('apps.gradebooks.services.render_gradebook_pdf_to_file', side_effect=render), \
+                self.assertLogs('apps.gradebooks.services', level='ERROR'):
+            response = self.client.get(reverse('gradebook-pdf-batch'), {'class_id': self.academic_class.id})
+            content = b''.join(response.streaming_content)
+
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.namelist(), [service.filename(working), GradebookPDFService.ERRORS_FILENAME])
+        self.assertIn(service.filename(broken), archive.read(GradebookPDFService.ERRORS_FILENAME).decode())
+
+    def test_pdf_rerenders_cached_file_discarded_meanwhile(self):
+        """Se outra requisição descartou o PDF em cache, ele é renderizado de novo"""
+        service = GradebookPDFService()
+        service.render(service.queryset().get(pk=self.gradebook.pk)).unlink()
+
+        response = self.client.get(reverse('gradebook-pdf', args=[self.gradebook.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_pdf_batch_requires_class_id(self):
+        """Sem class_id o lote retorna 400"""
+        response = self.client.get(reverse('gradebook-pdf-batch'))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(GRADEBOOK_PDF_WORKERS=2)
+    def test_render_many_uses_process_pool(self):
+        """Com workers configurados, o lote é renderizado no pool de processos"""
+        service = GradebookPDFService()
+
+        rendered = list(service.render_many(service.queryset().order_by('id')))
+        for _, pdf in rendered:
+            pdf.close()
+
+        self.assertEqual(len(rendered), 2)
+        self.assertEqual(len(self._cached_files()), 2)
+
+
+async def _next_event(stream):
+    """Lê o próximo evento SSE, ignorando keep-alives e a diretiva ``retry``."""
+    async for chunk in stream:
+        chunk = chunk.decode('utf-8')
+        if chunk.startswith('event:'):
+            name, data = chunk.strip().split('\n')
+            return name.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+    return None
+
+
+async def _disconnect(stream):
+    """Simula a desconexão do cliente como o servidor ASGI: cancela a leitura pendente do fluxo."""
+    while True:
+        read = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        if read.done():
+            try:
+                read.result()
+            except StopAsyncIteration:
+                return
+            continue
+        read.cancel()
+        try:
+            await read
+        except (asyncio.CancelledError, StopAsyncIteration):
+            return
+
+
+class LocalBrokerTestCase(SimpleTestCase):
+
+    async def test_publish_reaches_channel_subscribers_only(self):
+        """Cada assinatura recebe apenas os canais assinados"""
+        broker = LocalBroker()
+        subscription = await broker.subscribe(['a'])
+
+        broker.publish('b', {'event': 'job', 'data': {}})
+        broker.publish('a', {'event': 'job', 'data': {'n': 1}})
+
+        self.assertEqual(await subscription.get(timeout=0.01), {'event': 'job', 'data': {'n': 1}})
+        self.assertIsNone(await subscription.get(timeout=0.01))
+
+    async def test_publish_from_another_thread(self):
+        """Publicações feitas em outra thread chegam ao laço de eventos da assinatura"""
+        broker = LocalBroker()
+        subscription = await broker.subscribe(['a'])
+
+        await sync_to_async(broker.publish, thread_sensitive=False)('a', {'event': 'job', 'data': {'n': 1}})
+
+        self.assertEqual(await subscription.get(timeout=1), {'event': 'job', 'data': {'n': 1}})
+
+    async def test_slow_subscriber_drops_oldest_messages(self):
+        """Assinantes lentos descartam as mensagens mais antigas sem bloquear a publicação"""
+        broker = LocalBroker()
+        subscription = await broker.subscribe(['a'])
+
+        for n in range(broker.MAX_PENDING + 5):
+            broker.publish('a', {'event': 'job', 'data': {'n': n}})
+
+        self.assertEqual((await subscription.get(timeout=0.01))['data']['n'], 5)
+
+    async def test_closed_subscription_is_removed(self):
+        """Encerrar a assinatura remove o canal do broker"""
+        broker = LocalBroker()
+        await (await broker.subscribe(['a'])).close()
+
+        self.assertEqual(broker._subscribers, {})
+
+
+@override_settings(GRADEBOOK_EVENTS_HEARTBEAT_SECONDS=0.01)
+class GradebookEventsAPITestCase(APITestCase):
+    """
+    O fluxo é uma view assíncrona: os testes usam o ``async_client``. O acesso
+    ao banco fora da view passa por ``sync_to_async``, na thread da transação do teste.
+    """
+
+    def setUp(self):
+        self.school = School.objects.create(id=1, name="Escola Teste", code=123)
+        self.calendar = AcademicCalendar.objects.create(
+            year=2026, calendar_data=_school_days_calendar(2026))
+        self.academic_class = Class.objects.create(code="4A", label="4º ano A", school=self.school)
+        self.teacher = _create_teacher("T001")
+        self.teacher.classes.add(self.academic_class)
+
+    def _generate(self):
+        GradebookGenerationService().generate_for_school(self.school, self.calendar)
+
+    @asynccontextmanager
+    async def _stream(self, **params):
+        response = await self.async_client.get(reverse('gradebook-events'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            yield stream
+        finally:
+            await _disconnect(stream)
+
+    async def test_stream_starts_with_current_gradebook_state(self):
+        """O fluxo começa com o status e o progresso atuais das cadernetas do professor"""
+        await sync_to_async(self._generate)()
+
+        async with self._stream(teacher_id=self.teacher.id) as stream:
+            event, data = await _next_event(stream)
+
+        self.assertEqual(event, 'gradebook')
+        self.assertEqual(data['status'], 'pending')
+        self.assertEqual(data['progress'], 0)
+
+    async def test_stream_follows_several_teachers(self):
+        """Um único fluxo acompanha as cadernetas de vários professores"""
+        other = await sync_to_async(_create_teacher)("T002")
+        await sync_to_async(other.classes.add)(self.academic_class)
+        await sync_to_async(self._generate)()
+
+        async with self._stream(teacher_id=[self.teacher.id, other.id]) as stream:
+            events = [await _next_event(stream) for _ in range(2)]
+
+        self.assertEqual(sorted(data['teacher_id'] for _, data in events), sorted([self.teacher.id, other.id]))
+
+    async def test_gradebook_update_is_pushed_to_teacher_stream(self):
+        """Salvar o conteúdo de uma caderneta publica o progresso recalculado para o professor"""
+        await sync_to_async(self._generate)()
+        gradebook = await Gradebook.objects.aget()
+        day = min(gradebook.content_registry['lessons'])
+
+        def update():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(
+                    reverse('gradebook-content', args=[gradebook.id]),
+                    {'version': 0, 'lessons': {day: {'content': 'Leitura'}}}, format='json')
+
+        async with self._stream(teacher_id=self.teacher.id) as stream:
+            await _next_event(stream)
+            await sync_to_async(update)()
+            event, data = await _next_event(stream)
+
+        self.assertEqual(event, 'gradebook')
+        self.assertEqual(data, {'id': gradebook.id, 'teacher_id': self.teacher.id, 'status': 'pending',
+                                'progress': compute_progress(1, gradebook.lessons_total)})
+
+    async def test_generation_job_progress_is_pushed(self):
+        """A geração com job_id publica o andamento até a conclusão"""
+        def generate():
+            self.client.post(
+                reverse('gradebook-generate'),
+                {'school_id': self.school.id, 'year': 2026, 'job_id': 'geracao-1'},
+                format='json',
+            )
+
+        async with self._stream(job_id='geracao-1') as stream:
+            await anext(stream)
+            await sync_to_async(generate)()
+            events = [await _next_event(stream) for _ in range(3)]
+
+        self.assertEqual([data['status'] for _, data in events], ['running', 'running', 'completed'])
+        self.assertEqual(events[-1][1]['done'], 1)
+
+    async def test_idle_stream_sends_keep_alive(self):
+        """Sem eventos, o fluxo envia comentários de keep-alive"""
+        async with self._stream(job_id='ocioso') as stream:
+            await anext(stream)
+
+            self.assertEqual(await anext(stream), b': keep-alive\n\n')
+
+    async def test_closing_stream_unsubscribes_and_frees_slot(self):
+        """Encerrar a conexão remove a assinatura do broker e devolve a vaga do fluxo"""
+        async with self._stream(job_id='fechado') as stream:
+            await anext(stream)
+            self.assertEqual(stream_limiter.open, 1)
+
+        self.assertNotIn(job_channel('fechado'), get_broker()._subscribers)
+        self.assertEqual(stream_limiter.open, 0)
+
+    @override_settings(GRADEBOOK_EVENTS_MAX_STREAMS=1)
+    async def test_stream_limit_returns_503_until_a_stream_closes(self):
+        """Com o limite de fluxos atingido, novas conexões recebem 503 até uma ser encerrada"""
+        async with self._stream(job_id='primeiro') as stream:
+            await anext(stream)
+
+            response = await self.async_client.get(reverse('gradebook-events'), {'job_id': 'segundo'})
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertIn('Retry-After', response)
+
+        async with self._stream(job_id='segundo') as stream:
+            await anext(stream)
+
+    @override_settings(GRADEBOOK_EVENTS_MAX_SECONDS=0.05)
+    async def test_stream_ends_after_max_lifetime(self):
+        """O fluxo termina após a duração máxima, depois de indicar o intervalo de reconexão"""
+        async with self._stream(job_id='curto') as stream:
+            chunks = [chunk async for chunk in stream]
+
+        self.assertEqual(chunks[0], b'retry: 5000\n\n')
+        self.assertTrue(all(chunk == b': keep-alive\n\n' for chunk in chunks[1:]))
+
+    async def test_stream_requires_teacher_or_job(self):
+        """Sem teacher_id nem job_id o fluxo retorna 400"""
+        response = await self.async_client.get(reverse('gradebook-events'))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_stream_rejects_invalid_teacher_id(self):
+        """teacher_id que não é número retorna 400"""
+        response = await self.async_client.get(reverse('gradebook-events'), {'teacher_id': ['1', 'x']})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GradebookContentPatchAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(id=1, name="Escola Teste", code=123)
+        self.calendar = AcademicCalendar.objects.create(
+            year=2026, calendar_data=_school_days_calendar(2026))
+        academic_class = Class.objects.create(code="4A", label="4º ano A", school=self.school)
+        self.teacher = _create_teacher("T001")
+        self.teacher.classes.add(academic_class)
+        GradebookGenerationService().generate_for_school(self.school, self.calendar)
+        self.gradebook = Gradebook.objects.get()
+        self.url = reverse('gradebook-content', args=[self.gradebook.id])
+
+    def _patch(self, version, lessons, **kwargs):
+        return self.client.patch(
+            self.url,
+            {'version': version, 'lessons': {day: {'content': text} for day, text in lessons.items()}},
+            format='json',
+            **kwargs,
+        )
+
+    def test_patch_merges_only_sent_lessons(self):
+        """Somente as aulas enviadas mudam; as demais e a etapa permanecem"""
+        response = self._patch(0, {'2026-01-06': 'Leitura compartilhada'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.gradebook.refresh_from_db()
+        lessons = self.gradebook.content_registry['lessons']
+        self.assertEqual(lessons['2026-01-06'], {'stage': None, 'content': 'Leitura compartilhada'})
+        self.assertEqual(lessons['2026-01-07'], {'stage': None, 'content': ''})
+        self.assertEqual(len(lessons), self.gradebook.lessons_total)
+
+    def test_patch_updates_version_and_progress_incrementally(self):
+        """Cada salvamento incrementa a versão e ajusta as aulas preenchidas"""
+        total = self.gradebook.lessons_total
+        days = sorted(self.gradebook.content_registry['lessons'])[:total // 2]
+
+        first = self._patch(0, {day: 'Conteúdo' for day in days[:100]}).json()
+        second = self._patch(1, {days[0]: '   ', days[100]: 'Revisão'}).json()
+
+        self.assertEqual(first['version'], 1)
+        self.assertEqual(first['lessons_filled'], 100)
+        self.assertEqual(second['version'], 2)
+        self.assertEqual(second['lessons_filled'], 100)
+        self.assertEqual(second['progress'], round(100 * 100 / total))
+        self.gradebook.refresh_from_db()
+        self.assertEqual(self.gradebook.progress, second['progress'])
+
+    def test_stale_version_returns_409(self):
+        """Salvar a partir de uma versão antiga retorna conflito com a versão atual"""
+        self._patch(0, {'2026-01-06': 'Primeiro salvamento'})
+
+        response = self._patch(0, {'2026-01-06': 'Salvamento atrasado'})
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.json()['version'], 1)
+        self.gradebook.refresh_from_db()
+        self.assertEqual(self.gradebook.content_registry['lessons']['2026-01-06']['content'], 'Primeiro salvamento')
+
+    def test_unknown_lesson_date_returns_400(self):
+        """Datas que não são aulas da caderneta são rejeitadas sem salvar"""
+        response = self._patch(0, {'2026-01-05': 'Dia de redução', '2026-01-06': 'Aula'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('2026-01-05', response.json()['error'])
+        self.gradebook.refresh_from_db()
+        self.assertEqual(self.gradebook.version, 0)
+
+    def test_patch_accepts_merge_patch_media_type(self):
+        """O corpo pode ser enviado como application/merge-patch+json"""
+        response = self.client.generic(
+            'PATCH', self.url,
+            json.dumps({'version': 0, 'lessons': {'2026-01-06': {'content': 'Aula'}}}),
+            content_type='application/merge-patch+json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_patch_query_count_does_not_depend_on_lessons_sent(self):
+        """O número de consultas do salvamento não cresce com as aulas enviadas"""
+        days = sorted(self.gradebook.content_registry['lessons'])
+
+        with CaptureQueriesContext(connection) as single:
+            self._patch(0, {days[0]: 'Aula'})
+        with CaptureQueriesContext(connection) as many:
+            self._patch(1, {day: 'Aula' for day in days[1:51]})
+
+        self.assertEqual(len(single), len(many))
+
+    def test_patch_writes_lesson_rows(self):
+        """O conteúdo e a frequência são gravados na tabela de aulas"""
+        response = self.client.patch(
+            self.url,
+            {'version': 0, 'lessons': {
+                '2026-01-06': {'content': 'Aula', 'present': 28, 'absent': 2},
+                '2026-01-07': {'present': 30},
+            }},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first = GradebookLesson.objects.get(gradebook=self.gradebook, date=date(2026, 1, 6))
+        self.assertEqual((first.content, first.present, first.absent, first.attendance_recorded),
+                         ('Aula', 28, 2, True))
+        second = GradebookLesson.objects.get(gradebook=self.gradebook, date=date(2026, 1, 7))
+        self.assertEqual((second.content, second.present, second.attendance_recorded), ('', 30, True))
+        self.assertEqual(response.json()['lessons_filled'], 1)
+
+
+class GradebookLessonTestCase(APITestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(id=1, name="Escola Teste", code=123)
+        other_school = School.objects.create(id=2, name="Outra Escola", code=456)
+        self.calendar = AcademicCalendar.objects.create(
+            year=2026, calendar_data=_school_days_calendar(2026))
+        self.class_a = Class.objects.create(code="4A", label="4º ano A", school=self.school)
+        self.class_b = Class.objects.create(code="4B", label="4º ano B", school=self.school)
+        other_class = Class.objects.create(code="5A", label="5º ano A", school=other_school)
+        teacher = _create_teacher("T001", ReductionDay.FRIDAY)
+        teacher.classes.add(self.class_a, self.class_b)
+        _create_teacher("T002").classes.add(other_class)
+        service = GradebookGenerationService()
+        service.generate_for_school(self.school, self.calendar)
+        service.generate_for_school(other_school, self.calendar)
+
+    def test_generation_creates_one_row_per_lesson(self):
+        """Cada aula do registro derivado tem uma linha na tabela de aulas"""
+        for gradebook in Gradebook.objects.all():
+            rows = dict(gradebook.lessons.values_list('date', 'stage'))
+            self.assertEqual(len(rows), gradebook.lessons_total)
+            self.assertEqual(
+                sorted(day.isoformat() for day in rows),
+                sorted(gradebook.content_registry['lessons']),
+            )
+
+    def test_missing_content_report(self):
+        """O relatório lista as cadernetas com aulas sem conteúdo no período"""
+        filled = Gradebook.objects.get(academic_class=self.class_a)
+        GradebookLesson.objects.filter(gradebook=filled, date__range=('2026-03-02', '2026-03-06')).update(content='Aula')
+
+        response = self.client.get(
+            reverse('gradebook-missing-content'),
+            {'start': '2026-03-02', 'end': '2026-03-06', 'school_id': self.school.id},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = response.json()['gradebooks']
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['class_code'], '4B')
+        self.assertEqual(rows[0]['missing'], 4)
+        self.assertEqual(rows[0]['first_missing'], '2026-03-02')
+
+    def test_missing_content_report_counts_blank_content_like_progress(self):
+        """Aulas só com espaços contam como sem conteúdo, como no progresso"""
+        gradebook = Gradebook.objects.get(academic_class=self.class_a)
+        GradebookLesson.objects.filter(gradebook__academic_class__school=self.school).update(content='Aula')
+        GradebookLesson.objects.filter(gradebook=gradebook, date='2026-03-03').update(content=' \n\t')
+        rebuild_content_registries([gradebook.id])
+
+        response = self.client.get(
+            reverse('gradebook-missing-content'),
+            {'start': '2026-03-02', 'end': '2026-03-06', 'school_id': self.school.id},
+        )
+
+        rows = response.json()['gradebooks']
+        self.assertEqual([(row['class_code'], row['missing']) for row in rows], [('4A', 1)])
+        gradebook.refresh_from_db()
+        self.assertEqual(gradebook.lessons_filled, gradebook.lessons_total - 1)
+
+    def test_missing_content_report_rejects_inverted_period(self):
+        """Período com fim antes do início retorna 400"""
+        response = self.client.get(
+            reverse('gradebook-missing-content'), {'start': '2026-03-06', 'end': '2026-03-02'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GradebookExportAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(id=1, name="Escola Teste", code=123)
+        other_school = School.objects.create(id=2, name="Outra Escola", code=456)
+        self.calendar = AcademicCalendar.objects.create(
+            year=2026, calendar_data=_school_days_calendar(2026, stages=[
+                {'id': 'I', 'start_date': '2026-02-02', 'end_date': '2026-02-06'},
+                {'id': 'II', 'start_date': '2026-02-09', 'end_date': '2026-02-13'},
+            ]))
+        academic_class = Class.objects.create(code="4A", label="4º ano A", school=self.school)
+        other_class = Class.objects.create(code="5A", label="5º ano A", school=other_school)
+        self.teacher = _create_teacher("T001", ReductionDay.FRIDAY)
+        self.teacher.classes.add(academic_class)
+        _create_teacher("T002").classes.add(other_class)
+        service = GradebookGenerationService()
+        service.generate_for_school(self.school, self.calendar)
+        service.generate_for_school(other_school, self.calendar)
+        GradebookLesson.objects.filter(date='2026-02-02', gradebook__teacher=self.teacher).update(
+            content='Frações, "equivalentes"', present=28, absent=2)
+
+    def _csv_rows(self, response):
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.DictReader(io.StringIO(content)))
+
+    def test_csv_exports_school_stage_lessons(self):
+        """O CSV traz apenas as aulas da escola e etapa filtradas"""
+        response = self.client.get(reverse('gradebook-export-csv'), {'school_id': self.school.id, 'stage': 'I'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = self._csv_rows(response)
+        self.assertEqual([row['data'] for row in rows], ['2026-02-02', '2026-02-03', '2026-02-04', '2026-02-05'])
+        self.assertEqual(rows[0]['conteudo'], 'Frações, "equivalentes"')
+        self.assertEqual((rows[0]['presentes'], rows[0]['ausentes']), ('28', '2'))
+        self.assertEqual({row['escola'] for row in rows}, {'Escola Teste'})
+        self.assertIn('aulas_school-1_stage-I.csv', response['Content-Disposition'])
+
+    def test_csv_filters_by_teacher(self):
+        """O filtro por professor restringe às cadernetas dele"""
+        response = self.client.get(reverse('gradebook-export-csv'), {'teacher_id': self.teacher.id})
+
+        rows = self._csv_rows(response)
+        self.assertEqual({row['professor'] for row in rows}, {'T001'})
+        self.assertEqual(len(rows), Gradebook.objects.get(teacher=self.teacher).lessons_total)
+
+    def test_csv_reads_lessons_in_chunks(self):
+        """As aulas são lidas com iterator em blocos, sem carregar a escola toda"""
+        service = GradebookExportService()
+        with mock.patch.object(GradebookExportService, 'CHUNK_SIZE', 3):
+            rows = list(service.iter_csv(service.queryset(stage='II')))
+
+        self.assertEqual(len(rows), 1 + 4 + 4)
+
+    def test_invalid_stage_returns_400(self):
+        """Etapa inexistente retorna 400"""
+        response = self.client.get(reverse('gradebook-export-csv'), {'stage': 'V'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_xlsx_exports_lessons(self):
+        """O XLSX traz o cabeçalho e uma linha por aula filtrada"""
+        with mock.patch.object(GradebookExportService, 'CHUNK_SIZE', 2):
+            response = self.client.get(
+                reverse('gradebook-export-xlsx'), {'school_id': self.school.id, 'stage': 'I'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        workbook = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        sheet = workbook.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(sheet.count('<row '), 1 + 4)
+        self.assertIn('Frações, "equivalentes"', sheet)
+
+    def test_xlsx_splits_rows_across_sheets(self):
+        """Acima do limite de linhas por aba a planilha continua em outra aba"""
+        service = GradebookExportService()
+        output = io.BytesIO()
+        with mock.patch.object(GradebookExportService, 'MAX_SHEET_ROWS', 4):
+            service.write_xlsx(service.queryset(school_id=self.school.id, stage='I'), output)
+
+        names = zipfile.ZipFile(output).namelist()
+        self.assertIn('xl/worksheets/sheet2.xml', names)
+
+
+def _with_day(calendar_data, day, day_type):
+    """Cópia do calendário com o tipo de um dia alterado."""
+    days = [dict(item, type=day_type) if item['date'] == day else item for item in calendar_data['days']]
+    return dict(calendar_data, days=days)
+
+
+class ChangedLessonDaysTestCase(SimpleTestCase):
+
+    def test_holiday_on_school_day_is_changed(self):
+        """Um feriado em dia letivo afeta apenas essa data"""
+        previous = _school_days_calendar(2026)
+        current = _with_day(previous, '2026-04-08', 'feriado_municipal')
+
+        self.assertEqual(changed_lesson_days(2026, previous, current), ['2026-04-08'])
+
+    def test_non_school_type_change_is_ignored(self):
+        """Trocar um dia não letivo por outro tipo não letivo não afeta aulas"""
+        previous = _school_days_calendar(2026)
+        current = _with_day(previous, '2026-04-11', 'evento')
+
+        self.assertEqual(changed_lesson_days(2026, previous, current), [])
+
+    def test_stage_boundary_change_affects_moved_days(self):
+        """Mover o fim de uma etapa afeta os dias letivos entre as datas"""
+        previous = _school_days_calendar(2026, stages=[
+            {'id': 'I', 'start_date': '2026-02-02', 'end_date': '2026-02-13'},
+        ])
+        current = dict(previous, stages=[
+            {'id': 'I', 'start_date': '2026-02-02', 'end_date': '2026-02-10'},
+        ])
+
+        self.assertEqual(
+            changed_lesson_days(2026, previous, current),
+            ['2026-02-11', '2026-02-12', '2026-02-13'],
+        )
+
+
+@override_settings(GRADEBOOK_REGENERATION_ASYNC=False)
+class GradebookRegenerationTestCase(APITestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(id=1, name="Escola Teste", code=123)
+        self.calendar_data = _school_days_calendar(2026)
+        self.calendar = AcademicCalendar.objects.create(year=2026, calendar_data=self.calendar_data)
+        academic_class = Class.objects.create(code="4A", label="4º ano A", school=self.school)
+        self.monday_teacher = _create_teacher("T001", ReductionDay.MONDAY)
+        self.wednesday_teacher = _create_teacher("T002", ReductionDay.WEDNESDAY)
+        self.monday_teacher.classes.add(academic_class)
+        self.wednesday_teacher.classes.add(academic_class)
+        GradebookGenerationService().generate_for_school(self.school, self.calendar)
+        self.url = reverse('academiccalendar-detail', kwargs={'year': 2026})
+
+    def _put_calendar(self, calendar_data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(self.url, {'year': 2026, 'calendar_data': calendar_data}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def _gradebook(self, teacher):
+        return Gradebook.objects.get(teacher=teacher)
+
+    def test_holiday_removes_lesson_only_where_it_existed(self):
+        """Um feriado numa quarta remove a aula de quem tem aula na quarta e não toca nas demais cadernetas"""
+        before = self._gradebook(self.monday_teacher)
+
+        self._put_calendar(_with_day(self.calendar_data, '2026-04-08', 'feriado_municipal'))
+
+        changed = self._gradebook(self.monday_teacher)
+        untouched = self._gradebook(self.wednesday_teacher)
+        self.assertNotIn('2026-04-08', changed.content_registry['lessons'])
+        self.assertFalse(changed.lessons.filter(date='2026-04-08').exists())
+        self.assertEqual(changed.lessons_total, before.lessons_total - 1)
+        self.assertEqual(changed.version, before.version + 1)
+        self.assertEqual(untouched.version, 0)
+        regeneration = GradebookRegeneration.objects.get()
+        self.assertEqual(regeneration.status, RegenerationStatus.COMPLETED)
+        self.assertEqual((regeneration.gradebooks_updated, regeneration.lessons_removed), (1, 1))
+
+    def test_new_school_day_adds_lessons(self):
+        """Um sábado letivo ganha aula em todas as cadernetas"""
+        self._put_calendar(_with_day(self.calendar_data, '2026-04-11', 'letivo'))
+
+        for teacher in (self.monday_teacher, self.wednesday_teacher):
+            gradebook = self._gradebook(teacher)
+            self.assertEqual(gradebook.content_registry['lessons']['2026-04-11'], {'stage': None, 'content': ''})
+            self.assertTrue(gradebook.lessons.filter(date='2026-04-11').exists())
+
+    def test_recorded_lesson_is_kept(self):
+        """Aulas com conteúdo registrado não são apagadas quando o dia deixa de ser letivo"""
+        gradebook = self._gradebook(self.monday_teacher)
+        GradebookContentService().apply_patch(gradebook.id, 0, {'2026-04-08': {'content': 'Aula dada'}})
+
+        self._put_calendar(_with_day(self.calendar_data, '2026-04-08', 'feriado_municipal'))
+
+        self.assertTrue(gradebook.lessons.filter(date='2026-04-08', content='Aula dada').exists())
+        self.assertEqual(GradebookRegeneration.objects.get().lessons_kept, 1)
+
+    def test_stage_change_restages_lessons(self):
+        """Mudar as etapas atualiza a etapa das aulas afetadas"""
+        self._put_calendar(dict(self.calendar_data, stages=[
+            {'id': 'I', 'start_date': '2026-02-02', 'end_date': '2026-02-06'},
+        ]))
+
+        gradebook = self._gradebook(self.wednesday_teacher)
+        self.assertEqual(gradebook.lessons.get(date='2026-02-02').stage, 'I')
+        self.assertEqual(gradebook.content_registry['lessons']['2026-02-02']['stage'], 'I')
+        self.assertEqual(GradebookRegeneration.objects.get().lessons_restaged, 4 + 4)
+
+    def test_unchanged_calendar_schedules_nothing(self):
+        """Salvar o calendário sem mudanças de aula não cria regeneração"""
+        self._put_calendar(_with_day(self.calendar_data, '2026-04-11', 'evento'))
+
+        self.assertFalse(GradebookRegeneration.objects.exists())
+
+    def test_command_processes_pending_regenerations(self):
+        """O comando processa regenerações que ficaram pendentes"""
+        self.calendar.calendar_data = _with_day(self.calendar_data, '2026-04-08', 'feriado_municipal')
+        self.calendar.save()
+        GradebookRegeneration.objects.create(calendar=self.calendar, dates=['2026-04-08'])
+
+        call_command('regenerate_gradebooks', stdout=io.StringIO())
+
+        self.assertEqual(GradebookRegeneration.objects.get().status, RegenerationStatus.COMPLETED)
+        self.assertFalse(GradebookLesson.objects.filter(date='2026-04-08').exists())
+
+
+@override_settings(CASCADE_DELETION_ASYNC=False)
+@mock.patch.object(CascadeDeletionService, 'BATCH_SIZE', 2)
+@mock.patch.object(CascadeDeletionService, 'LESSON_BATCH_SIZE', 100)
+class CascadeDeletionTestCase(APITestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(id=1, name="Escola Teste", code=123)
+        self.other_school = School.objects.create(id=2, name="Outra Escola", code=456)
+        self.calendar = AcademicCalendar.objects.create(year=2026, calendar_data=_school_days_calendar(2026))
+        self.other_calendar = AcademicCalendar.objects.create(year=2027, calendar_data=_school_days_calendar(2027))
+        for school in (self.school, self.other_school):
+            for index in range(3):
+                academic_class = Class.objects.create(
+                    code=f"{school.id}-{index}", label=f"Turma {index}", school=school)
+                _create_teacher(f"T{school.id}{index}").classes.add(academic_class)
+            for calendar in (self.calendar, self.other_calendar):
+                GradebookGenerationService().generate_for_school(school, calendar)
+
+    def _delete(self, url):
+        with mock.patch('apps.gradebooks.services.publish_job_progress') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return response.json(), [call.args[0] for call in publish.call_args_list]
+
+    def test_school_deletion_removes_dependents_in_batches(self):
+        """Excluir a escola remove turmas, vínculos, cadernetas e aulas em lotes, com andamento"""
+        lessons = GradebookLesson.objects.filter(gradebook__academic_class__school=self.school).count()
+
+        job, events = self._delete(reverse('school-detail', args=[self.school.id]))
+
+        self.assertEqual(job['job_id'], f"deletion-{job['id']}")
+        self.assertFalse(School.objects.filter(pk=self.school.id).exists())
+        self.assertFalse(Class.objects.filter(school_id=self.school.id).exists())
+        self.assertEqual(Teacher.objects.count(), 6)
+        self.assertEqual(Gradebook.objects.count(), 6)
+        deletion = CascadeDeletion.objects.get(pk=job['id'])
+        self.assertEqual(deletion.status, CascadeDeletionStatus.COMPLETED)
+        self.assertEqual(deletion.deleted, {
+            'lessons': lessons, 'gradebooks': 6, 'assignments': 3, 'classes': 3, 'schools': 1,
+        })
+        self.assertEqual(deletion.done, deletion.total)
+        # Um evento por lote: 6 cadernetas e 3 turmas em lotes de 2
+        gradebook_batches = 3
+        class_batches = 2
+        self.assertGreaterEqual(len(events), 2 + gradebook_batches + class_batches)
+        self.assertEqual([event.done for event in events], sorted(event.done for event in events))
+        self.assertEqual(events[-1].status, 'completed')
+
+    def test_calendar_deletion_keeps_other_calendars(self):
+        """Excluir o calendário remove só as cadernetas e aulas que o usam"""
+        job, _ = self._delete(reverse('academiccalendar-detail', kwargs={'year': 2026}))
+
+        self.assertFalse(AcademicCalendar.objects.filter(year=2026).exists())
+        self.assertFalse(GradebookLesson.objects.filter(gradebook__calendar__year=2026).exists())
+        self.assertEqual(Gradebook.objects.filter(calendar=self.other_calendar).count(), 6)
+        self.assertEqual(CascadeDeletion.objects.get(pk=job['id']).deleted['gradebooks'], 6)
+
+    def test_schedule_reuses_active_deletion(self):
+        """Pedir de novo a exclusão de um alvo já agendado devolve a mesma tarefa"""
+        service = CascadeDeletionService()
+        first = service.schedule(self.school)
+        second = service.schedule(self.school)
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(first.status, CascadeDeletionStatus.PENDING)
+
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from apps.gradebooks.views import GradebookViewSet
+from apps.gradebooks.views import GradebookViewSet, gradebook_events
 
 router = DefaultRouter()
 router.register(r'gradebooks', GradebookViewSet)
 
 urlpatterns = [
+    # Antes do router, para não ser lida como gradebooks/{pk}/
+    path('gradebooks/events/', gradebook_events, name='gradebook-events'),
     path('', include(router.urls)),
 ]
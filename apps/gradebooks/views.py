@@ -1,17 +1,411 @@
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import viewsets
+from django.views.decorators.http import require_GET
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 from apps.gradebooks.models import Gradebook
-from apps.gradebooks.serializers import GradebookSerializer
-from drf_spectacular.utils import extend_schema
+from apps.gradebooks.filters import GradebookFilterSet
+from apps.gradebooks.schemas import (
+    ContentRegistryPatchResult,
+    GradebookGenerationResult,
+    GradebookStatusTransitionResult,
+    MissingContentReport,
+)
+from apps.classes.models import Class
+from apps.schools.services import invalidate_school_summaries
+from apps.gradebooks.serializers import (
+    GradebookContentPatchSerializer,
+    GradebookExportQuerySerializer,
+    GradebookGenerateSerializer,
+    GradebookSerializer,
+    GradebookStatusTransitionSerializer,
+    GradebookSummarySerializer,
+    MissingContentQuerySerializer,
+)
+from apps.gradebooks.events import (
+    EventStreamResponse,
+    format_sse,
+    iter_sse,
+    job_channel,
+    publish_gradebook_progress,
+    stream_limiter,
+    teacher_channel,
+)
+from apps.gradebooks.renderers import (
+    CSVRenderer,
+    MergePatchParser,
+    PDFRenderer,
+    XLSXRenderer,
+    ZipRenderer,
+)
+from apps.gradebooks.services import (
+    ContentVersionConflict,
+    GradebookContentService,
+    GradebookExportService,
+    GradebookGenerationService,
+    GradebookPDFService,
+    GradebookReportService,
+    GradebookStatusService,
+)
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from django_filters.rest_framework import DjangoFilterBackend
+from esmeraldinha.serializers import SPARSE_FIELDSET_PARAMETERS
 
 @extend_schema(tags=['Gradebook'])
 class GradebookViewSet(viewsets.ModelViewSet):
     queryset = Gradebook.objects.all()
     serializer_class = GradebookSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = GradebookFilterSet
     action_to_serializer = {
-        'list': GradebookSerializer,
+        'list': GradebookSummarySerializer,
         'retrieve': GradebookSerializer,
         'create': GradebookSerializer,
         'update': GradebookSerializer,
         'partial_update': GradebookSerializer,
-    }
\ No newline at end of file
+        'generate': GradebookGenerateSerializer,
+        'content': GradebookContentPatchSerializer,
+        'bulk_status': GradebookStatusTransitionSerializer,
+    }
+
+    def get_serializer_class(self):
+        return self.action_to_serializer.get(self.action, super().get_serializer_class())
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action == 'list':
+            return (
+                qs.select_related('teacher', 'calendar', 'academic_class__school')
+                .defer('content_registry', 'calendar__calendar_data', 'calendar__processing_errors')
+            )
+        return qs.select_related('teacher', 'calendar', 'academic_class').prefetch_related(
+            Prefetch('teacher__classes', queryset=Class.objects.select_related('school'))
+        )
+
+    def perform_update(self, serializer):
+        gradebook = serializer.save()
+        publish_gradebook_progress(gradebook)
+
+    def perform_destroy(self, instance):
+        school_id = instance.academic_class.school_id
+        instance.delete()
+        invalidate_school_summaries(school_id)
+
+    @extend_schema(
+        summary='Lista as cadernetas',
+        description='Retorna uma lista paginada e resumida das cadernetas: o calendário é referenciado pelo ano e professor e turma vêm sem aninhamentos. Use GET /api/gradebooks/{id}/ para a caderneta completa. Filtra por teacher_id, class_id, calendar_id, school_id, year e status; a ordenação (status, código do professor) é atendida por índices compostos. Use ?fields= e ?expand= para escolher os campos.',
+        parameters=SPARSE_FIELDSET_PARAMETERS,
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        summary='Gera as cadernetas de uma escola',
+        description='Cria, em lote, uma caderneta para cada par professor/turma da escola no calendário do ano informado. Pares que já possuem caderneta são ignorados.',
+        request=GradebookGenerateSerializer,
+        responses={
+            201: OpenApiResponse(
+                response=GradebookGenerationResult,
+                description='Cadernetas geradas com sucesso'
+            ),
+            400: OpenApiResponse(
+                description='Escola ou calendário inválidos'
+            )
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='generate')
+    def generate(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        result = GradebookGenerationService().generate_for_school(
+            serializer.validated_data['school'],
+            serializer.validated_data['calendar'],
+            job_id=serializer.validated_data.get('job_id'),
+        )
+        return Response(result.model_dump(mode="json"), status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        summary='Salva alterações do registro de conteúdo',
+        description='Aplica como merge-patch apenas as aulas alteradas, sem reenviar o registro inteiro. A versão informada deve ser a atual; a resposta traz a nova versão para o próximo salvamento e o progresso recalculado.',
+        request=GradebookContentPatchSerializer,
+        responses={
+            200: OpenApiResponse(
+                response=ContentRegistryPatchResult,
+                description='Registro salvo'
+            ),
+            400: OpenApiResponse(
+                description='Datas inválidas ou que não são aulas da caderneta'
+            ),
+            404: OpenApiResponse(
+                description='Caderneta não encontrada'
+            ),
+            409: OpenApiResponse(
+                description='O registro foi alterado desde a versão informada'
+            )
+        }
+    )
+    @action(detail=True, methods=['patch'], url_path='content',
+            parser_classes=[JSONParser, MergePatchParser])
+    def content(self, request, pk=None):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            result = GradebookContentService().apply_patch(
+                int(pk),
+                serializer.validated_data['version'],
+                serializer.validated_data['lessons'],
+            )
+        except ContentVersionConflict as e:
+            return Response(
+                {'error': 'O registro foi alterado por outro salvamento. Recarregue a caderneta.',
+                 'version': e.current_version},
+                status=status.HTTP_409_CONFLICT
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result.model_dump(mode="json"), status=status.HTTP_200_OK)
+
+    @extend_schema(
+        summary='Altera o status de várias cadernetas',
+        description='Move para o status informado as cadernetas selecionadas por ids e/ou filtros (school_id, class_id, teacher_id, year) em um único UPDATE. Só são alteradas as cadernetas cujo status atual permite a transição (pendente → em andamento/cancelada, em andamento → concluída/cancelada, concluída → em andamento, cancelada → pendente); as demais são contadas em rejected.',
+        request=GradebookStatusTransitionSerializer,
+        responses={
+            200: OpenApiResponse(
+                response=GradebookStatusTransitionResult,
+                description='Contagem por status e cadernetas alteradas'
+            ),
+            400: OpenApiResponse(
+                description='Status inválido ou seleção vazia'
+            )
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        gradebooks = GradebookFilterSet(
+            data={name: data[name] for name in serializer.FILTERS if name in data},
+            queryset=Gradebook.objects.all(),
+        ).qs
+        if 'ids' in data:
+            gradebooks = gradebooks.filter(id__in=data['ids'])
+
+        result = GradebookStatusService().transition(gradebooks, data['status'])
+        return Response(result.model_dump(mode="json"), status=status.HTTP_200_OK)
+
+    @extend_schema(
+        summary='Cadernetas com aulas sem conteúdo',
+        description='Lista as cadernetas que têm aulas sem conteúdo registrado no período, com a quantidade de pendências.',
+        parameters=[MissingContentQuerySerializer],
+        responses={
+            200: OpenApiResponse(
+                response=MissingContentReport,
+                description='Cadernetas com pendências'
+            ),
+            400: OpenApiResponse(
+                description='Período inválido'
+            )
+        }
+    )
+    @action(detail=False, methods=['get'], url_path='reports/missing-content')
+    def missing_content(self, request):
+        query = MissingContentQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        report = GradebookReportService().missing_content(
+            query.validated_data['start'],
+            query.validated_data['end'],
+            query.validated_data.get('school_id'),
+        )
+        return Response(report.model_dump(mode="json"), status=status.HTTP_200_OK)
+
+    def _export_queryset(self, request):
+        query = GradebookExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return GradebookExportService().queryset(**query.validated_data), query.validated_data
+
+    def _export_filename(self, filters, extension):
+        parts = ['aulas'] + [f"{key.removesuffix('_id')}-{value}" for key, value in filters.items()]
+        return f"{'_'.join(parts)}.{extension}"
+
+    @extend_schema(
+        summary='Exporta as aulas das cadernetas em CSV',
+        description='Transmite uma linha por aula (escola, turma, professor, data, etapa, conteúdo e frequência), lida do banco em blocos. Filtros combináveis por escola, turma, professor, etapa e ano.',
+        parameters=[GradebookExportQuerySerializer],
+        responses={
+            (status.HTTP_200_OK, 'text/csv'): OpenApiResponse(
+                description='Aulas em CSV'
+            ),
+            400: OpenApiResponse(
+                description='Filtros inválidos'
+            )
+        }
+    )
+    @action(detail=False, methods=['get'], url_path=r'export\.csv',
+            renderer_classes=[JSONRenderer, CSVRenderer])
+    def export_csv(self, request):
+        queryset, filters = self._export_queryset(request)
+        response = StreamingHttpResponse(
+            GradebookExportService().iter_csv(queryset), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{self._export_filename(filters, "csv")}"'
+        return response
+
+    @extend_schema(
+        summary='Exporta as aulas das cadernetas em XLSX',
+        description='Gera a planilha em blocos, com memória limitada independentemente do tamanho da escola, usando os mesmos filtros do CSV.',
+        parameters=[GradebookExportQuerySerializer],
+        responses={
+            (status.HTTP_200_OK, XLSXRenderer.media_type): OpenApiResponse(
+                description='Aulas em XLSX'
+            ),
+            400: OpenApiResponse(
+                description='Filtros inválidos'
+            )
+        }
+    )
+    @action(detail=False, methods=['get'], url_path=r'export\.xlsx',
+            renderer_classes=[JSONRenderer, XLSXRenderer])
+    def export_xlsx(self, request):
+        queryset, filters = self._export_queryset(request)
+        return FileResponse(
+            GradebookExportService().xlsx_file(queryset),
+            as_attachment=True,
+            filename=self._export_filename(filters, 'xlsx'),
+            content_type=XLSXRenderer.media_type,
+        )
+
+    @extend_schema(
+        summary='Baixa o diário da caderneta em PDF',
+        description='Renderiza o diário no modelo do professor (C1 ou C2). O PDF fica em cache até o conteúdo da caderneta mudar.',
+        responses={
+            (status.HTTP_200_OK, 'application/pdf'): OpenApiResponse(
+                description='Diário em PDF'
+            ),
+            404: OpenApiResponse(
+                description='Caderneta não encontrada'
+            )
+        }
+    )
+    @action(detail=True, methods=['get'], url_path='pdf',
+            renderer_classes=[JSONRenderer, PDFRenderer])
+    def pdf(self, request, pk=None):
+        service = GradebookPDFService()
+        gradebook = service.queryset().filter(pk=pk).first()
+        if gradebook is None:
+            return Response(
+                {'error': f'Caderneta {pk} não encontrada.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return FileResponse(
+            service.open(gradebook),
+            content_type='application/pdf',
+            filename=service.filename(gradebook),
+        )
+
+    @extend_schema(
+        summary='Baixa os diários de uma turma em ZIP',
+        description='Renderiza em paralelo os diários de todas as cadernetas da turma e os envia em um único ZIP, transmitido conforme cada PDF fica pronto. Cadernetas cuja renderização falha ficam de fora e são listadas em ERROS.txt, no fim do arquivo.',
+        parameters=[
+            OpenApiParameter(
+                name='class_id',
+                type=int,
+                location='query',
+                required=True,
+                description='ID da turma'
+            ),
+        ],
+        responses={
+            (status.HTTP_200_OK, 'application/zip'): OpenApiResponse(
+                description='ZIP com um PDF por caderneta'
+            ),
+            400: OpenApiResponse(
+                description='Turma não informada'
+            ),
+            404: OpenApiResponse(
+                description='Turma sem cadernetas'
+            )
+        }
+    )
+    @action(detail=False, methods=['get'], url_path='pdf-batch',
+            renderer_classes=[JSONRenderer, ZipRenderer])
+    def pdf_batch(self, request):
+        class_id = request.query_params.get('class_id')
+        if not class_id or not class_id.isdigit():
+            return Response(
+                {'error': 'Informe o parâmetro class_id.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        service = GradebookPDFService()
+        gradebooks = list(service.queryset().filter(academic_class_id=class_id).order_by('id'))
+        if not gradebooks:
+            return Response(
+                {'error': f'Nenhuma caderneta encontrada para a turma {class_id}.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        response = StreamingHttpResponse(service.iter_zip(gradebooks), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="cadernetas-turma-{class_id}.zip"'
+        return response
+
+
+MAX_EVENT_TEACHERS = 100
+
+
+@require_GET
+async def gradebook_events(request):
+    """
+    Fluxo Server-Sent Events do progresso das cadernetas (``/api/gradebooks/events/``).
+
+    Fica fora do ``GradebookViewSet`` porque o DRF não tem views assíncronas:
+    servido por um worker ASGI, cada fluxo aberto é uma corrotina e não
+    ocupa uma thread. A documentação OpenAPI está em
+    ``SPECTACULAR_SETTINGS['APPEND_PATHS']``.
+    """
+    teacher_ids = request.GET.getlist('teacher_id')
+    job_id = request.GET.get('job_id')
+    if not all(teacher_id.isdigit() for teacher_id in teacher_ids):
+        return JsonResponse({'error': 'teacher_id deve ser um número.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(teacher_ids) > MAX_EVENT_TEACHERS:
+        return JsonResponse(
+            {'error': f'Informe no máximo {MAX_EVENT_TEACHERS} professores.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not teacher_ids and not job_id:
+        return JsonResponse({'error': 'Informe teacher_id e/ou job_id.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    teacher_ids = sorted({int(teacher_id) for teacher_id in teacher_ids})
+    channels = [teacher_channel(teacher_id) for teacher_id in teacher_ids]
+    if job_id:
+        channels.append(job_channel(job_id))
+
+    def snapshot():
+        gradebooks = (
+            Gradebook.objects
+            .filter(teacher_id__in=teacher_ids)
+            .order_by('id')
+            .values('id', 'teacher_id', 'status', 'progress')
+        )
+        return [format_sse('gradebook', gradebook) for gradebook in gradebooks]
+
+    release = stream_limiter.acquire()
+    if release is None:
+        response = JsonResponse(
+            {'error': 'Muitos fluxos de eventos abertos; tente novamente em instantes.'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        response['Retry-After'] = str(settings.GRADEBOOK_EVENTS_RETRY_MS // 1000)
+        return response
+    return EventStreamResponse(
+        iter_sse(channels, snapshot if teacher_ids else None, on_close=release), on_close=release)
@@ -5,3 +5,6 @@ class SchoolConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.schools'
 
+
+    def ready(self):
+        from apps.schools import receivers
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.schools.models import School
+from apps.schools.services import SchoolSnapshotService
+
+
+class Command(BaseCommand):
+    help = 'Exporta todos os dados de uma escola para um snapshot NDJSON compactado (.ndjson.gz)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('school_id', type=int, help='ID da escola')
+        parser.add_argument(
+            '--output',
+            help='Arquivo de destino (padrão: escola-<id>.ndjson.gz)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            school = School.objects.get(pk=options['school_id'])
+        except School.DoesNotExist:
+            raise CommandError(f"Escola {options['school_id']} não encontrada.")
+
+        path = options['output'] or f'escola-{school.id}.ndjson.gz'
+        size = 0
+        with open(path, 'wb') as output:
+            for chunk in SchoolSnapshotService().iter_export(school):
+                output.write(chunk)
+                size += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Snapshot da escola "{school.name}" gravado em {path} ({size / 1024:.1f} KB)'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.schools.services import SchoolSnapshotService
+
+
+class Command(BaseCommand):
+    help = 'Restaura uma escola a partir de um snapshot gerado por export_school'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Caminho do snapshot (.ndjson.gz)')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as file:
+                result = SchoolSnapshotService().import_file(file)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Escola {result.school_id} restaurada: {result.classes} turmas, '
+            f'{result.teachers} professores novos ({result.teachers_reused} já existentes), '
+            f'{result.calendars} calendários novos ({result.calendars_reused} já existentes), '
+            f'{result.assignments} vínculos, {result.gradebooks} cadernetas e {result.lessons} aulas'
+        ))
@@ -0,0 +1,71 @@
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.academic_calendars.models import AcademicCalendar
+from apps.classes.models import Class
+from apps.gradebooks.models import Gradebook
+from apps.schools.models import School
+from apps.schools.services import invalidate_school_summaries
+from apps.teachers.models import Teacher
+
+
+def _schools_of_classes(class_ids):
+    return Class.objects.filter(id__in=class_ids).values_list('school_id', flat=True).distinct()
+
+
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+def invalidate_summary_on_school(sender, instance, **kwargs):
+    invalidate_school_summaries(instance.pk)
+
+
+@receiver(pre_save, sender=Class)
+def remember_class_school(sender, instance, **kwargs):
+    # A turma pode mudar de escola: o resumo da escola anterior também fica obsoleto
+    instance._previous_school_id = (
+        None if instance._state.adding
+        else Class.objects.filter(pk=instance.pk).values_list('school_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+def invalidate_summary_on_class(sender, instance, **kwargs):
+    invalidate_school_summaries(instance.school_id, getattr(instance, '_previous_school_id', None))
+
+
+@receiver(post_save, sender=Gradebook)
+def invalidate_summary_on_gradebook(sender, instance, **kwargs):
+    invalidate_school_summaries(*_schools_of_classes([instance.academic_class_id]))
+
+
+# Sem receptor de exclusão em Gradebook: ele desativaria a exclusão rápida em cascata das cadernetas.
+# A exclusão pela API invalida em GradebookViewSet.perform_destroy.
+# Professores e calendários: as escolas são consultadas antes da exclusão, enquanto os vínculos existem.
+@receiver(pre_delete, sender=Teacher)
+def invalidate_summaries_on_teacher_delete(sender, instance, **kwargs):
+    invalidate_school_summaries(*(
+        Class.objects
+        .filter(Q(teachers=instance) | Q(gradebooks__teacher=instance))
+        .values_list('school_id', flat=True)
+        .distinct()
+    ))
+
+
+@receiver(pre_delete, sender=AcademicCalendar)
+def invalidate_summaries_on_calendar_delete(sender, instance, **kwargs):
+    invalidate_school_summaries(*(
+        Class.objects.filter(gradebooks__calendar=instance).values_list('school_id', flat=True).distinct()))
+
+
+@receiver(m2m_changed, sender=Teacher.classes.through)
+def invalidate_summaries_on_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # instance é a turma
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_school_summaries(instance.school_id)
+    elif action in ('post_add', 'post_remove'):
+        invalidate_school_summaries(*_schools_of_classes(pk_set))
+    elif action == 'pre_clear':
+        invalidate_school_summaries(*instance.classes.values_list('school_id', flat=True).distinct())
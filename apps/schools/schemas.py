@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class GradebookStatusCounts(BaseModel):
+    pending: int = 0
+    in_progress: int = 0
+    completed: int = 0
+    cancelled: int = 0
+    total: int = 0
+
+
+class SchoolSummary(BaseModel):
+    id: int
+    name: str
+    code: int
+    classes: int = Field(description="Classes in the school")
+    teachers: int = Field(description="Distinct teachers assigned to the school's classes")
+    gradebooks: GradebookStatusCounts = Field(description="Gradebooks of the school's classes by status")
+    average_progress: Optional[float] = Field(
+        None, description="Mean gradebook progress (0-100), null when there are no gradebooks")
+
+
+class SnapshotImportResult(BaseModel):
+    school_id: Optional[int] = Field(None, description="Restored school")
+    calendars: int = Field(0, description="Calendars created")
+    calendars_reused: int = Field(0, description="Calendars already present, matched by year")
+    teachers: int = Field(0, description="Teachers created")
+    teachers_reused: int = Field(0, description="Teachers already present, matched by code")
+    classes: int = Field(0, description="Classes created")
+    assignments: int = Field(0, description="Teacher/class links created")
+    gradebooks: int = Field(0, description="Gradebooks created")
+    lessons: int = Field(0, description="Gradebook lessons created")
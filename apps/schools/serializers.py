@@ -1,11 +1,17 @@
 from rest_framework import serializers
 from apps.schools.models import School
+from esmeraldinha.serializers import SparseFieldsetMixin
 
 
-class SchoolSerializer(serializers.ModelSerializer):
+class SchoolSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = School
         fields = ['id', 'name', 'code']
         read_only_fields = ['id']
 
 
+
+
+class SchoolSnapshotImportSerializer(serializers.Serializer):
+    file = serializers.FileField(
+        help_text="Snapshot gerado por GET /api/schools/{id}/snapshot/ (NDJSON compactado com gzip)")
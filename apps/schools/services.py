@@ -0,0 +1,416 @@
+import gzip
+import io
+import json
+import time
+import zlib
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, Exists, IntegerField, OuterRef, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.academic_calendars.models import AcademicCalendar
+from apps.classes.models import Class
+from apps.gradebooks.models import Gradebook, GradebookLesson, GradebookStatus
+from apps.schools.models import School
+from apps.schools.schemas import GradebookStatusCounts, SchoolSummary, SnapshotImportResult
+from apps.teachers.models import Teacher, teacher_search_text
+
+
+def _version_key(school_id: int) -> str:
+    return f'school-summary:version:{school_id}'
+
+
+def _initial_version() -> int:
+    # Se a chave da versão sair do cache, a nova não repete a de resumos ainda guardados
+    return time.time_ns()
+
+
+def _versions(school_ids: Iterable[int]) -> Dict[int, int]:
+    keys = {school_id: _version_key(school_id) for school_id in school_ids}
+    found = cache.get_many(keys.values())
+    for key in keys.values():
+        if key not in found:
+            cache.add(key, _initial_version(), timeout=None)
+            found[key] = cache.get(key)
+    return {school_id: found[key] for school_id, key in keys.items()}
+
+
+def _bump_versions(school_ids: Set[int]):
+    for school_id in school_ids:
+        try:
+            cache.incr(_version_key(school_id))
+        except ValueError:
+            cache.add(_version_key(school_id), _initial_version(), timeout=None)
+
+
+def invalidate_school_summaries(*school_ids: Optional[int]):
+    """
+    Descarta os resumos em cache das escolas ``school_ids``, após o commit da
+    transação atual.
+
+    Cada escola tem a própria versão no cache, presente na chave do seu
+    resumo; incrementá-la torna obsoleto só o resumo daquela escola. Chamado
+    pelos sinais de escolas, turmas, professores e cadernetas e pelas
+    operações em lote que não disparam sinais, com as escolas que a escrita
+    afetou.
+    """
+    school_ids = {school_id for school_id in school_ids if school_id is not None}
+    if school_ids:
+        transaction.on_commit(lambda: _bump_versions(school_ids))
+
+
+class SchoolSummaryService:
+    """
+    Resumo das escolas para o painel: turmas, professores, cadernetas por
+    status e progresso médio.
+
+    Os números de várias escolas saem de uma única consulta agregada e ficam
+    em cache até a próxima escrita que os afete.
+    """
+
+    def queryset(self, school_ids: Iterable[int]):
+        Through = Teacher.classes.through
+        teachers = (
+            Through.objects
+            .filter(**{'class__school': OuterRef('pk')})
+            .order_by()
+            .values('class__school')
+            .annotate(total=Count('teacher', distinct=True))
+            .values('total')
+        )
+        status_counts = {
+            f'gradebooks_{value}': Count(
+                'classes__gradebooks', filter=Q(classes__gradebooks__status=value))
+            for value in GradebookStatus.values
+        }
+        return (
+            School.objects
+            .filter(id__in=school_ids)
+            .annotate(
+                classes_total=Count('classes', distinct=True),
+                # Subconsulta: juntar professores às cadernetas multiplicaria as linhas da média
+                teachers_total=Coalesce(Subquery(teachers, output_field=IntegerField()), Value(0)),
+                gradebooks_total=Count('classes__gradebooks'),
+                average_progress=Avg('classes__gradebooks__progress'),
+                **status_counts,
+            )
+            .values(
+                'id', 'name', 'code', 'classes_total', 'teachers_total',
+                'gradebooks_total', 'average_progress', *status_counts,
+            )
+        )
+
+    def compute(self, school_ids: Iterable[int]) -> Dict[int, SchoolSummary]:
+        summaries = {}
+        for row in self.queryset(school_ids):
+            average = row['average_progress']
+            summaries[row['id']] = SchoolSummary(
+                id=row['id'],
+                name=row['name'],
+                code=row['code'],
+                classes=row['classes_total'],
+                teachers=row['teachers_total'],
+                gradebooks=GradebookStatusCounts(
+                    total=row['gradebooks_total'],
+                    **{value: row[f'gradebooks_{value}'] for value in GradebookStatus.values},
+                ),
+                average_progress=round(average, 1) if average is not None else None,
+            )
+        return summaries
+
+    def summaries(self, school_ids: List[int]) -> List[SchoolSummary]:
+        """
+        Resumos das escolas na ordem de ``school_ids``, do cache quando possível.
+
+        As escolas sem resumo em cache são calculadas juntas, em uma consulta.
+        Ids inexistentes são omitidos.
+        """
+        versions = _versions(school_ids)
+        keys = {school_id: f'school-summary:{school_id}:{versions[school_id]}' for school_id in school_ids}
+        cached = cache.get_many(keys.values())
+        found = {
+            school_id: SchoolSummary.model_validate(cached[key])
+            for school_id, key in keys.items() if key in cached
+        }
+
+        missing = [school_id for school_id in school_ids if school_id not in found]
+        if missing:
+            computed = self.compute(missing)
+            cache.set_many(
+                {keys[school_id]: summary.model_dump() for school_id, summary in computed.items()},
+                timeout=settings.SCHOOL_SUMMARY_CACHE_TIMEOUT,
+            )
+            found.update(computed)
+
+        return [found[school_id] for school_id in school_ids if school_id in found]
+
+
+class SchoolSnapshotService:
+    """
+    Exporta e importa todos os dados de uma escola como NDJSON compactado (gzip).
+
+    O arquivo começa com um cabeçalho e segue com uma linha por registro, na
+    ordem de dependência: escola, calendários usados pelas cadernetas,
+    professores, turmas, vínculos professor/turma, cadernetas e aulas. Os
+    registros são lidos com ``.iterator()`` e compactados em blocos, então a
+    memória não cresce com o tamanho da escola, tanto na exportação quanto
+    na importação.
+
+    Na importação os registros são identificados pelas chaves naturais:
+    calendários pelo ano e professores pelo código são reaproveitados se já
+    existirem; a escola e suas turmas precisam ser novas. Os ids do arquivo
+    não são reaproveitados: todos os registros criados recebem ids novos, e
+    as referências entre eles são remapeadas. As senhas não são
+    exportadas: professores criados na importação recebem uma senha
+    inutilizável e precisam redefini-la.
+    """
+
+    FORMAT = 'esmeraldinha.school-snapshot'
+    VERSION = 1
+    CHUNK_SIZE = 2000
+    BATCH_SIZE = 1000
+    FLUSH_BYTES = 64 * 1024
+
+    SCHOOL = 'schools.school'
+    CALENDAR = 'academic_calendars.academiccalendar'
+    TEACHER = 'teachers.teacher'
+    CLASS = 'classes.class'
+    ASSIGNMENT = 'teachers.teacher_classes'
+    GRADEBOOK = 'gradebooks.gradebook'
+    LESSON = 'gradebooks.gradebooklesson'
+
+    FIELDS = {
+        SCHOOL: ('id', 'name', 'code'),
+        CALENDAR: ('id', 'year', 'calendar_data', 'processing_errors'),
+        # Sem password: o snapshot não leva credenciais dos professores
+        TEACHER: ('id', 'name', 'code', 'reduction_day', 'diary_type'),
+        CLASS: ('id', 'code', 'label'),
+        ASSIGNMENT: ('teacher_id', 'class_id'),
+        GRADEBOOK: (
+            'id', 'teacher_id', 'calendar_id', 'academic_class_id', 'content_registry', 'status',
+            'title', 'progress', 'lessons_total', 'lessons_filled', 'version',
+        ),
+        LESSON: (
+            'gradebook_id', 'date', 'stage', 'content', 'attendance_recorded', 'present', 'absent',
+        ),
+    }
+
+    def sections(self, school_id: int) -> List[Tuple[str, QuerySet]]:
+        """Registros da escola por modelo, na ordem em que são gravados no arquivo."""
+        Through = Teacher.classes.through
+        gradebooks = Gradebook.objects.filter(academic_class__school_id=school_id)
+        teachers = Teacher.objects.filter(
+            Exists(Through.objects.filter(teacher_id=OuterRef('pk'), **{'class__school_id': school_id}))
+            | Exists(gradebooks.filter(teacher_id=OuterRef('pk')))
+        )
+        return [
+            (self.SCHOOL, School.objects.filter(pk=school_id)),
+            (self.CALENDAR, AcademicCalendar.objects.filter(
+                Exists(gradebooks.filter(calendar_id=OuterRef('pk'))))),
+            (self.TEACHER, teachers),
+            (self.CLASS, Class.objects.filter(school_id=school_id)),
+            (self.ASSIGNMENT, Through.objects.filter(**{'class__school_id': school_id})),
+            (self.GRADEBOOK, gradebooks),
+            (self.LESSON, GradebookLesson.objects.filter(
+                gradebook__academic_class__school_id=school_id).order_by('gradebook_id', 'date')),
+        ]
+
+    def iter_lines(self, school: School) -> Iterator[str]:
+        yield json.dumps({
+            'format': self.FORMAT,
+            'version': self.VERSION,
+            'school_id': school.id,
+            'exported_at': timezone.now(),
+        }, cls=DjangoJSONEncoder) + '\n'
+        for model, queryset in self.sections(school.id):
+            if model != self.LESSON:
+                queryset = queryset.order_by('pk')
+            for row in queryset.values(*self.FIELDS[model]).iterator(chunk_size=self.CHUNK_SIZE):
+                yield json.dumps({'model': model, 'data': row}, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+    def iter_export(self, school: School) -> Iterator[bytes]:
+        """Produz o arquivo gzip em blocos, à medida que os registros são lidos."""
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+        buffer = io.StringIO()
+        for line in self.iter_lines(school):
+            buffer.write(line)
+            if buffer.tell() >= self.FLUSH_BYTES:
+                chunk = compressor.compress(buffer.getvalue().encode())
+                buffer = io.StringIO()
+                if chunk:
+                    yield chunk
+        yield compressor.compress(buffer.getvalue().encode()) + compressor.flush()
+
+    def import_file(self, file: IO) -> SnapshotImportResult:
+        """
+        Restaura uma escola a partir do arquivo gerado por ``iter_export``.
+
+        Os registros são gravados com ``bulk_create`` em lotes, em uma única
+        transação; os ids do arquivo são convertidos para os do banco.
+
+        Raises:
+            ValueError: Se o arquivo for inválido, já existir escola com o
+                mesmo código, alguma turma já estiver cadastrada ou a gravação
+                violar uma restrição do banco.
+        """
+        importer = _SnapshotImporter(self)
+        try:
+            with gzip.open(file, 'rt', encoding='utf-8') as lines, transaction.atomic():
+                header = json.loads(next(lines, 'null'))
+                if not isinstance(header, dict) or header.get('format') != self.FORMAT:
+                    raise ValueError("Arquivo não é um snapshot de escola.")
+                if header.get('version') != self.VERSION:
+                    raise ValueError(f"Versão de snapshot não suportada: {header.get('version')}.")
+                for line in lines:
+                    record = json.loads(line)
+                    importer.add(record['model'], record['data'])
+                importer.flush()
+                invalidate_school_summaries(importer.result.school_id)
+        except (OSError, EOFError, json.JSONDecodeError, KeyError, TypeError):
+            raise ValueError("Arquivo de snapshot inválido ou corrompido.")
+        except IntegrityError as e:
+            raise ValueError(f"O snapshot conflita com registros já cadastrados: {e}")
+        if importer.result.school_id is None:
+            raise ValueError("O snapshot não contém a escola.")
+        return importer.result
+
+
+class _SnapshotImporter:
+    """Acumula os registros de um mesmo modelo e grava cada lote com ``bulk_create``."""
+
+    def __init__(self, service: SchoolSnapshotService):
+        self.service = service
+        self.result = SnapshotImportResult()
+        self.model = None
+        self.batch: List[dict] = []
+        # id no arquivo -> id no banco
+        self.calendar_ids: Dict[int, int] = {}
+        self.teacher_ids: Dict[int, int] = {}
+        self.class_ids: Dict[int, int] = {}
+        self.gradebook_ids: Dict[int, int] = {}
+        self.school_id = None
+        self.handlers: Dict[str, Callable[[List[dict]], None]] = {
+            service.SCHOOL: self.import_schools,
+            service.CALENDAR: self.import_calendars,
+            service.TEACHER: self.import_teachers,
+            service.CLASS: self.import_classes,
+            service.ASSIGNMENT: self.import_assignments,
+            service.GRADEBOOK: self.import_gradebooks,
+            service.LESSON: self.import_lessons,
+        }
+
+    def add(self, model: str, data: dict):
+        if model not in self.handlers:
+            raise ValueError(f"Modelo desconhecido no snapshot: {model}.")
+        if model != self.model or len(self.batch) >= self.service.BATCH_SIZE:
+            self.flush()
+            self.model = model
+        self.batch.append(data)
+
+    def flush(self):
+        if self.batch:
+            self.handlers[self.model](self.batch)
+        self.batch = []
+
+    def _map(self, ids: Dict[int, int], old_id: int) -> int:
+        try:
+            return ids[old_id]
+        except KeyError:
+            raise ValueError("O snapshot referencia registros ausentes ou fora da ordem de dependência.")
+
+    def import_schools(self, rows: List[dict]):
+        if self.school_id is not None or len(rows) != 1:
+            raise ValueError("O snapshot deve conter exatamente uma escola.")
+        row = rows[0]
+        # Os ids não valem entre ambientes: a escola é identificada pelo código e recebe um id novo
+        if School.objects.filter(code=row['code']).exists():
+            raise ValueError(f"A escola com código {row['code']} já existe.")
+        School.objects.create(**{field: value for field, value in row.items() if field != 'id'})
+        # School.id não é AutoField: o id gerado pelo banco é lido pelo código, que é único
+        self.school_id = self.result.school_id = School.objects.get(code=row['code']).id
+
+    def import_calendars(self, rows: List[dict]):
+        existing = dict(
+            AcademicCalendar.objects.filter(year__in=[row['year'] for row in rows]).values_list('year', 'id'))
+        new_rows = [row for row in rows if row['year'] not in existing]
+        created = AcademicCalendar.objects.bulk_create(
+            AcademicCalendar(**{field: value for field, value in row.items() if field != 'id'})
+            for row in new_rows
+        )
+        existing.update((calendar.year, calendar.id) for calendar in created)
+        self.calendar_ids.update((row['id'], existing[row['year']]) for row in rows)
+        self.result.calendars += len(created)
+        self.result.calendars_reused += len(rows) - len(created)
+
+    def import_teachers(self, rows: List[dict]):
+        existing = dict(
+            Teacher.objects.filter(code__in=[row['code'] for row in rows]).values_list('code', 'id'))
+        new_rows = [row for row in rows if row['code'] not in existing]
+        # bulk_create não passa por Teacher.save: search_text é preenchido aqui
+        created = Teacher.objects.bulk_create(
+            Teacher(
+                search_text=teacher_search_text(row['name'], row['code']),
+                password=make_password(None),
+                **{field: value for field, value in row.items() if field not in ('id', 'password')},
+            )
+            for row in new_rows
+        )
+        existing.update((teacher.code, teacher.id) for teacher in created)
+        self.teacher_ids.update((row['id'], existing[row['code']]) for row in rows)
+        self.result.teachers += len(created)
+        self.result.teachers_reused += len(rows) - len(created)
+
+    def import_classes(self, rows: List[dict]):
+        if self.school_id is None:
+            raise ValueError("O snapshot referencia registros ausentes ou fora da ordem de dependência.")
+        taken = list(Class.objects.filter(code__in=[row['code'] for row in rows]).values_list('code', flat=True))
+        if taken:
+            raise ValueError(f"Turmas já cadastradas: {', '.join(sorted(taken))}.")
+        created = Class.objects.bulk_create(
+            Class(code=row['code'], label=row['label'], school_id=self.school_id) for row in rows)
+        self.class_ids.update((row['id'], academic_class.id) for row, academic_class in zip(rows, created))
+        self.result.classes += len(created)
+
+    def import_assignments(self, rows: List[dict]):
+        Through = Teacher.classes.through
+        Through.objects.bulk_create(
+            Through(
+                teacher_id=self._map(self.teacher_ids, row['teacher_id']),
+                class_id=self._map(self.class_ids, row['class_id']),
+            )
+            for row in rows
+        )
+        self.result.assignments += len(rows)
+
+    def import_gradebooks(self, rows: List[dict]):
+        teacher_codes = dict(
+            Teacher.objects.filter(
+                id__in={self._map(self.teacher_ids, row['teacher_id']) for row in rows}
+            ).values_list('id', 'code'))
+        gradebooks = []
+        for row in rows:
+            teacher_id = self._map(self.teacher_ids, row['teacher_id'])
+            gradebooks.append(Gradebook(
+                teacher_id=teacher_id,
+                teacher_code=teacher_codes[teacher_id],
+                calendar_id=self._map(self.calendar_ids, row['calendar_id']),
+                academic_class_id=self._map(self.class_ids, row['academic_class_id']),
+                **{field: value for field, value in row.items()
+                   if field not in ('id', 'teacher_id', 'calendar_id', 'academic_class_id')},
+            ))
+        created = Gradebook.objects.bulk_create(gradebooks)
+        self.gradebook_ids.update((row['id'], gradebook.id) for row, gradebook in zip(rows, created))
+        self.result.gradebooks += len(created)
+
+    def import_lessons(self, rows: List[dict]):
+        GradebookLesson.objects.bulk_create(
+            GradebookLesson(**{**row, 'gradebook_id': self._map(self.gradebook_ids, row['gradebook_id'])})
+            for row in rows
+        )
+        self.result.lessons += len(rows)
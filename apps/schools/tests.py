@@ -1,3 +1,6 @@
+import base64
+import gzip
+import io
 import json
 
 from django.http import JsonResponse
@@ -5,7 +8,7 @@ from django.test import SimpleTestCase, RequestFactory
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
-from unittest.mock import patch
+from unittest.mock import ANY, patch
 from rest_framework.exceptions import (
     NotFound,
     PermissionDenied,
@@ -13,9 +16,18 @@ from rest_framework.exceptions import (
 )
 from rest_framework.response import Response
 
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError
 
+from apps.academic_calendars.models import AcademicCalendar
+from apps.classes.models import Class
+from apps.gradebooks.models import Gradebook, GradebookLesson, GradebookStatus
 from apps.schools.models import School
+from apps.schools.services import SchoolSummaryService
+from apps.teachers.models import DiaryType, ReductionDay, Teacher
 from esmeraldinha.exceptions import (
     custom_exception_handler,
     _get_error_code,
@@ -24,6 +36,227 @@ from esmeraldinha.exceptions import (
 from esmeraldinha.middleware import ErrorHandlingMiddleware
 
 
+class SchoolSummaryAPITestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.school = School.objects.create(id=1, name="Escola A", code=1)
+        self.empty = School.objects.create(id=2, name="Escola B", code=2)
+        calendar = AcademicCalendar.objects.create(year=2026)
+        classes = [
+            Class.objects.create(code=f"C{index}", label="Turma", school=self.school) for index in range(3)]
+        teachers = [
+            Teacher.objects.create(name=f"Professor {index}", code=f"P{index}", password="-",
+                                   reduction_day=ReductionDay.MONDAY, diary_type=DiaryType.C1)
+            for index in range(2)
+        ]
+        # O primeiro professor dá aula nas três turmas; o segundo, em uma
+        for academic_class in classes:
+            teachers[0].classes.add(academic_class)
+        teachers[1].classes.add(classes[0])
+        for academic_class, status_value, progress in [
+            (classes[0], GradebookStatus.PENDING, 0),
+            (classes[1], GradebookStatus.IN_PROGRESS, 40),
+            (classes[2], GradebookStatus.COMPLETED, 100),
+        ]:
+            Gradebook.objects.create(
+                teacher=teachers[0], calendar=calendar, academic_class=academic_class,
+                content_registry={}, status=status_value, progress=progress)
+
+    def test_summary_aggregates_school(self):
+        """O resumo conta turmas, professores distintos e cadernetas por status"""
+        response = self.client.get(reverse('school-summary', args=[self.school.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'id': 1,
+            'name': "Escola A",
+            'code': 1,
+            'classes': 3,
+            'teachers': 2,
+            'gradebooks': {'pending': 1, 'in_progress': 1, 'completed': 1, 'cancelled': 0, 'total': 3},
+            'average_progress': 46.7,
+        })
+
+    def test_summary_list_uses_one_query_and_cache(self):
+        """A lista resume a página inteira em uma consulta agregada e depois vem do cache"""
+        url = reverse('school-summary-list')
+
+        with self.assertNumQueries(3):  # contagem, página e agregação
+            response = self.client.get(url)
+        results = response.json()['results']
+        self.assertEqual([item['id'] for item in results], [1, 2])
+        self.assertEqual(results[1]['classes'], 0)
+        self.assertIsNone(results[1]['average_progress'])
+
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_writes_invalidate_cached_summary(self):
+        """Alterar cadernetas em lote invalida o resumo em cache após o commit"""
+        url = reverse('school-summary', args=[self.school.id])
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('gradebook-bulk-status'),
+                             {'status': GradebookStatus.CANCELLED, 'school_id': self.school.id}, format='json')
+
+        gradebooks = self.client.get(url).json()['gradebooks']
+        self.assertEqual(gradebooks['cancelled'], 2)
+        self.assertEqual(gradebooks['completed'], 1)
+
+    def test_write_to_one_school_keeps_other_cached(self):
+        """Uma escrita na escola A invalida só o resumo de A; o de B continua em cache"""
+        url = reverse('school-summary-list')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('gradebook-bulk-status'),
+                             {'status': GradebookStatus.CANCELLED, 'school_id': self.school.id}, format='json')
+
+        with patch.object(SchoolSummaryService, 'compute', autospec=True,
+                          side_effect=SchoolSummaryService.compute) as compute:
+            results = self.client.get(url).json()['results']
+        compute.assert_called_once_with(ANY, [self.school.id])
+        self.assertEqual(results[0]['gradebooks']['cancelled'], 2)
+
+    def test_summary_of_missing_school_returns_404(self):
+        """O resumo de uma escola inexistente retorna 404"""
+        response = self.client.get(reverse('school-summary', args=[999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SchoolSnapshotAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(id=7, name="Escola Origem", code=70)
+        calendar = AcademicCalendar.objects.create(year=2026, calendar_data={'year': 2026, 'days': []})
+        teachers = [
+            Teacher.objects.create(name=f"Professora {index}", code=f"S{index}", password="senha-da-professora",
+                                   reduction_day=ReductionDay.FRIDAY, diary_type=DiaryType.C2)
+            for index in range(2)
+        ]
+        for index in range(3):
+            academic_class = Class.objects.create(code=f"S7-{index}", label=f"Turma {index}", school=self.school)
+            teachers[index % 2].classes.add(academic_class)
+            gradebook = Gradebook.objects.create(
+                teacher=teachers[index % 2], calendar=calendar, academic_class=academic_class,
+                content_registry={'lessons': {}}, status=GradebookStatus.IN_PROGRESS, progress=50)
+            GradebookLesson.objects.create(gradebook=gradebook, date=f"2026-03-0{index + 2}", content="Frações")
+
+    def _export(self):
+        response = self.client.get(reverse('school-snapshot', args=[self.school.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        return b''.join(response.streaming_content)
+
+    def _import(self, content):
+        upload = SimpleUploadedFile('escola-7.ndjson.gz', content, content_type='application/gzip')
+        return self.client.post(reverse('school-import-snapshot'), {'file': upload}, format='multipart')
+
+    def _state(self):
+        return (
+            sorted(Class.objects.values_list('code', 'label', 'school__code')),
+            sorted(Teacher.objects.values_list('code', 'classes__code')),
+            sorted(Gradebook.objects.values_list('teacher_code', 'academic_class__code', 'calendar__year', 'status')),
+            sorted(GradebookLesson.objects.values_list('gradebook__academic_class__code', 'date', 'content')),
+        )
+
+    def test_snapshot_is_ndjson_in_dependency_order(self):
+        """O snapshot é NDJSON compactado, com um cabeçalho e os modelos em ordem de dependência"""
+        lines = [json.loads(line) for line in gzip.decompress(self._export()).splitlines()]
+
+        self.assertEqual(lines[0]['school_id'], 7)
+        models = [line['model'] for line in lines[1:]]
+        order = list(dict.fromkeys(models))
+        self.assertEqual(order, [
+            'schools.school', 'academic_calendars.academiccalendar', 'teachers.teacher', 'classes.class',
+            'teachers.teacher_classes', 'gradebooks.gradebook', 'gradebooks.gradebooklesson',
+        ])
+        self.assertEqual(models.count('gradebooks.gradebooklesson'), 3)
+
+    def test_snapshot_does_not_export_passwords(self):
+        """O snapshot não contém a senha dos professores"""
+        content = gzip.decompress(self._export()).decode()
+
+        teachers = [json.loads(line)['data'] for line in content.splitlines()[1:]
+                    if json.loads(line)['model'] == 'teachers.teacher']
+        self.assertEqual(len(teachers), 2)
+        self.assertTrue(all('password' not in teacher for teacher in teachers))
+        self.assertNotIn('senha-da-professora', content)
+
+    def test_import_restores_exported_school(self):
+        """Exportar, apagar e importar devolve os mesmos dados"""
+        content = self._export()
+        before = self._state()
+        self.school.delete()
+        Teacher.objects.all().delete()
+        AcademicCalendar.objects.all().delete()
+
+        response = self._import(content)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json(), {
+            'school_id': School.objects.get(code=70).id, 'calendars': 1, 'calendars_reused': 0, 'teachers': 2, 'teachers_reused': 0,
+            'classes': 3, 'assignments': 3, 'gradebooks': 3, 'lessons': 3,
+        })
+        self.assertEqual(self._state(), before)
+        self.assertEqual(Teacher.objects.get(code="S0").search_text, "professora 0 s0")
+        self.assertTrue(Teacher.objects.get(code="S0").password.startswith(UNUSABLE_PASSWORD_PREFIX))
+
+    def test_import_reuses_teachers_and_calendars(self):
+        """Professores e calendários já cadastrados são reaproveitados pela chave natural"""
+        content = self._export()
+        self.school.delete()
+
+        response = self._import(content)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['teachers_reused'], 2)
+        self.assertEqual(response.json()['calendars_reused'], 1)
+        self.assertEqual(Teacher.objects.count(), 2)
+
+    def test_import_assigns_new_ids(self):
+        """Uma escola diferente com o mesmo id no destino não impede a importação"""
+        content = self._export()
+        self.school.delete()
+        School.objects.create(id=7, name="Outra Escola", code=71)
+
+        response = self._import(content)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        imported = School.objects.get(code=70)
+        self.assertNotEqual(imported.id, 7)
+        self.assertEqual(response.json()['school_id'], imported.id)
+        self.assertEqual(Class.objects.filter(school=imported).count(), 3)
+        self.assertEqual(School.objects.get(pk=7).name, "Outra Escola")
+
+    def test_import_turns_integrity_errors_into_400(self):
+        """Uma violação de restrição do banco durante a importação retorna 400"""
+        content = self._export()
+        self.school.delete()
+
+        with patch.object(GradebookLesson.objects, 'bulk_create', side_effect=IntegrityError("duplicada")):
+            response = self._import(content)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('conflita', response.json()['error'])
+        self.assertFalse(School.objects.filter(code=70).exists())
+
+    def test_import_rejects_existing_school(self):
+        """Importar sobre uma escola existente não altera nada"""
+        response = self._import(self._export())
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('já existe', response.json()['error'])
+        self.assertEqual(Class.objects.count(), 3)
+
+    def test_import_rejects_invalid_file(self):
+        """Um arquivo que não é snapshot é rejeitado"""
+        response = self._import(gzip.compress(b'{"model": "x"}\n'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class SchoolAPITestCase(APITestCase):
 
     def test_schools_list_endpoint_exists(self):
@@ -70,6 +303,38 @@ class SchoolAPITestCase(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_cursor_pagination_walks_ties_in_name(self):
+        """A paginação por cursor percorre escolas de mesmo nome sem repetir nem pular"""
+        School.objects.bulk_create(
+            School(id=index, name=f"Escola {index % 3}", code=index) for index in range(1, 46))
+        url = reverse('school-list')
+
+        ids = []
+        response = self.client.get(url, {'cursor': ''})
+        while True:
+            data = response.json()
+            self.assertIsNone(data['count'])
+            ids.extend(item['id'] for item in data['results'])
+            if not data['next']:
+                break
+            response = self.client.get(data['next'])
+
+        expected = list(School.objects.order_by('name', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor_returns_404(self):
+        """Um cursor adulterado é rejeitado"""
+        response = self.client.get(reverse('school-list'), {'cursor': 'invalido'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor_values_return_404(self):
+        """Um cursor bem formado com valores do tipo errado é rejeitado sem erro no banco"""
+        for position in (["x", "y", "z"], ["Escola", "x"], [None, 1], ["Escola", [1]]):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            with self.subTest(position=position):
+                response = self.client.get(reverse('school-list'), {'cursor': cursor})
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_health_check_endpoint_returns_ok(self):
         """Garante que o endpoint /api/health/ responde OK"""
         response = self.client.get('/api/health/')
@@ -1,7 +1,16 @@
-from rest_framework import viewsets
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.response import Response
+from apps.gradebooks.schemas import CascadeDeletionJob
+from apps.gradebooks.services import CascadeDeletionService
 from apps.schools.models import School
-from apps.schools.serializers import SchoolSerializer
+from apps.schools.schemas import SchoolSummary, SnapshotImportResult
+from apps.schools.serializers import SchoolSerializer, SchoolSnapshotImportSerializer
+from apps.schools.services import SchoolSnapshotService, SchoolSummaryService
 from drf_spectacular.utils import extend_schema, OpenApiResponse
+from esmeraldinha.serializers import SPARSE_FIELDSET_PARAMETERS
 
 
 @extend_schema(tags=['Escolas'])
@@ -12,6 +21,7 @@ class SchoolViewSet(viewsets.ModelViewSet):
     @extend_schema(
         summary='Lista todas as escolas',
         description='Retorna uma lista paginada de todas as escolas cadastradas. Use os parâmetros ?page=N para navegar entre páginas.',
+        parameters=SPARSE_FIELDSET_PARAMETERS,
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
@@ -91,10 +101,11 @@ class SchoolViewSet(viewsets.ModelViewSet):
 
     @extend_schema(
         summary='Deleta uma escola',
-        description='Remove uma escola do sistema',
+        description='Agenda a exclusão da escola com suas turmas, vínculos, cadernetas e aulas. A remoção roda em segundo plano, em lotes de tamanho fixo com transações curtas; acompanhe o andamento em GET /api/gradebooks/events/?job_id= com o job_id retornado.',
         responses={
-            204: OpenApiResponse(
-                description='Escola deletada com sucesso'
+            202: OpenApiResponse(
+                response=CascadeDeletionJob,
+                description='Exclusão agendada'
             ),
             404: OpenApiResponse(
                 description='Escola não encontrada'
@@ -102,5 +113,93 @@ class SchoolViewSet(viewsets.ModelViewSet):
         }
     )
     def destroy(self, request, *args, **kwargs):
-        return super().destroy(request, *args, **kwargs)
+        service = CascadeDeletionService()
+        deletion = service.schedule(self.get_object())
+        return Response(service.job(deletion).model_dump(mode="json"), status=status.HTTP_202_ACCEPTED)
 
+    @extend_schema(
+        summary='Resumo das escolas para o painel',
+        operation_id='api_schools_summary_list',
+        description='Lista paginada (como GET /api/schools/) com, para cada escola, o total de turmas, de professores, de cadernetas por status e o progresso médio das cadernetas. Os números de todas as escolas da página saem de uma única consulta agregada e ficam em cache até a próxima alteração em escolas, turmas, vínculos ou cadernetas.',
+        responses={
+            200: OpenApiResponse(
+                response=SchoolSummary,
+                description='Resumos da página retornados com sucesso'
+            )
+        }
+    )
+    @action(detail=False, methods=['get'], url_path='summary')
+    def summary_list(self, request):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()).only('id'))
+        schools = page if page is not None else self.filter_queryset(self.get_queryset()).only('id')
+        summaries = SchoolSummaryService().summaries([school.id for school in schools])
+        data = [summary.model_dump(mode="json") for summary in summaries]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @extend_schema(
+        summary='Resumo de uma escola para o painel',
+        description='Total de turmas, de professores, de cadernetas por status e o progresso médio das cadernetas da escola, calculados em uma única consulta agregada e mantidos em cache até a próxima alteração.',
+        responses={
+            200: OpenApiResponse(
+                response=SchoolSummary,
+                description='Resumo retornado com sucesso'
+            ),
+            404: OpenApiResponse(
+                description='Escola não encontrada'
+            )
+        }
+    )
+    @action(detail=True, methods=['get'], url_path='summary')
+    def summary(self, request, pk=None):
+        summaries = SchoolSummaryService().summaries([self.get_object().id])
+        return Response(summaries[0].model_dump(mode="json"))
+
+    @extend_schema(
+        summary='Exporta todos os dados de uma escola',
+        description='Transmite um arquivo NDJSON compactado com gzip com a escola, suas turmas, os professores e vínculos, as cadernetas com as aulas e os calendários usados por elas. Os registros são lidos do banco em blocos, com memória constante mesmo nas maiores escolas. O arquivo pode ser restaurado em outro ambiente com POST /api/schools/snapshot/.',
+        responses={
+            (status.HTTP_200_OK, 'application/gzip'): OpenApiResponse(
+                description='Snapshot da escola'
+            ),
+            404: OpenApiResponse(
+                description='Escola não encontrada'
+            )
+        }
+    )
+    @action(detail=True, methods=['get'], url_path='snapshot')
+    def snapshot(self, request, pk=None):
+        school = self.get_object()
+        response = StreamingHttpResponse(
+            SchoolSnapshotService().iter_export(school), content_type='application/gzip')
+        response['Content-Disposition'] = f'attachment; filename="escola-{school.id}.ndjson.gz"'
+        return response
+
+    @extend_schema(
+        summary='Restaura uma escola a partir de um snapshot',
+        description='Importa o arquivo gerado por GET /api/schools/{id}/snapshot/ em uma única transação, gravando em lotes na ordem de dependência. Professores (pelo código) e calendários (pelo ano) já cadastrados são reaproveitados; a escola e as turmas precisam ser novas.',
+        request={
+            'multipart/form-data': SchoolSnapshotImportSerializer,
+        },
+        responses={
+            201: OpenApiResponse(
+                response=SnapshotImportResult,
+                description='Escola restaurada com sucesso'
+            ),
+            400: OpenApiResponse(
+                description='Arquivo inválido, ou escola ou turmas já existentes'
+            )
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='snapshot', parser_classes=[MultiPartParser, FormParser])
+    def import_snapshot(self, request):
+        serializer = SchoolSnapshotImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            result = SchoolSnapshotService().import_file(serializer.validated_data['file'])
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result.model_dump(mode="json"), status=status.HTTP_201_CREATED)
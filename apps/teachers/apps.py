@@ -1,6 +1,29 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_save
+
+
+def ensure_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from django.db.migrations.recorder import MigrationRecorder
+    from apps.teachers.search import install_search_index
+
+    connection = connections[using]
+    if ('teachers', '0003_teacher_search_text') in MigrationRecorder(connection).applied_migrations():
+        install_search_index(connection)
+
+
+def fill_search_text_on_load(sender, instance, raw, **kwargs):
+    # loaddata grava sem passar por Teacher.save
+    if raw:
+        from apps.teachers.models import teacher_search_text
+
+        instance.search_text = teacher_search_text(instance.name, instance.code)
 
 
 class TeacherConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.teachers'
+
+    def ready(self):
+        post_migrate.connect(ensure_search_index, sender=self)
+        pre_save.connect(fill_search_text_on_load, sender=self.get_model('Teacher'))
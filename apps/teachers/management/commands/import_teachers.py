@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.teachers.services import TeacherRosterImportService
+
+
+class Command(BaseCommand):
+    help = 'Importa professores e suas turmas de uma planilha CSV ou XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Caminho da planilha (.csv ou .xlsx)')
+        parser.add_argument(
+            '--replace-classes',
+            action='store_true',
+            help='Substitui as turmas dos professores importados em vez de apenas acrescentar',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas valida a planilha, sem gravar',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, 'rb') as file:
+                result = TeacherRosterImportService().import_file(
+                    file, path, replace_classes=options['replace_classes'], dry_run=options['dry_run'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in result.errors:
+            self.stdout.write(self.style.WARNING(
+                f'  Linha {error.row} ({error.code or "sem código"}): {" ".join(error.errors)}'))
+        prefix = 'Validação' if result.dry_run else 'Importação'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} concluída: {result.rows} linhas, {result.created} professores novos, '
+            f'{result.updated} atualizados, {result.assignments} vínculos com turmas, '
+            f'{len(result.errors)} linhas com erro'
+        ))
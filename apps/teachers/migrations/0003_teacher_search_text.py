@@ -0,0 +1,102 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:09
+
+import unicodedata
+
+from django.db import migrations, models
+
+# Cópia do estado da busca nesta migração: ela não importa o código da aplicação,
+# que pode mudar depois sem alterar o que a migração aplica.
+SEARCH_TEXT_MAX_LENGTH = 120
+FTS_TABLE = 'teachers_teacher_fts'
+TRIGRAM_INDEX = 'teacher_search_trgm_idx'
+
+SQLITE_FTS_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        search_text, content='teachers_teacher', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON teachers_teacher BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON teachers_teacher BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_text ON teachers_teacher BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+POSTGRES_TRIGRAM_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON teachers_teacher USING gin (search_text gin_trgm_ops)",
+]
+
+
+def normalize(value):
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def fill_search_text(apps, schema_editor):
+    Teacher = apps.get_model('teachers', 'Teacher')
+    batch = []
+    for teacher in Teacher.objects.only('id', 'name', 'code').iterator(chunk_size=1000):
+        code = normalize(teacher.code)
+        name = normalize(teacher.name)[:max(SEARCH_TEXT_MAX_LENGTH - len(code) - 1, 0)]
+        teacher.search_text = f'{name} {code}'[:SEARCH_TEXT_MAX_LENGTH]
+        batch.append(teacher)
+        if len(batch) >= 1000:
+            Teacher.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    Teacher.objects.bulk_update(batch, ['search_text'])
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_TRIGRAM_SQL
+    elif connection.vendor == 'sqlite':
+        statements = SQLITE_FTS_SQL
+    else:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def remove_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+        elif connection.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers', '0002_refactoring_classes_and_school_integration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teacher',
+            name='search_text',
+            field=models.CharField(default='', editable=False, help_text='Nome e código sem acentos e em minúsculas, indexados para a busca', max_length=120),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, remove_search_index),
+    ]
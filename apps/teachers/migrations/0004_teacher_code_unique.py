@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:13
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_codes(apps, schema_editor):
+    """
+    Interrompe a migração se houver códigos de professor repetidos.
+
+    O código identifica o professor no login e nas importações, e professores
+    com o mesmo código podem ter turmas e cadernetas diferentes: unificá-los
+    ou renomeá-los automaticamente poderia misturar dados de pessoas
+    diferentes. A mensagem lista os registros para a correção manual.
+    """
+    Teacher = apps.get_model('teachers', 'Teacher')
+    duplicates = list(
+        Teacher.objects.order_by().values('code').annotate(total=Count('id')).filter(total__gt=1)
+        .values_list('code', flat=True)
+    )
+    if not duplicates:
+        return
+    details = []
+    for code in sorted(duplicates):
+        ids = Teacher.objects.filter(code=code).order_by('id').values_list('id', flat=True)
+        details.append(f"'{code}' (ids {', '.join(map(str, ids))})")
+    raise RuntimeError(
+        "Não é possível tornar o código do professor único: há códigos repetidos: "
+        f"{'; '.join(details)}. Altere o código ou una os professores duplicados "
+        "(turmas e cadernetas) e rode a migração novamente."
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers', '0003_teacher_search_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='teacher',
+            name='code',
+            field=models.CharField(max_length=6, unique=True),
+        ),
+    ]
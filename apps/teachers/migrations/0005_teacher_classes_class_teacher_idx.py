@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers', '0004_teacher_code_unique'),
+    ]
+
+    operations = [
+        # A tabela de ligação é criada automaticamente pelo ManyToManyField, sem Meta para índices
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS teacher_classes_class_teacher_idx '
+            'ON teachers_teacher_classes (class_id, teacher_id)',
+            'DROP INDEX IF EXISTS teacher_classes_class_teacher_idx',
+        ),
+    ]
@@ -1,5 +1,31 @@
+import unicodedata
+
 from django.db import models
 from apps.classes.models import Class
+
+
+SEARCH_TEXT_MAX_LENGTH = 120
+
+
+def normalize_search_text(value: str) -> str:
+    """Remove acentos e normaliza maiúsculas/minúsculas para a busca ("João" → "joao")."""
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def teacher_search_text(name: str, code: str) -> str:
+    """
+    ``search_text`` do professor: nome e código normalizados.
+
+    A normalização pode alongar o texto (ligaduras e alguns caracteres
+    compatíveis viram mais de um, e "ß" vira "ss"), então o nome é cortado
+    para caber em ``SEARCH_TEXT_MAX_LENGTH``, preservando o código inteiro.
+    """
+    code = normalize_search_text(code)
+    name = normalize_search_text(name)[:max(SEARCH_TEXT_MAX_LENGTH - len(code) - 1, 0)]
+    return f'{name} {code}'[:SEARCH_TEXT_MAX_LENGTH]
+
+
 class ReductionDay(models.IntegerChoices):
     MONDAY = 1
     TUESDAY = 2
@@ -16,12 +42,21 @@ class DiaryType(models.TextChoices):
 class Teacher(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100)
-    code = models.CharField(max_length=6)
+    code = models.CharField(max_length=6, unique=True)
     password = models.CharField()
     reduction_day = models.IntegerField(choices=ReductionDay.choices)
     diary_type = models.CharField(choices=DiaryType.choices)
     classes = models.ManyToManyField(Class, related_name='teachers')
-    
+    search_text = models.CharField(
+        max_length=SEARCH_TEXT_MAX_LENGTH, default='', editable=False,
+        help_text='Nome e código sem acentos e em minúsculas, indexados para a busca')
 
     class Meta:
         ordering = ['code']
+
+    def save(self, *args, **kwargs):
+        self.search_text = teacher_search_text(self.name, self.code)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'search_text' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'search_text']
+        super().save(*args, **kwargs)
@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+
+class HighlightSpan(BaseModel):
+    field: Literal['name', 'code']
+    start: int = Field(description="Offset of the first matched character")
+    end: int = Field(description="Offset after the last matched character")
+
+
+class TeacherSearchHit(BaseModel):
+    id: int
+    code: str
+    name: str
+    highlight: List[HighlightSpan] = Field(
+        default_factory=list, description="Parts of name and code matched by the query")
+
+
+class TeacherSearchPage(BaseModel):
+    results: List[TeacherSearchHit]
+    next: Optional[str] = Field(None, description="Cursor for the next page, null on the last one")
+
+
+class RosterRowError(BaseModel):
+    row: int = Field(description="Line in the file, counting the header as line 1")
+    code: str = Field(description="Teacher code as written in the file")
+    errors: List[str]
+
+
+class RosterImportResult(BaseModel):
+    rows: int = Field(description="Data rows in the file")
+    created: int = Field(description="Teachers created")
+    updated: int = Field(description="Existing teachers updated by code")
+    assignments: int = Field(description="Teacher/class assignments in the valid rows")
+    errors: List[RosterRowError] = Field(description="Rows skipped and why")
+    dry_run: bool = Field(False, description="Only validated, nothing was written")
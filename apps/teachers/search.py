@@ -0,0 +1,232 @@
+"""
+Busca de professores por nome ou código, sem diferenciar acentos e maiúsculas.
+
+A busca usa ``Teacher.search_text`` (nome e código normalizados) e o índice de
+texto do banco: trigramas (``pg_trgm``) no PostgreSQL e FTS5 no SQLite. Cada
+termo digitado casa com o início de uma palavra, então "joao sil" encontra
+"João da Silva".
+"""
+import base64
+import json
+import re
+from typing import List, Optional, Tuple
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, QuerySet, Value, When
+from django.db.models.expressions import RawSQL
+
+from apps.teachers.models import Teacher, normalize_search_text
+from apps.teachers.schemas import HighlightSpan, TeacherSearchHit, TeacherSearchPage
+
+
+FTS_TABLE = 'teachers_teacher_fts'
+TRIGRAM_INDEX = 'teacher_search_trgm_idx'
+
+SQLITE_FTS_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        search_text, content='teachers_teacher', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON teachers_teacher BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON teachers_teacher BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_text ON teachers_teacher BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END
+    """,
+]
+
+POSTGRES_TRIGRAM_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON teachers_teacher USING gin (search_text gin_trgm_ops)",
+]
+
+
+def install_search_index(conn=connection):
+    """
+    Cria o índice de busca do banco, se ainda não existir.
+
+    No SQLite, recriar ``teachers_teacher`` (como o Django faz ao alterar
+    colunas) apaga os gatilhos que mantêm a tabela FTS5; por isso a função é
+    idempotente e roda também após cada ``migrate``, reconstruindo o índice
+    quando os gatilhos precisaram ser recriados.
+    """
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            for sql in POSTGRES_TRIGRAM_SQL:
+                cursor.execute(sql)
+        elif conn.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f'{FTS_TABLE}_%'],
+            )
+            complete = cursor.fetchone()[0] == 3
+            for sql in SQLITE_FTS_SQL:
+                cursor.execute(sql)
+            if not complete:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(conn=connection):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+        elif conn.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def search_terms(query: str) -> List[str]:
+    """Termos normalizados da consulta."""
+    return re.findall(r'\w+', normalize_search_text(query))
+
+
+class TeacherSearchBackend:
+    """Busca genérica por prefixo de palavra, sem índice de texto."""
+
+    def match(self, terms: List[str]) -> Q:
+        condition = Q()
+        for term in terms:
+            condition &= Q(search_text__startswith=term) | Q(search_text__contains=f' {term}')
+        return condition
+
+    def search(self, query: str) -> QuerySet:
+        """
+        Professores que casam com todos os termos de ``query``, por relevância.
+
+        A relevância (``rank``) prioriza o código que começa com o texto
+        digitado, depois o nome que começa com ele e por fim as demais
+        ocorrências; empates seguem a ordem do código.
+        """
+        terms = search_terms(query)
+        if not terms:
+            return Teacher.objects.none()
+        normalized = ' '.join(terms)
+        return (
+            Teacher.objects
+            .filter(self.match(terms))
+            .annotate(rank=Case(
+                When(code__istartswith=query.strip(), then=Value(3)),
+                When(search_text__startswith=normalized, then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ))
+            .order_by('-rank', 'code', 'id')
+        )
+
+
+class PostgresTeacherSearch(TeacherSearchBackend):
+    """Casa o início das palavras por expressão regular, atendida pelo índice de trigramas."""
+
+    def match(self, terms: List[str]) -> Q:
+        condition = Q()
+        for term in terms:
+            condition &= Q(search_text__regex=rf'(^|\s){re.escape(term)}')
+        return condition
+
+
+class SQLiteTeacherSearch(TeacherSearchBackend):
+    """Usa a tabela FTS5 com busca por prefixo em cada termo."""
+
+    def match(self, terms: List[str]) -> Q:
+        expression = ' '.join(f'"{term}"*' for term in terms)
+        return Q(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression]))
+
+
+def get_search_backend(conn=connection) -> TeacherSearchBackend:
+    if conn.vendor == 'postgresql':
+        return PostgresTeacherSearch()
+    if conn.vendor == 'sqlite':
+        return SQLiteTeacherSearch()
+    return TeacherSearchBackend()
+
+
+def encode_cursor(rank: int, code: str, teacher_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, code, teacher_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str, int]:
+    """Posição (rank, código, id) do último resultado da página anterior."""
+    try:
+        rank, code, teacher_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Cursor inválido.")
+    if not isinstance(rank, int) or not isinstance(code, str) or not isinstance(teacher_id, int):
+        raise ValueError("Cursor inválido.")
+    return rank, code, teacher_id
+
+
+def highlight(field: str, value: str, terms: List[str]) -> List[HighlightSpan]:
+    """Trechos de ``value`` no início das palavras que casam com algum termo."""
+    spans = []
+    for word in re.finditer(r'\w+', value):
+        # Normaliza caractere a caractere para manter os offsets do texto original
+        normalized = ''
+        offsets = []
+        for index, char in enumerate(word.group(), start=word.start()):
+            piece = normalize_search_text(char)
+            normalized += piece
+            offsets.extend([index + 1] * len(piece))
+        matched = max((len(term) for term in terms if normalized.startswith(term)), default=0)
+        if matched:
+            spans.append(HighlightSpan(field=field, start=word.start(), end=offsets[matched - 1]))
+    return spans
+
+
+def search_page(query: str, limit: int, cursor: Optional[str] = None) -> TeacherSearchPage:
+    """
+    Uma página da busca de professores, paginada por posição (keyset).
+
+    A página seguinte continua depois do último (rank, código, id) retornado,
+    então o custo não cresce com a profundidade e resultados não se repetem
+    quando professores são cadastrados entre uma página e outra.
+
+    Args:
+        query: Texto digitado.
+        limit: Tamanho da página.
+        cursor: Valor de ``next`` da página anterior.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return TeacherSearchPage(results=[])
+    teachers = get_search_backend().search(query)
+    if cursor:
+        rank, code, teacher_id = decode_cursor(cursor)
+        teachers = teachers.filter(
+            Q(rank__lt=rank)
+            | Q(rank=rank, code__gt=code)
+            | Q(rank=rank, code=code, id__gt=teacher_id)
+        )
+    rows = list(teachers.values_list('id', 'code', 'name', 'rank')[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_id, last_code, _, last_rank = rows[-1]
+        next_cursor = encode_cursor(last_rank, last_code, last_id)
+
+    return TeacherSearchPage(
+        results=[
+            TeacherSearchHit(
+                id=teacher_id,
+                code=code,
+                name=name,
+                highlight=highlight('name', name, terms) + highlight('code', code, terms),
+            )
+            for teacher_id, code, name, _ in rows
+        ],
+        next=next_cursor,
+    )
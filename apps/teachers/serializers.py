@@ -2,9 +2,11 @@ from rest_framework import serializers
 from apps.teachers.models import Teacher, DiaryType
 from apps.classes.models import Class
 from apps.classes.serializers import ClassSerializer
+from apps.teachers.search import decode_cursor
+from esmeraldinha.serializers import SparseFieldsetMixin
 
 
-class TeacherSerializer(serializers.ModelSerializer):
+class TeacherSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     classes = ClassSerializer(many=True, read_only=True)
     class_ids = serializers.PrimaryKeyRelatedField(
         many=True,
@@ -30,3 +32,44 @@ class TeacherSerializer(serializers.ModelSerializer):
             'classes'
         ]
         read_only_fields = ['id']
+        expandable_fields = ['classes']
+
+
+class TeacherSearchQuerySerializer(serializers.Serializer):
+    MAX_LIMIT = 50
+
+    q = serializers.CharField(
+        required=False, allow_blank=True, max_length=100,
+        help_text="Termo de busca (código ou nome)")
+    limit = serializers.IntegerField(
+        required=False, default=20, min_value=1, max_value=MAX_LIMIT,
+        help_text=f"Resultados por página (máximo {MAX_LIMIT})")
+    cursor = serializers.CharField(
+        required=False, help_text="Valor de next da página anterior")
+
+    def validate_cursor(self, value):
+        try:
+            decode_cursor(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+
+class TeacherRosterImportSerializer(serializers.Serializer):
+    MAX_FILE_SIZE = 10 * 1024 * 1024
+
+    file = serializers.FileField(
+        help_text="Planilha CSV ou XLSX com as colunas codigo, nome, dia_reducao, diario e, opcionalmente, turmas (códigos separados por | ou ;) e senha")
+    replace_classes = serializers.BooleanField(
+        required=False, default=False,
+        help_text="Substitui as turmas dos professores importados em vez de apenas acrescentar")
+    dry_run = serializers.BooleanField(
+        required=False, default=False,
+        help_text="Apenas valida a planilha, sem gravar")
+
+    def validate_file(self, value):
+        if value.size > self.MAX_FILE_SIZE:
+            raise serializers.ValidationError("O tamanho do arquivo deve ser menor que 10MB")
+        if value.name.split('.')[-1].lower() not in ('csv', 'xlsx'):
+            raise serializers.ValidationError("A extensão do arquivo deve ser CSV ou XLSX")
+        return value
@@ -0,0 +1,213 @@
+import io
+import re
+from pathlib import Path
+from typing import Dict, IO, List
+
+import pandas as pd
+from django.db import transaction
+
+from apps.classes.models import Class
+from apps.schools.services import invalidate_school_summaries
+from apps.teachers.models import DiaryType, ReductionDay, Teacher, normalize_search_text, teacher_search_text
+from apps.teachers.schemas import RosterImportResult, RosterRowError
+
+
+class TeacherRosterImportService:
+    """
+    Importa professores e suas turmas a partir de uma planilha (CSV ou XLSX).
+
+    Cada linha é um professor identificado pelo ``codigo``; professores já
+    cadastrados são atualizados. A coluna ``turmas`` lista códigos de turmas
+    existentes separados por ``|`` (ou ``;`` quando o separador do CSV é a
+    vírgula). Linhas inválidas são relatadas e
+    ignoradas, sem interromper a importação das demais.
+    """
+
+    MAX_ROWS = 20_000
+    BATCH_SIZE = 1000
+    COLUMNS = {
+        'codigo': 'code',
+        'nome': 'name',
+        'dia_reducao': 'reduction_day',
+        'diario': 'diary_type',
+        'turmas': 'classes',
+        'senha': 'password',
+    }
+    REQUIRED = ('code', 'name', 'reduction_day', 'diary_type')
+    REDUCTION_DAY_NAMES = {
+        'segunda': ReductionDay.MONDAY,
+        'terca': ReductionDay.TUESDAY,
+        'quarta': ReductionDay.WEDNESDAY,
+        'quinta': ReductionDay.THURSDAY,
+        'sexta': ReductionDay.FRIDAY,
+    }
+    CLASS_SEPARATOR = re.compile(r'[;|]')
+
+    def read(self, file: IO, filename: str) -> pd.DataFrame:
+        """Lê a planilha como texto, com as colunas renomeadas para os campos de ``Teacher``."""
+        extension = Path(filename).suffix.lower()
+        if extension == '.csv':
+            try:
+                text = file.read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                raise ValueError("O arquivo CSV deve estar em UTF-8.")
+            # sep=None detecta vírgula ou ponto e vírgula (padrão do Excel em português)
+            frame = pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False, sep=None, engine='python')
+        elif extension == '.xlsx':
+            frame = pd.read_excel(file, dtype=str, keep_default_na=False)
+        else:
+            raise ValueError("O arquivo deve ser CSV ou XLSX.")
+
+        frame.columns = [normalize_search_text(str(column)).strip().replace(' ', '_') for column in frame.columns]
+        frame = frame.rename(columns=self.COLUMNS)
+        missing = [
+            column for column, field in self.COLUMNS.items()
+            if field in self.REQUIRED and field not in frame.columns
+        ]
+        if missing:
+            raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(missing)}")
+        if len(frame) > self.MAX_ROWS:
+            raise ValueError(f"O arquivo deve ter no máximo {self.MAX_ROWS} linhas.")
+
+        for column in frame.columns:
+            frame[column] = frame[column].fillna('').astype(str).str.strip()
+        if 'classes' not in frame.columns:
+            frame['classes'] = ''
+        return frame
+
+    def validate(self, frame: pd.DataFrame) -> Dict[int, List[str]]:
+        """
+        Valida todas as linhas de uma vez, coluna a coluna.
+
+        Converte ``reduction_day`` e ``diary_type`` para os valores do modelo
+        e preenche ``class_ids`` com as turmas encontradas.
+
+        Returns:
+            Erros por índice de linha do ``frame``.
+        """
+        checks = []
+
+        checks.append((frame['code'] == '', "Código obrigatório."))
+        checks.append((frame['code'].str.len() > 6, "Código deve ter no máximo 6 caracteres."))
+        checks.append((
+            frame['code'].ne('') & frame['code'].duplicated(keep='first'),
+            "Código repetido no arquivo.",
+        ))
+        checks.append((frame['name'] == '', "Nome obrigatório."))
+        checks.append((frame['name'].str.len() > 100, "Nome deve ter no máximo 100 caracteres."))
+
+        day_names = frame['reduction_day'].map(normalize_search_text).str.replace('-feira', '', regex=False)
+        reduction_day = pd.to_numeric(frame['reduction_day'], errors='coerce').fillna(
+            day_names.map(self.REDUCTION_DAY_NAMES))
+        invalid_day = ~reduction_day.isin(ReductionDay.values)
+        checks.append((invalid_day, "Dia de redução deve ser de 1 (segunda) a 5 (sexta)."))
+        frame['reduction_day'] = reduction_day.where(~invalid_day, 0).astype(int)
+
+        frame['diary_type'] = frame['diary_type'].str.lower()
+        checks.append((~frame['diary_type'].isin(DiaryType.values), "Diário deve ser c1 ou c2."))
+
+        errors: Dict[int, List[str]] = {}
+        for mask, message in checks:
+            for index in frame.index[mask]:
+                errors.setdefault(index, []).append(message)
+
+        class_codes = (
+            frame['classes'].str.split(self.CLASS_SEPARATOR).explode().str.strip()
+        )
+        class_codes = class_codes[class_codes != '']
+        known = dict(
+            Class.objects.filter(code__in=set(class_codes)).values_list('code', 'id')
+        )
+        unknown = class_codes[~class_codes.isin(known.keys())]
+        for index, codes in unknown.groupby(level=0):
+            errors.setdefault(index, []).append(
+                f"Turmas não encontradas: {', '.join(sorted(set(codes)))}")
+        frame['class_ids'] = (
+            class_codes.map(known).dropna().astype(int).groupby(level=0).agg(lambda ids: sorted(set(ids)))
+            .reindex(frame.index)
+        )
+        frame['class_ids'] = frame['class_ids'].apply(lambda ids: ids if isinstance(ids, list) else [])
+        return errors
+
+    def import_file(self, file: IO, filename: str, replace_classes: bool = False,
+                    dry_run: bool = False) -> RosterImportResult:
+        """
+        Valida e importa a planilha.
+
+        Args:
+            file: Conteúdo da planilha.
+            filename: Nome do arquivo, usado para identificar o formato.
+            replace_classes: Remove as turmas dos professores importados que
+                não estão na planilha; por padrão as turmas são apenas acrescentadas.
+            dry_run: Apenas valida, sem gravar.
+
+        Returns:
+            Quantidade de professores criados e atualizados, vínculos com
+            turmas e os erros de cada linha ignorada.
+        """
+        frame = self.read(file, filename)
+        errors = self.validate(frame)
+        valid = frame.drop(index=list(errors))
+
+        row_errors = [
+            RosterRowError(row=index + 2, code=frame.at[index, 'code'], errors=messages)
+            for index, messages in sorted(errors.items())
+        ]
+        existing = set(
+            Teacher.objects.filter(code__in=list(valid['code'])).values_list('code', flat=True))
+        result = RosterImportResult(
+            rows=len(frame),
+            created=int((~valid['code'].isin(existing)).sum()),
+            updated=int(valid['code'].isin(existing).sum()),
+            assignments=int(valid['class_ids'].str.len().sum()),
+            errors=row_errors,
+            dry_run=dry_run,
+        )
+        if dry_run or valid.empty:
+            return result
+
+        has_password = 'password' in valid.columns
+        update_fields = ['name', 'reduction_day', 'diary_type', 'search_text']
+        if has_password:
+            update_fields.append('password')
+
+        with transaction.atomic():
+            # bulk_create não passa por Teacher.save: search_text é preenchido aqui
+            Teacher.objects.bulk_create(
+                (
+                    Teacher(
+                        code=row.code,
+                        name=row.name,
+                        reduction_day=row.reduction_day,
+                        diary_type=row.diary_type,
+                        password=row.password if has_password else '',
+                        search_text=teacher_search_text(row.name, row.code),
+                    )
+                    for row in valid.itertuples()
+                ),
+                batch_size=self.BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['code'],
+                update_fields=update_fields,
+            )
+            teacher_ids = dict(
+                Teacher.objects.filter(code__in=list(valid['code'])).values_list('code', 'id'))
+
+            Through = Teacher.classes.through
+            class_ids = {class_id for ids in valid['class_ids'] for class_id in ids}
+            if replace_classes:
+                links = Through.objects.filter(teacher_id__in=teacher_ids.values())
+                class_ids.update(links.values_list('class_id', flat=True))
+                links.delete()
+            Through.objects.bulk_create(
+                (
+                    Through(teacher_id=teacher_ids[row.code], class_id=class_id)
+                    for row in valid.itertuples()
+                    for class_id in row.class_ids
+                ),
+                batch_size=self.BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            invalidate_school_summaries(*(
+                Class.objects.filter(id__in=class_ids).values_list('school_id', flat=True).distinct()))
+        return result
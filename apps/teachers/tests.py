@@ -1,12 +1,21 @@
+import io
+import tempfile
+
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase, APIRequestFactory
 from rest_framework import status
 from django.urls import reverse
 from unittest.mock import MagicMock, patch
 
 from apps.schools.models import School
-from apps.teachers.models import Teacher, ReductionDay, DiaryType
+from apps.teachers.models import SEARCH_TEXT_MAX_LENGTH, Teacher, ReductionDay, DiaryType
 from apps.classes.models import Class
+from apps.teachers.search import TeacherSearchBackend, get_search_backend
 from apps.teachers.views import TeacherViewSet
 
 
@@ -51,19 +60,50 @@ class TeacherAPITestCase(APITestCase):
         self.assertEqual(len(first_teacher['classes']), 1)
         self.assertEqual(first_teacher['classes'][0]['id'], self.class_instance.id)
 
+    def test_teachers_list_query_count_does_not_grow_with_classes(self):
+        """Turmas e escolas são carregadas em uma única consulta para a página"""
+        for index in range(3):
+            teacher = Teacher.objects.create(
+                name=f"Professor {index}", code=f"T10{index}", password="senha-secreta",
+                reduction_day=ReductionDay.MONDAY, diary_type=DiaryType.C1)
+            teacher.classes.add(
+                self.class_instance,
+                Class.objects.create(code=f"5{index}", label="5º ano", school=self.school))
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('teacher-list'))
+        self.assertEqual(len(response.json()['results'][1]['classes']), 2)
+
+    def test_teachers_list_sparse_fields_skip_nested_classes(self):
+        """?fields= retorna linhas simples sem consultar as turmas"""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('teacher-list'), {'fields': 'id,name,code'})
+
+        self.assertEqual(response.json()['results'][0], {
+            'id': self.teacher.id, 'name': "Professor Teste", 'code': "T001"})
+
+    def test_teachers_list_expand_adds_nested_fields(self):
+        """?expand= inclui os campos aninhados pedidos junto com os campos simples"""
+        flat = self.client.get(reverse('teacher-list'), {'expand': 'unknown'}).json()['results'][0]
+        expanded = self.client.get(reverse('teacher-list'), {'expand': 'classes'}).json()['results'][0]
+
+        self.assertNotIn('classes', flat)
+        self.assertEqual(set(flat), {'id', 'name', 'code', 'reduction_day', 'diary_type'})
+        self.assertEqual(expanded['classes'][0]['school']['id'], self.school.id)
+
     def test_teachers_search_endpoint_exists_without_query(self):
         """Testa se o endpoint GET /api/teachers/search/ existe sem parâmetro q"""
         url = reverse('teacher-search')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.json(), [])
+        self.assertEqual(response.json(), {'results': [], 'next': None})
 
     def test_teachers_search_endpoint_filters_by_query(self):
         """Testa se o endpoint GET /api/teachers/search/ filtra por nome/código"""
         url = reverse('teacher-search')
         response = self.client.get(url, {'q': 'T001'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.json()['results']
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]['code'], 'T001')
 
@@ -149,6 +189,202 @@ class TeacherAPITestCase(APITestCase):
                       (status.HTTP_204_NO_CONTENT, status.HTTP_404_NOT_FOUND))
 
 
+class TeacherSearchTestCase(APITestCase):
+
+    def setUp(self):
+        for name, code in [
+            ("João da Silva", "A100"),
+            ("Maria Conceição", "JO2000"),
+            ("Ana Joana Souza", "B200"),
+            ("Sebastião Araújo", "C300"),
+        ]:
+            Teacher.objects.create(
+                name=name, code=code, password="senha-secreta",
+                reduction_day=ReductionDay.MONDAY, diary_type=DiaryType.C1)
+
+    def _codes(self, query, backend=None):
+        return list((backend or get_search_backend()).search(query).values_list('code', flat=True))
+
+    def test_search_ignores_accents_and_case(self):
+        """"joao" e "CONCEICAO" encontram nomes acentuados"""
+        self.assertEqual(self._codes("joao"), ["A100"])
+        self.assertEqual(self._codes("CONCEICAO"), ["JO2000"])
+        self.assertEqual(self._codes("sebastião araujo"), ["C300"])
+
+    def test_search_matches_word_prefixes(self):
+        """Cada termo casa com o início de uma palavra do nome ou do código"""
+        self.assertEqual(self._codes("jo sil"), ["A100"])
+        self.assertEqual(self._codes("ouza"), [])
+        self.assertEqual(self._codes("c3"), ["C300"])
+
+    def test_search_ranks_code_prefix_first(self):
+        """Códigos que começam pelo texto vêm antes de nomes e de outras palavras"""
+        self.assertEqual(self._codes("jo"), ["JO2000", "A100", "B200"])
+
+    def test_index_follows_changes(self):
+        """Renomear ou remover um professor atualiza o índice de busca"""
+        teacher = Teacher.objects.get(code="C300")
+        teacher.name = "Sebastiana Brandão"
+        teacher.save()
+        Teacher.objects.get(code="A100").delete()
+
+        self.assertEqual(self._codes("brandao"), ["C300"])
+        self.assertEqual(self._codes("araujo"), [])
+        self.assertEqual(self._codes("joao"), [])
+
+    def test_search_text_fits_field_when_normalization_grows(self):
+        """Nomes que crescem ao normalizar são cortados, mantendo o código pesquisável"""
+        teacher = Teacher.objects.create(
+            name="ﬃ" * 100, code="D400", password="senha-secreta",
+            reduction_day=ReductionDay.MONDAY, diary_type=DiaryType.C1)
+
+        self.assertEqual(len(teacher.search_text), SEARCH_TEXT_MAX_LENGTH)
+        self.assertTrue(teacher.search_text.endswith(" d400"))
+        self.assertEqual(self._codes("d400"), ["D400"])
+
+    def test_search_endpoint_returns_light_results_with_highlight(self):
+        """A busca retorna apenas id, código, nome e os trechos casados"""
+        response = self.client.get(reverse('teacher-search'), {'q': 'joao sil'})
+
+        self.assertEqual(response.json(), {
+            'results': [{
+                'id': Teacher.objects.get(code="A100").id,
+                'code': "A100",
+                'name': "João da Silva",
+                'highlight': [
+                    {'field': 'name', 'start': 0, 'end': 4},
+                    {'field': 'name', 'start': 8, 'end': 11},
+                ],
+            }],
+            'next': None,
+        })
+
+    def test_search_endpoint_pages_with_cursor(self):
+        """Uma busca curta é paginada por cursor, sem repetir resultados"""
+        for index in range(5):
+            Teacher.objects.create(
+                name=f"Joaquim {index}", code=f"J{index}", password="senha-secreta",
+                reduction_day=ReductionDay.MONDAY, diary_type=DiaryType.C1)
+
+        codes = []
+        params = {'q': 'j', 'limit': 3}
+        while True:
+            with self.assertNumQueries(1):
+                data = self.client.get(reverse('teacher-search'), params).json()
+            self.assertLessEqual(len(data['results']), 3)
+            codes += [item['code'] for item in data['results']]
+            if data['next'] is None:
+                break
+            params['cursor'] = data['next']
+
+        self.assertEqual(codes, self._codes('j'))
+        self.assertEqual(len(codes), 8)
+
+    def test_search_endpoint_rejects_invalid_parameters(self):
+        """Limite acima do máximo ou cursor inválido retornam 400"""
+        url = reverse('teacher-search')
+
+        self.assertEqual(self.client.get(url, {'q': 'j', 'limit': 500}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'q': 'j', 'cursor': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_generic_backend_matches_indexed_backend(self):
+        """A busca sem índice de texto retorna o mesmo resultado"""
+        for query in ["jo", "joao sil", "conceicao", "b2"]:
+            self.assertEqual(self._codes(query, TeacherSearchBackend()), self._codes(query), query)
+
+
+class TeacherRosterImportTestCase(APITestCase):
+
+    def setUp(self):
+        self.school = School.objects.create(id=1, name="Escola Teste", code=123)
+        self.class_a = Class.objects.create(code="4A", label="4º ano A", school=self.school)
+        self.class_b = Class.objects.create(code="4B", label="4º ano B", school=self.school)
+        self.existing = Teacher.objects.create(
+            name="Nome Antigo", code="T001", password="senha-secreta",
+            reduction_day=ReductionDay.MONDAY, diary_type=DiaryType.C1)
+        self.existing.classes.add(self.class_b)
+
+    def _csv(self, content, name="professores.csv"):
+        return SimpleUploadedFile(name, content.encode('utf-8'), content_type='text/csv')
+
+    def _import(self, upload, **data):
+        return self.client.post(reverse('teacher-import-roster'), {'file': upload, **data}, format='multipart')
+
+    def test_import_upserts_teachers_and_reports_row_errors(self):
+        """Cria e atualiza pelo código, vincula turmas e relata as linhas inválidas"""
+        upload = self._csv(
+            "codigo;nome;dia_reducao;diario;turmas\n"
+            "T001;João Atualizado;terça-feira;C2;4A\n"
+            "T002;Maria Conceição;3;c1;4A|4B\n"
+            "T003;Sem Turma;9;c1;\n"
+            "T004;Turma Errada;1;c1;9Z\n"
+            "T002;Repetido;1;c1;\n"
+            ";Sem Código;1;c3;\n"
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self._import(upload)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual((data['rows'], data['created'], data['updated'], data['assignments']), (6, 1, 1, 3))
+        self.assertEqual(
+            [(error['row'], error['code']) for error in data['errors']],
+            [(4, "T003"), (5, "T004"), (6, "T002"), (7, "")],
+        )
+        self.assertEqual(data['errors'][1]['errors'], ["Turmas não encontradas: 9Z"])
+        self.assertEqual(len(data['errors'][3]['errors']), 2)
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "João Atualizado")
+        self.assertEqual(self.existing.reduction_day, ReductionDay.TUESDAY)
+        self.assertEqual(self.existing.diary_type, DiaryType.C2)
+        self.assertEqual(self.existing.password, "senha-secreta")
+        self.assertEqual(set(self.existing.classes.values_list('code', flat=True)), {"4A", "4B"})
+        created = Teacher.objects.get(code="T002")
+        self.assertEqual(set(created.classes.values_list('code', flat=True)), {"4A", "4B"})
+        self.assertFalse(Teacher.objects.filter(code__in=["T003", "T004"]).exists())
+
+        through_inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT') and '"teachers_teacher_classes"' in query['sql']
+        ]
+        self.assertEqual(len(through_inserts), 1)
+        self.assertEqual(
+            self.client.get(reverse('teacher-search'), {'q': 'conceicao'}).json()['results'][0]['code'], "T002")
+
+    def test_import_xlsx_replacing_classes(self):
+        """Importa XLSX e, com replace_classes, remove as turmas fora da planilha"""
+        buffer = io.BytesIO()
+        pd.DataFrame([
+            {'Código': 'T001', 'Nome': 'Professor Teste', 'Dia Redução': 2, 'Diário': 'c1', 'Turmas': '4A'},
+        ]).to_excel(buffer, index=False)
+        upload = SimpleUploadedFile("professores.xlsx", buffer.getvalue())
+
+        response = self._import(upload, replace_classes=True)
+
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual(list(self.existing.classes.values_list('code', flat=True)), ["4A"])
+
+    def test_import_requires_columns(self):
+        """Planilhas sem as colunas obrigatórias são recusadas"""
+        response = self._import(self._csv("codigo,nome\nT009,Alguém\n"))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("dia_reducao", response.json()['error'])
+
+    def test_import_command_dry_run_writes_nothing(self):
+        """--dry-run apenas valida a planilha"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8') as file:
+            file.write("codigo,nome,dia_reducao,diario\nT010,Novo Professor,1,c1\n")
+            file.flush()
+            output = io.StringIO()
+            call_command('import_teachers', file.name, '--dry-run', stdout=output)
+
+        self.assertIn("1 professores novos", output.getvalue())
+        self.assertFalse(Teacher.objects.filter(code="T010").exists())
+
+
 class TeacherViewSetUnitTestCase(SimpleTestCase):
 
     def setUp(self):
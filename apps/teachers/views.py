@@ -1,10 +1,21 @@
-from django.db import models, transaction
+from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework import viewsets, status, serializers
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
+from apps.classes.models import Class
 from apps.teachers.models import Teacher
-from apps.teachers.serializers import TeacherSerializer
+from apps.teachers.schemas import RosterImportResult, TeacherSearchPage
+from apps.teachers.search import search_page
+from apps.teachers.serializers import (
+    TeacherRosterImportSerializer,
+    TeacherSearchQuerySerializer,
+    TeacherSerializer,
+)
+from apps.teachers.services import TeacherRosterImportService
 from drf_spectacular.utils import extend_schema, OpenApiResponse
+from esmeraldinha.serializers import SPARSE_FIELDSET_PARAMETERS, requested_fields
 
 
 @extend_schema(tags=['Professores'])
@@ -12,9 +23,18 @@ class TeacherViewSet(viewsets.ModelViewSet):
     queryset = Teacher.objects.all()
     serializer_class = TeacherSerializer
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        selected = requested_fields(self.request, self.get_serializer_class())
+        if selected is None or 'classes' in selected:
+            qs = qs.prefetch_related(
+                Prefetch('classes', queryset=Class.objects.select_related('school')))
+        return qs
+
     @extend_schema(
         summary='Lista todos os professores',
-        description='Retorna uma lista paginada de todos os professores cadastrados. Use os parâmetros ?page=N para navegar entre páginas.',
+        description='Retorna uma lista paginada de todos os professores cadastrados. Use os parâmetros ?page=N para navegar entre páginas. Use ?fields=id,name,code para linhas sem as turmas aninhadas (e sem a consulta delas), ou ?expand=classes para incluí-las junto com os campos simples.',
+        parameters=SPARSE_FIELDSET_PARAMETERS,
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
@@ -22,6 +42,7 @@ class TeacherViewSet(viewsets.ModelViewSet):
     @extend_schema(
         summary='Retorna detalhes de um professor',
         description='Retorna os detalhes completos de um professor específico',
+        parameters=SPARSE_FIELDSET_PARAMETERS,
         responses={
             200: OpenApiResponse(
                 response=TeacherSerializer,
@@ -82,6 +103,10 @@ class TeacherViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         teacher = serializer.save()
 
+        if getattr(instance, '_prefetched_objects_cache', None):
+            # As turmas pré-carregadas ficaram desatualizadas após o save
+            instance._prefetched_objects_cache = {}
+
         response_serializer = self.get_serializer(teacher)
         return Response(response_serializer.data)
 
@@ -123,29 +148,56 @@ class TeacherViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='search')
     @extend_schema(
         summary='Busca professores por código ou nome',
-        description='Busca professores por código ou nome (parcial)',
-        parameters=[
-            {
-                'name': 'q',
-                'type': str,
-                'location': 'query',
-                'description': 'Termo de busca (código ou nome)'
-            }
-        ],
+        description='Busca para autocompletar, sem diferenciar acentos e maiúsculas. Cada termo casa com o início de uma palavra ("joao sil" encontra "João da Silva"); o resultado vem ordenado por relevância, com códigos que começam pelo texto digitado primeiro. Retorna no máximo limit professores (id, código, nome e trechos casados) por página; use o cursor next para a página seguinte.',
+        parameters=[TeacherSearchQuerySerializer],
         responses={
             200: OpenApiResponse(
-                response=TeacherSerializer(many=True),
+                response=TeacherSearchPage,
                 description='Resultados da busca retornados com sucesso'
+            ),
+            400: OpenApiResponse(
+                description='Parâmetros inválidos'
             )
         }
     )
     def search(self, request):
-        query = request.query_params.get('q', '')
-        if not query:
-            return Response([])
-        teachers = self.queryset.filter(
-            models.Q(code__icontains=query) |
-            models.Q(name__icontains=query)
-        )
-        serializer = self.get_serializer(teachers, many=True)
-        return Response(serializer.data)
+        serializer = TeacherSearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        page = search_page(data.get('q', ''), data['limit'], data.get('cursor'))
+        return Response(page.model_dump(mode="json"))
+
+    @extend_schema(
+        summary='Importa professores e turmas de uma planilha',
+        description='Cadastra ou atualiza (pelo código) os professores de uma planilha CSV ou XLSX e vincula as turmas informadas. As linhas inválidas são ignoradas e relatadas em errors, com o número da linha; as demais são importadas.',
+        request={
+            'multipart/form-data': TeacherRosterImportSerializer,
+        },
+        responses={
+            200: OpenApiResponse(
+                response=RosterImportResult,
+                description='Resultado da importação, com os erros por linha'
+            ),
+            400: OpenApiResponse(
+                description='Arquivo inválido ou sem as colunas obrigatórias'
+            )
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    def import_roster(self, request):
+        serializer = TeacherRosterImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            result = TeacherRosterImportService().import_file(
+                data['file'],
+                data['file'].name,
+                replace_classes=data['replace_classes'],
+                dry_run=data['dry_run'],
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result.model_dump(mode="json"), status=status.HTTP_200_OK)
@@ -0,0 +1,202 @@
+"""
+Paginação das listagens.
+
+Por padrão as listagens são paginadas por número de página (``?page=``), com
+o total em ``count``. Com ``?cursor=`` a listagem passa a ser paginada por
+posição (keyset): cada página continua depois da última linha da anterior,
+seguindo a ordenação do modelo, então o custo é o mesmo em qualquer
+profundidade e não há ``COUNT(*)`` nem ``OFFSET``. É o modo indicado para
+rolagem infinita.
+"""
+import base64
+import json
+from collections import OrderedDict
+from typing import List, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def ordering_fields(queryset: QuerySet) -> List[str]:
+    """
+    Ordenação usada pela paginação por posição.
+
+    Parte da ordenação do queryset (ou do ``Meta.ordering`` do modelo) e
+    acrescenta a chave primária como desempate, para que a posição seja única
+    mesmo quando os campos da ordenação se repetem (ex.: nome da escola).
+    """
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+    if not all(isinstance(field, str) and '__' not in field for field in ordering):
+        raise ValueError("A paginação por cursor exige ordenação por campos do próprio modelo.")
+    pk_names = {'pk', queryset.model._meta.pk.name}
+    if not any(field.lstrip('-') in pk_names for field in ordering):
+        ordering.append('-pk' if ordering and ordering[-1].startswith('-') else 'pk')
+    return ordering
+
+
+def keyset_filter(ordering: List[str], position: List) -> Q:
+    """
+    Linhas depois de ``position`` na ordem ``ordering``.
+
+    Equivale à comparação de tuplas ``(a, b, c) > (x, y, z)``, escrita como
+    ``a >= x AND (a > x OR (b >= y AND (b > y OR c > z)))``: a primeira
+    condição delimita o intervalo no índice da ordenação.
+    """
+    condition = None
+    for field, value in reversed(list(zip(ordering, position))):
+        name = field.lstrip('-')
+        after = 'lt' if field.startswith('-') else 'gt'
+        if condition is None:
+            condition = Q(**{f'{name}__{after}': value})
+        else:
+            condition = Q(**{f'{name}__{after}e': value}) & (Q(**{f'{name}__{after}': value}) | condition)
+    return condition
+
+
+def encode_cursor(position: List) -> str:
+    return base64.urlsafe_b64encode(json.dumps(position, cls=DjangoJSONEncoder).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List:
+    """Valores da ordenação da última linha da página anterior, ainda sem conversão de tipo."""
+    position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(position, list):
+        raise ValueError("O cursor não é uma lista.")
+    return position
+
+
+def approximate_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Total estimado pelo planejador do PostgreSQL, sem executar ``COUNT(*)``.
+
+    A estimativa vem das estatísticas da tabela (atualizadas pelo ``ANALYZE``)
+    e considera os filtros aplicados. Em outros bancos retorna ``None``.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class Pagination(PageNumberPagination):
+    """
+    Paginação por número de página, com paginação por posição opcional.
+
+    Parâmetros:
+        ``page_size``: itens por página, até ``max_page_size``.
+        ``cursor``: ativa a paginação por posição; vazio para a primeira
+            página e, nas seguintes, o valor recebido em ``next``.
+        ``count=approximate``: no modo por posição, inclui em ``count`` o
+            total estimado pelo PostgreSQL (``null`` nos demais bancos).
+
+    No modo por posição a navegação é só para frente: ``previous`` é sempre ``null``.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        try:
+            self.ordering = ordering_fields(queryset)
+        except ValueError as e:
+            raise NotFound(str(e))
+        queryset = queryset.order_by(*self.ordering)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'approximate':
+            self.count = approximate_count(queryset)
+
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(keyset_filter(self.ordering, self.decode_position(cursor, queryset.model)))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.rows = rows[:page_size]
+        return self.rows
+
+    def decode_position(self, cursor: str, model) -> List:
+        """
+        Posição do cursor, com cada valor convertido pelo campo da ordenação.
+
+        O cursor vem do cliente: qualquer falha (base64, JSON, tamanho, tipo
+        ou valor nulo) resulta em 404, nunca em erro no banco.
+        """
+        try:
+            position = decode_cursor(cursor)
+            if len(position) != len(self.ordering):
+                raise ValueError("Tamanho do cursor diferente da ordenação.")
+            values = []
+            for field, value in zip(self.ordering, position):
+                name = field.lstrip('-')
+                model_field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+                value = model_field.to_python(value)
+                if value is None:
+                    raise ValueError("Valor nulo no cursor.")
+                values.append(value)
+            return values
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def position(self, row) -> List:
+        return [getattr(row, field.lstrip('-')) for field in self.ordering]
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.position(self.rows[-1])))
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response = super().get_paginated_response_schema(schema)
+        response['properties']['count'].update({
+            'nullable': True,
+            'description': 'Total de itens; no modo por cursor, estimado e só com count=approximate',
+        })
+        return response
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Ativa a paginação por posição: vazio na primeira página, depois o cursor de next',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Com cursor, "approximate" inclui o total estimado (somente PostgreSQL)',
+                'schema': {'type': 'string', 'enum': ['approximate']},
+            },
+        ]
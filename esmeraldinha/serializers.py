@@ -0,0 +1,66 @@
+from typing import Optional, Set
+
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name='fields',
+        type=str,
+        location='query',
+        description='Campos da resposta separados por vírgula (ex.: id,name,code)',
+    ),
+    OpenApiParameter(
+        name='expand',
+        type=str,
+        location='query',
+        description='Campos aninhados a incluir, separados por vírgula (ex.: classes)',
+    ),
+]
+
+
+def _param_set(value: Optional[str]) -> Set[str]:
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+def requested_fields(request, serializer_class) -> Optional[Set[str]]:
+    """
+    Campos pedidos em ``?fields=`` e ``?expand=`` para ``serializer_class``.
+
+    ``fields`` escolhe os campos de primeiro nível; ``expand`` acrescenta os
+    campos aninhados listados em ``Meta.expandable_fields``. Só com ``expand``,
+    a resposta traz os campos simples mais os expandidos. Sem nenhum dos dois
+    (ou em escritas) retorna ``None`` e a representação completa é mantida.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    fields = _param_set(request.query_params.get('fields'))
+    expand = _param_set(request.query_params.get('expand'))
+    if not fields and not expand:
+        return None
+    expandable = set(getattr(serializer_class.Meta, 'expandable_fields', ()))
+    selected = fields or set(serializer_class.Meta.fields) - expandable
+    return selected | (expand & expandable)
+
+
+class SparseFieldsetMixin:
+    """
+    Permite ao cliente escolher os campos da resposta com ``?fields=`` e ``?expand=``.
+
+    Vale apenas para o serializer da raiz da resposta; serializers aninhados
+    mantêm todos os seus campos.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        selected = requested_fields(self.context.get('request'), type(self))
+        if selected is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in selected}
@@ -54,15 +54,96 @@ INSTALLED_APPS = [
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'EXCEPTION_HANDLER': 'esmeraldinha.exceptions.custom_exception_handler',
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'esmeraldinha.pagination.Pagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
 }
 
+# Feriados municipais aplicados sobre os nacionais ao montar o calendário: (mês, dia, descrição)
+MUNICIPAL_HOLIDAYS = [
+    (7, 31, 'Feriado Municipal'),
+]
+
+# Renderização dos diários em PDF: processos do pool (0 renderiza no próprio processo) e cache em disco
+GRADEBOOK_PDF_WORKERS = config('GRADEBOOK_PDF_WORKERS', default=2, cast=int)
+GRADEBOOK_PDF_CACHE_DIR = config('GRADEBOOK_PDF_CACHE_DIR', default=str(BASE_DIR / 'media' / 'gradebooks'))
+
+# Eventos (SSE) de progresso das cadernetas: pub/sub no Redis se configurado, senão broker em memória do processo.
+# O broker em memória só entrega eventos publicados no mesmo processo: com mais de um worker
+# (como no Dockerfile, --workers 3) o Redis é obrigatório, senão parte dos clientes não recebe os eventos.
+GRADEBOOK_EVENTS_REDIS_URL = config('GRADEBOOK_EVENTS_REDIS_URL', default='')
+GRADEBOOK_EVENTS_HEARTBEAT_SECONDS = config('GRADEBOOK_EVENTS_HEARTBEAT_SECONDS', default=15, cast=float)
+# Os fluxos são servidos por workers ASGI (uvicorn) e não ocupam threads; cada um mantém uma conexão de
+# pub/sub com o Redis. Limite por processo, duração máxima de cada fluxo e intervalo de reconexão do cliente
+GRADEBOOK_EVENTS_MAX_STREAMS = config('GRADEBOOK_EVENTS_MAX_STREAMS', default=1000, cast=int)
+GRADEBOOK_EVENTS_MAX_SECONDS = config('GRADEBOOK_EVENTS_MAX_SECONDS', default=300, cast=float)
+GRADEBOOK_EVENTS_RETRY_MS = config('GRADEBOOK_EVENTS_RETRY_MS', default=5000, cast=int)
+
+# Regeneração das aulas das cadernetas após mudanças no calendário: em segundo plano (thread) ou na própria requisição
+GRADEBOOK_REGENERATION_ASYNC = config('GRADEBOOK_REGENERATION_ASYNC', default=True, cast=bool)
+
+# Exclusão de escolas e calendários com seus dependentes: em segundo plano (thread) ou na própria requisição
+CASCADE_DELETION_ASYNC = config('CASCADE_DELETION_ASYNC', default=True, cast=bool)
+
+# Cache (resumos das escolas): Redis se configurado, senão memória do processo.
+# A memória do processo só serve a um processo: com mais de um worker a invalidação feita por um
+# deles não chega aos outros, que serviriam resumos antigos. Nesse caso CACHE_REDIS_URL é obrigatório.
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+    } if CACHE_REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+SCHOOL_SUMMARY_CACHE_TIMEOUT = config('SCHOOL_SUMMARY_CACHE_TIMEOUT', default=300, cast=int)
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Esmeraldinha API',
     'DESCRIPTION': 'API for the Esmeraldinha project',
     'VERSION': '1.0.0',
+    # Views assíncronas (fora do DRF) não são descobertas pelo gerador do schema
+    'APPEND_PATHS': {
+        '/api/gradebooks/events/': {
+            'get': {
+                'operationId': 'api_gradebooks_events_retrieve',
+                'tags': ['Gradebook'],
+                'summary': 'Acompanha o progresso das cadernetas em tempo real',
+                'description': (
+                    'Abre um fluxo Server-Sent Events com eventos `gradebook` (status e progresso das '
+                    'cadernetas dos professores, começando pelo estado atual) e `job` (andamento de tarefas '
+                    'em segundo plano). Substitui a consulta periódica à listagem. Cada fluxo dura no máximo '
+                    'GRADEBOOK_EVENTS_MAX_SECONDS e o cliente reconecta sozinho; com o limite de fluxos do '
+                    'servidor atingido, retorna 503 com Retry-After.'
+                ),
+                'parameters': [
+                    {
+                        'name': 'teacher_id',
+                        'in': 'query',
+                        'description': 'Professores cujas cadernetas serão acompanhadas (repetível, até 100)',
+                        'schema': {'type': 'array', 'items': {'type': 'integer'}},
+                        'style': 'form',
+                        'explode': True,
+                    },
+                    {
+                        'name': 'job_id',
+                        'in': 'query',
+                        'description': 'Tarefa acompanhada (ex.: o job_id enviado em /api/gradebooks/generate/)',
+                        'schema': {'type': 'string'},
+                    },
+                ],
+                'responses': {
+                    '200': {
+                        'description': 'Fluxo de eventos',
+                        'content': {'text/event-stream': {'schema': {'type': 'string'}}},
+                    },
+                    '400': {'description': 'Nenhum professor ou tarefa informados, ou ids inválidos'},
+                    '503': {'description': 'Limite de fluxos simultâneos atingido'},
+                },
+            },
+        },
+    },
 }
 
 MIDDLEWARE = [
@@ -1,5 +1,7 @@
 import type {
   Class,
+  ClassAssignment,
+  ClassAssignmentResult,
   ClassCreate,
   ClassUpdate,
   PaginatedResponse,
@@ -24,10 +26,14 @@ export const useClasses = () => {
   const update = (id: number, payload: ClassUpdate) => $api<Class>(`/api/classes/${id}/`, { method: 'PATCH', body: payload })
   const destroy = (id: number) => $api<null>(`/api/classes/${id}/`, { method: 'DELETE' })
 
+  const assign = (payload: ClassAssignment) =>
+    $api<ClassAssignmentResult>(`/api/classes/assignments/`, { method: 'POST', body: payload })
+
   return {
     list,
     create,
     update,
     destroy,
+    assign,
   }
 }
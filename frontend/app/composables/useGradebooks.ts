@@ -1,17 +1,31 @@
 import type {
   Gradebook,
+  GradebookContentPatch,
+  GradebookContentPatchResult,
   GradebookCreate,
+  GradebookSummary,
   GradebookUpdate,
+  GradebookProgressEvent,
+  GradebookStatusTransition,
+  GradebookStatusTransitionResult,
+  JobProgressEvent,
   PaginatedResponse,
   PaginationParams,
 } from '@types'
-import { useNuxtApp } from 'nuxt/app'
+import { useNuxtApp, useRuntimeConfig } from 'nuxt/app'
+
+export interface GradebookEventHandlers {
+  onGradebook?: (event: GradebookProgressEvent) => void
+  onJob?: (event: JobProgressEvent) => void
+  // Chamado quando o navegador desiste da conexão (ex.: 503 com o limite de fluxos atingido)
+  onClosed?: () => void
+}
 
 export const useGradebooks = () => {
   const { $api } = useNuxtApp()
   const basePath = '/api/gradebooks/'
 
-  const list = (params?: PaginationParams) => $api<PaginatedResponse<Gradebook>>(basePath, { params })
+  const list = (params?: PaginationParams) => $api<PaginatedResponse<GradebookSummary>>(basePath, { params })
 
   const retrieve = (id: number) => $api<Gradebook>(`${basePath}${id}/`)
 
@@ -20,14 +34,50 @@ export const useGradebooks = () => {
   const update = (id: number, payload: GradebookUpdate) =>
     $api<Gradebook>(`${basePath}${id}/`, { method: 'PATCH', body: payload })
 
+  const patchContent = (id: number, payload: GradebookContentPatch) =>
+    $api<GradebookContentPatchResult>(`${basePath}${id}/content/`, {
+      method: 'PATCH',
+      body: payload,
+      headers: { 'Content-Type': 'application/merge-patch+json' },
+    })
+
+  const transitionStatus = (payload: GradebookStatusTransition) =>
+    $api<GradebookStatusTransitionResult>(`${basePath}bulk-status/`, { method: 'POST', body: payload })
+
   const destroy = (id: number) =>
     $api<null>(`${basePath}${id}/`, { method: 'DELETE' })
 
+  const subscribe = (
+    params: { teacher_ids?: number[], job_id?: string },
+    handlers: GradebookEventHandlers,
+  ): EventSource => {
+    const config = useRuntimeConfig()
+    const baseURL = (config.public.apiBaseUrl as string) ?? 'http://127.0.0.1:8000'
+    const query = new URLSearchParams()
+    params.teacher_ids?.forEach(id => query.append('teacher_id', String(id)))
+    if (params.job_id) query.set('job_id', params.job_id)
+
+    const source = new EventSource(`${baseURL}${basePath}events/?${query}`, { withCredentials: true })
+    source.addEventListener('gradebook', (message) => {
+      handlers.onGradebook?.(JSON.parse((message as MessageEvent).data))
+    })
+    source.addEventListener('job', (message) => {
+      handlers.onJob?.(JSON.parse((message as MessageEvent).data))
+    })
+    source.addEventListener('error', () => {
+      if (source.readyState === EventSource.CLOSED) handlers.onClosed?.()
+    })
+    return source
+  }
+
   return {
     list,
     retrieve,
     create,
     update,
+    patchContent,
+    transitionStatus,
     destroy,
+    subscribe,
   }
 }
@@ -1,4 +1,4 @@
-import type { PaginatedResponse, PaginationParams, School } from '@types'
+import type { PaginatedResponse, PaginationParams, School, SchoolSummary } from '@types'
 import { useNuxtApp } from 'nuxt/app'
 
 export const useSchools = () => {
@@ -7,7 +7,14 @@ export const useSchools = () => {
 
   const list = (params: PaginationParams = { page: 1, page_size: 100 }) => $api<PaginatedResponse<School>>(basePath, { params })
 
+  const summaries = (params: PaginationParams = { page: 1, page_size: 100 }) =>
+    $api<PaginatedResponse<SchoolSummary>>(`${basePath}summary/`, { params })
+
+  const summary = (id: number) => $api<SchoolSummary>(`${basePath}${id}/summary/`)
+
   return {
     list,
+    summaries,
+    summary,
   }
 }
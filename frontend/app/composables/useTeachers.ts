@@ -3,6 +3,8 @@ import type {
   PaginationParams,
   Teacher,
   TeacherCreate,
+  TeacherSearchPage,
+  TeacherSearchParams,
   TeacherUpdate,
 } from '@types'
 import { useNuxtApp } from 'nuxt/app'
@@ -13,6 +15,9 @@ export const useTeachers = () => {
 
   const list = (params?: PaginationParams) => $api<PaginatedResponse<Teacher>>(basePath, { params })
 
+  const search = (params: TeacherSearchParams) =>
+    $api<TeacherSearchPage>(`${basePath}search/`, { params })
+
   const create = (payload: TeacherCreate) => $api<Teacher>(basePath, { method: 'POST', body: payload })
 
   const update = (id: number, payload: TeacherUpdate) =>
@@ -23,6 +28,7 @@ export const useTeachers = () => {
 
   return {
     list,
+    search,
     create,
     update,
     destroy,
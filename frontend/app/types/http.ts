@@ -6,7 +6,8 @@ export interface ApiErrorResponse {
 }
 
 export interface PaginatedResponse<T> {
-  count: number
+  // null na paginação por cursor, exceto com count=approximate no PostgreSQL
+  count: number | null
   next: string | null
   previous: string | null
   results: T[]
@@ -16,3 +17,10 @@ export interface PaginationParams {
   page?: number
   page_size?: number
 }
+
+// Paginação por posição: cursor vazio na primeira página, depois o cursor de `next`
+export interface CursorPaginationParams {
+  cursor: string
+  page_size?: number
+  count?: 'approximate'
+}
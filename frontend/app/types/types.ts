@@ -17,6 +17,13 @@ export interface School {
   readonly code: number
 }
 
+export interface SchoolSummary extends School {
+  readonly classes: number
+  readonly teachers: number
+  readonly gradebooks: Record<GradebookStatus, number> & { readonly total: number }
+  readonly average_progress: number | null
+}
+
 export interface Class {
   readonly id: number
   readonly code: string
@@ -75,6 +82,22 @@ export interface ClassCreate {
   readonly school_id: number
 }
 
+export interface ClassAssignmentPair {
+  readonly teacher_id: number
+  readonly class_id: number
+}
+
+export interface ClassAssignment {
+  readonly add?: ClassAssignmentPair[]
+  readonly remove?: ClassAssignmentPair[]
+}
+
+export interface ClassAssignmentResult {
+  readonly added: number
+  readonly removed: number
+  readonly unchanged: number
+}
+
 export interface Gradebook {
   readonly id: number
   readonly title: string
@@ -82,23 +105,116 @@ export interface Gradebook {
   readonly teacher: Teacher
   readonly calendar: AcademicCalendar
   readonly progress: number
+  readonly lessons_filled: number
+  readonly lessons_total: number
+  readonly version: number
+  readonly content_registry: ContentRegistry
   readonly created_at: string
 }
 
+export interface Lesson {
+  readonly stage: string | null
+  readonly content: string
+}
+
+export interface ContentRegistry {
+  readonly lessons: Record<string, Lesson>
+}
+
+export interface LessonPatch {
+  readonly content?: string
+  readonly present?: number | null
+  readonly absent?: number | null
+}
+
+export interface GradebookContentPatch {
+  readonly version: number
+  readonly lessons: Record<string, LessonPatch>
+}
+
+export interface GradebookContentPatchResult {
+  readonly id: number
+  readonly version: number
+  readonly progress: number
+  readonly lessons_filled: number
+  readonly lessons_total: number
+}
+
+export interface TeacherResumed {
+  readonly id: number
+  readonly name: string
+  readonly code: string
+}
+
+export interface GradebookSummary {
+  readonly id: number
+  readonly title: string
+  readonly status: GradebookStatus
+  readonly teacher: TeacherResumed
+  readonly academic_class: Pick<Class, 'id' | 'code' | 'label' | 'school_id'>
+  readonly school: School
+  readonly calendar_year: number
+  readonly progress: number
+  readonly created_at: string
+}
+
+export interface GradebookProgressEvent {
+  readonly id: number
+  readonly teacher_id: number
+  readonly status: GradebookStatus
+  readonly progress: number
+}
+
+export interface JobProgressEvent {
+  readonly job_id: string
+  readonly kind: string
+  readonly status: 'running' | 'completed' | 'failed'
+  readonly done: number
+  readonly total: number
+}
+
+export interface GradebookStatusTransition {
+  readonly status: GradebookStatus
+  readonly ids?: number[]
+  readonly school_id?: number
+  readonly class_id?: number
+  readonly teacher_id?: number
+  readonly year?: number
+}
+
+export interface GradebookStatusTransitionResult {
+  readonly status: GradebookStatus
+  readonly matched: number
+  readonly updated: number
+  readonly unchanged: number
+  readonly rejected: number
+  readonly by_status: Partial<Record<GradebookStatus, number>>
+}
+
+// Exclusão em segundo plano de escola ou calendário (DELETE retorna 202)
+export interface CascadeDeletionJob {
+  readonly id: number
+  readonly job_id: string
+  readonly target: 'school' | 'calendar'
+  readonly target_id: number
+  readonly label: string
+  readonly status: 'pending' | 'running' | 'completed' | 'failed'
+  readonly done: number
+  readonly total: number
+  readonly deleted: Record<string, number>
+}
+
 export interface GradebookCreate {
   readonly teacher_id: number
   readonly calendar_id: number
   readonly class_id: number
   readonly title: string
-  readonly progress?: number
 }
 
 export interface GradebookUpdate {
   readonly teacher_id?: number
   readonly calendar_id?: number
-  readonly status?: GradebookStatus
   readonly title?: string
-  readonly progress?: number
 }
 
 export enum GradebookStatus {
@@ -162,6 +278,24 @@ export interface TeacherCreate {
   readonly class_ids: number[]
 }
 
+export interface TeacherSearchParams {
+  readonly q: string
+  readonly limit?: number
+  readonly cursor?: string
+}
+
+export interface TeacherSearchHit {
+  readonly id: number
+  readonly code: string
+  readonly name: string
+  readonly highlight: { readonly field: 'name' | 'code', readonly start: number, readonly end: number }[]
+}
+
+export interface TeacherSearchPage {
+  readonly results: TeacherSearchHit[]
+  readonly next: string | null
+}
+
 export interface TeacherUpdate {
   code?: string
   reduction_day?: number